@@ -0,0 +1,614 @@
+#!/usr/bin/env python
+"""
+Time Mindboggle functions on synthetic surfaces and volumes.
+
+Each benchmark runs a Mindboggle function at one or more input sizes
+(synthetic inputs from mindboggle.benchmarks.synthetic, so no data are
+fetched), records its run time and peak memory (numpy and Python
+allocations traced by tracemalloc), and can compare the results with
+saved baselines to detect performance regressions.
+
+Input sizes ::
+
+    small:  10,242-vertex surfaces, 64^3-voxel volumes
+    medium: 40,962-vertex surfaces, 128^3-voxel volumes
+    large:  299,292-vertex surfaces, 192^3-voxel volumes
+
+Usage ::
+
+    # Run all benchmarks at their default sizes and save baselines:
+    python -m mindboggle.benchmarks.benchmark --save-baselines baselines.json
+
+    # Later, compare with the baselines (exit status 1 for regressions,
+    # including errors in benchmarks that have baselines):
+    python -m mindboggle.benchmarks.benchmark --baselines baselines.json
+
+    # Time selected benchmarks at every size:
+    python -m mindboggle.benchmarks.benchmark -b find_neighbors \\
+        stats_per_label --sizes small medium large
+
+Baselines depend on the machine, so compare results from the same machine.
+
+Copyright 2016,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
+
+"""
+
+# Synthetic input parameters for each size:
+SURFACE_FREQUENCIES = {'small': 32, 'medium': 64, 'large': 173}
+VOLUME_SIZES = {'small': 64, 'medium': 128, 'large': 192}
+SIZES = ['small', 'medium', 'large']
+
+# Synthetic inputs shared by benchmarks of the same size:
+_inputs = {}
+
+
+# ----------------------------------------------------------------------------
+# Synthetic inputs
+# ----------------------------------------------------------------------------
+def synthetic_surface(size):
+    """
+    Return a cached synthetic surface and its derived inputs for a size.
+
+    Parameters
+    ----------
+    size : string
+        'small', 'medium' or 'large'
+
+    Returns
+    -------
+    surface : dictionary
+        points and faces (lists), depths, curvatures and labels (arrays),
+        neighbor_lists, and folds (1 where depth > 0.5, -1 elsewhere)
+
+    Examples
+    --------
+    >>> from mindboggle.benchmarks.benchmark import synthetic_surface
+    >>> surface = synthetic_surface('small')
+    >>> len(surface['points']), len(surface['neighbor_lists'][0])
+    (10242, 5)
+
+    """
+    import numpy as np
+
+    from mindboggle.benchmarks.synthetic import gyrified_sphere
+    from mindboggle.guts.mesh import find_neighbors
+
+    key = ('surface', size)
+    if key not in _inputs:
+        points, faces, depths, curvatures, labels = \
+            gyrified_sphere(SURFACE_FREQUENCIES[size])
+        folds = -1 * np.ones(len(points))
+        folds[depths > 0.5] = 1
+        _inputs[key] = {'points': points.tolist(),
+                        'faces': faces.tolist(),
+                        'depths': depths,
+                        'curvatures': curvatures,
+                        'labels': labels,
+                        'folds': folds,
+                        'neighbor_lists': find_neighbors(faces.tolist(),
+                                                         len(points))}
+    return _inputs[key]
+
+
+def synthetic_volume_files(size, output_dir):
+    """
+    Return cached synthetic segmentation and label volume files for a size.
+
+    Parameters
+    ----------
+    size : string
+        'small', 'medium' or 'large'
+    output_dir : string
+        directory for the volume files
+
+    Returns
+    -------
+    segmented_file : string
+        segmentation volume (0 background, 2 cortex, 3 noncortex)
+    labeled_file : string
+        label volume
+    labels : list of integers
+        label numbers
+    """
+    from mindboggle.benchmarks.synthetic import write_synthetic_volumes
+
+    key = ('volume', size, output_dir)
+    if key not in _inputs:
+        _inputs[key] = write_synthetic_volumes(output_dir, VOLUME_SIZES[size])
+    return _inputs[key]
+
+
+# ----------------------------------------------------------------------------
+# Benchmarks: each returns (function, args, kwargs) for a size
+# ----------------------------------------------------------------------------
+def _find_neighbors(size, output_dir):
+    from mindboggle.guts.mesh import find_neighbors
+    s = synthetic_surface(size)
+    return find_neighbors, (s['faces'], len(s['points'])), {}
+
+
+def _segment_regions(size, output_dir):
+    import numpy as np
+    from mindboggle.guts.segment import segment_regions
+    s = synthetic_surface(size)
+    vertices_to_segment = np.where(s['folds'] == 1)[0].tolist()
+    return segment_regions, (vertices_to_segment, s['neighbor_lists']), {}
+
+
+def _watershed(size, output_dir):
+    import numpy as np
+    from mindboggle.guts.segment import watershed
+    s = synthetic_surface(size)
+    indices = np.where(s['folds'] == 1)[0].tolist()
+    return watershed, (s['depths'], s['points'], indices,
+                       s['neighbor_lists']), {'min_size': 50}
+
+
+def _extract_borders(size, output_dir):
+    from mindboggle.guts.segment import extract_borders
+    s = synthetic_surface(size)
+    return extract_borders, (list(range(len(s['points']))), s['labels'],
+                             s['neighbor_lists']), {}
+
+
+def _propagate(size, output_dir):
+    import numpy as np
+    from mindboggle.guts.segment import extract_borders, propagate
+    s = synthetic_surface(size)
+    indices = np.where(s['folds'] == 1)[0].tolist()
+    borders, f1, f2 = extract_borders(indices, s['labels'],
+                                      s['neighbor_lists'])
+    seeds = -1 * np.ones(len(s['points']))
+    seeds[borders] = s['labels'][borders]
+    return propagate, (s['points'], s['faces'], s['folds'], seeds,
+                       s['labels']), {}
+
+
+def _connect_points_erosion(size, output_dir):
+    import numpy as np
+    from mindboggle.guts.paths import connect_points_erosion
+    s = synthetic_surface(size)
+    values = s['depths'] * s['curvatures']
+    # Anchor the skeleton at the deepest fold vertex of each label:
+    outer_anchors = []
+    for label in np.unique(s['labels']):
+        indices = np.where((s['labels'] == label) & (s['folds'] == 1))[0]
+        if len(indices):
+            outer_anchors.append(int(indices[np.argmax(s['depths'][indices])]))
+    return connect_points_erosion, (s['folds'], s['neighbor_lists'],
+                                    outer_anchors), {'values': values}
+
+
+def _fem_laplacian(size, output_dir):
+    from mindboggle.shapes.laplace_beltrami import fem_laplacian
+    s = synthetic_surface(size)
+    return fem_laplacian, (s['points'], s['faces']), {'spectrum_size': 10}
+
+
+def _zernike_moments(size, output_dir):
+    from mindboggle.shapes.zernike.zernike import zernike_moments
+    s = synthetic_surface(size)
+    return zernike_moments, (s['points'], s['faces']), {'order': 10}
+
+
+def _stats_per_label(size, output_dir):
+    import numpy as np
+    from mindboggle.guts.compute import stats_per_label
+    s = synthetic_surface(size)
+    return stats_per_label, (s['depths'], s['labels']), \
+        {'include_labels': np.unique(s['labels']).tolist()}
+
+
+def _write_vtk(size, output_dir):
+    import os
+    from mindboggle.mio.vtks import write_vtk
+    s = synthetic_surface(size)
+    output_vtk = os.path.join(output_dir, 'benchmark_write_{0}.vtk'.format(size))
+    return write_vtk, (output_vtk, s['points'], [], [], s['faces'],
+                       [s['depths'].tolist(), s['labels'].tolist()],
+                       ['depths', 'labels']), {}
+
+
+def _read_vtk(size, output_dir):
+    import os
+    from mindboggle.mio.vtks import read_vtk, write_vtk
+    s = synthetic_surface(size)
+    input_vtk = os.path.join(output_dir, 'benchmark_read_{0}.vtk'.format(size))
+    if not os.path.exists(input_vtk):
+        write_vtk(input_vtk, s['points'], [], [], s['faces'],
+                  [s['depths'].tolist()], ['depths'])
+    return read_vtk, (input_vtk, True, True), {}
+
+
+def _thickinthehead(size, output_dir):
+    from mindboggle.shapes.volume_shapes import thickinthehead
+    segmented_file, labeled_file, labels = synthetic_volume_files(size,
+                                                                  output_dir)
+    return thickinthehead, (segmented_file, labeled_file), \
+        {'labels': labels, 'output_dir': output_dir}
+
+
+# Benchmark name: (setup function, default sizes):
+BENCHMARKS = [
+    ('find_neighbors', _find_neighbors, ['small', 'medium', 'large']),
+    ('extract_borders', _extract_borders, ['small', 'medium', 'large']),
+    ('segment_regions', _segment_regions, ['small', 'medium', 'large']),
+    ('watershed', _watershed, ['small', 'medium']),
+    ('propagate', _propagate, ['small']),
+    ('connect_points_erosion', _connect_points_erosion, ['small']),
+    ('fem_laplacian', _fem_laplacian, ['small', 'medium', 'large']),
+    ('zernike_moments', _zernike_moments, ['small']),
+    ('stats_per_label', _stats_per_label, ['small', 'medium', 'large']),
+    ('write_vtk', _write_vtk, ['small', 'medium', 'large']),
+    ('read_vtk', _read_vtk, ['small', 'medium', 'large']),
+    ('thickinthehead', _thickinthehead, ['small', 'medium', 'large'])]
+
+
+# ----------------------------------------------------------------------------
+# Timing and memory
+# ----------------------------------------------------------------------------
+def time_function(function, args=(), kwargs={}, repeat=3,
+                  measure_memory=True, max_seconds=10.0):
+    """
+    Time a function call and measure its peak memory allocation.
+
+    The function is called up to `repeat` times (fewer if a call takes more
+    than max_seconds), each time with a fresh copy of the arguments, since
+    some functions modify their inputs. Peak memory is measured in a
+    separate call with tracemalloc, so that tracing does not slow down
+    the timed calls.
+
+    Parameters
+    ----------
+    function : function
+        function to call
+    args : tuple
+        positional arguments
+    kwargs : dictionary
+        keyword arguments
+    repeat : integer
+        maximum number of timed calls
+    measure_memory : bool
+        measure peak memory?
+    max_seconds : float
+        do not repeat calls that take longer than this
+
+    Returns
+    -------
+    seconds : list of floats
+        duration of each timed call
+    peak_memory_mb : float or None
+        peak memory allocated during a call (megabytes)
+
+    Examples
+    --------
+    >>> from mindboggle.benchmarks.benchmark import time_function
+    >>> seconds, peak_memory_mb = time_function(sorted, (list(range(10)),))
+    >>> len(seconds), peak_memory_mb < 1
+    (3, True)
+
+    """
+    import copy
+    import gc
+    import time
+
+    seconds = []
+    for irepeat in range(max(int(repeat), 1)):
+        call_args = copy.deepcopy(args)
+        call_kwargs = copy.deepcopy(kwargs)
+        gc.collect()
+        start = time.perf_counter()
+        function(*call_args, **call_kwargs)
+        seconds.append(time.perf_counter() - start)
+        if seconds[-1] > max_seconds:
+            break
+
+    peak_memory_mb = None
+    if measure_memory:
+        import tracemalloc
+
+        call_args = copy.deepcopy(args)
+        call_kwargs = copy.deepcopy(kwargs)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function(*call_args, **call_kwargs)
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2.0**20
+        finally:
+            tracemalloc.stop()
+
+    return seconds, peak_memory_mb
+
+
+def run_benchmarks(names=[], sizes=[], repeat=3, measure_memory=True,
+                   output_dir='', verbose=True):
+    """
+    Run benchmarks on synthetic inputs.
+
+    Benchmarks that raise an exception (such as a missing dependency)
+    are reported with the error message and no timings.
+
+    Parameters
+    ----------
+    names : list of strings
+        benchmark names (see BENCHMARKS; all if empty)
+    sizes : list of strings
+        input sizes ('small', 'medium', 'large'; defaults if empty)
+    repeat : integer
+        maximum number of timed calls per benchmark and size
+    measure_memory : bool
+        measure peak memory?
+    output_dir : string
+        directory for synthetic and output files (temporary if empty)
+    verbose : bool
+        print results?
+
+    Returns
+    -------
+    results : list of dictionaries
+        name, size, seconds (fastest call), median_seconds,
+        peak_memory_mb and error for each benchmark and size
+
+    Examples
+    --------
+    >>> from mindboggle.benchmarks.benchmark import run_benchmarks
+    >>> results = run_benchmarks(['find_neighbors'], ['small'], repeat=1,
+    ...                          verbose=False)
+    >>> results[0]['name'], results[0]['size'], results[0]['error']
+    ('find_neighbors', 'small', '')
+
+    """
+    import os
+    import shutil
+    import tempfile
+    import numpy as np
+
+    known = [x[0] for x in BENCHMARKS]
+    for name in names:
+        if name not in known:
+            raise IOError("Unknown benchmark: {0}".format(name))
+    for size in sizes:
+        if size not in SIZES:
+            raise IOError("Use sizes among: {0}".format(', '.join(SIZES)))
+
+    remove_output_dir = not output_dir
+    if remove_output_dir:
+        output_dir = tempfile.mkdtemp(prefix='mindboggle_benchmarks_')
+    elif not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    results = []
+    try:
+        for name, setup, default_sizes in BENCHMARKS:
+            if names and name not in names:
+                continue
+            for size in SIZES:
+                if size not in (sizes or default_sizes):
+                    continue
+                result = {'name': name, 'size': size, 'seconds': None,
+                          'median_seconds': None, 'peak_memory_mb': None,
+                          'error': ''}
+                try:
+                    function, args, kwargs = setup(size, output_dir)
+                    seconds, peak_memory_mb = time_function(function, args,
+                        kwargs, repeat, measure_memory)
+                    result['seconds'] = min(seconds)
+                    result['median_seconds'] = float(np.median(seconds))
+                    result['peak_memory_mb'] = peak_memory_mb
+                except Exception as error:
+                    result['error'] = '{0}: {1}'.format(
+                        type(error).__name__, error)
+                if verbose:
+                    print(format_result(result))
+                results.append(result)
+    finally:
+        if remove_output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    return results
+
+
+def format_result(result):
+    """
+    Format a benchmark result as a line of text.
+
+    Examples
+    --------
+    >>> from mindboggle.benchmarks.benchmark import format_result
+    >>> format_result({'name': 'find_neighbors', 'size': 'small',
+    ...                'seconds': 0.1234, 'median_seconds': 0.125,
+    ...                'peak_memory_mb': 12.5, 'error': ''})
+    'find_neighbors          small      0.123 s (median 0.125 s)     12.5 MB'
+
+    """
+    if result['error']:
+        return '{0:<24}{1:<8}  failed ({2})'.format(result['name'],
+            result['size'], result['error'])
+    if result['peak_memory_mb'] is None:
+        memory = ''
+    else:
+        memory = '{0:8.1f} MB'.format(result['peak_memory_mb'])
+    return '{0:<24}{1:<8}{2:8.3f} s (median {3:.3f} s) {4}'.format(
+        result['name'], result['size'], result['seconds'],
+        result['median_seconds'], memory)
+
+
+# ----------------------------------------------------------------------------
+# Baselines
+# ----------------------------------------------------------------------------
+def save_baselines(results, baselines_file):
+    """
+    Save benchmark results as baselines (json file).
+
+    Parameters
+    ----------
+    results : list of dictionaries
+        output of run_benchmarks()
+    baselines_file : string
+        output json file
+
+    Returns
+    -------
+    baselines_file : string
+        output json file
+    """
+    import json
+
+    baselines = {}
+    for result in results:
+        if not result['error']:
+            baselines[result['name'] + '/' + result['size']] = {
+                'seconds': result['seconds'],
+                'peak_memory_mb': result['peak_memory_mb']}
+    with open(baselines_file, 'w') as fid:
+        json.dump(baselines, fid, indent=2, sort_keys=True)
+
+    return baselines_file
+
+
+def compare_to_baselines(results, baselines_file, time_threshold=0.25,
+                         memory_threshold=0.25):
+    """
+    Compare benchmark results with baselines.
+
+    A result is a regression if it is slower than its baseline by more than
+    time_threshold, or allocates more memory than its baseline by more than
+    memory_threshold (fractions of the baseline values), or if it raised an
+    error although it has a baseline.
+
+    Parameters
+    ----------
+    results : list of dictionaries
+        output of run_benchmarks()
+    baselines_file : string
+        json file saved by save_baselines()
+    time_threshold : float
+        allowed fractional increase in run time
+    memory_threshold : float
+        allowed fractional increase in peak memory
+
+    Returns
+    -------
+    regressions : list of strings
+        description of each regression
+
+    Examples
+    --------
+    >>> import os
+    >>> import tempfile
+    >>> from mindboggle.benchmarks.benchmark import save_baselines
+    >>> from mindboggle.benchmarks.benchmark import compare_to_baselines
+    >>> results = [{'name': 'f', 'size': 'small', 'seconds': 1.0,
+    ...             'median_seconds': 1.0, 'peak_memory_mb': 10.0,
+    ...             'error': ''}]
+    >>> baselines_file = os.path.join(tempfile.mkdtemp(), 'baselines.json')
+    >>> baselines_file = save_baselines(results, baselines_file)
+    >>> results[0]['seconds'] = 1.2
+    >>> compare_to_baselines(results, baselines_file)
+    []
+    >>> results[0]['seconds'] = 2.0
+    >>> compare_to_baselines(results, baselines_file)
+    ['f/small: 2.000 s vs. baseline 1.000 s (+100%)']
+    >>> results[0]['error'] = 'TypeError: bad input'
+    >>> compare_to_baselines(results, baselines_file)
+    ['f/small: failed (TypeError: bad input)']
+
+    """
+    import json
+
+    with open(baselines_file, 'r') as fid:
+        baselines = json.load(fid)
+
+    regressions = []
+    for result in results:
+        key = result['name'] + '/' + result['size']
+        if key not in baselines:
+            continue
+        if result['error']:
+            regressions.append('{0}: failed ({1})'.format(key,
+                                                          result['error']))
+            continue
+        baseline = baselines[key]
+        if baseline['seconds'] and \
+                result['seconds'] > baseline['seconds'] * (1 + time_threshold):
+            regressions.append('{0}: {1:.3f} s vs. baseline {2:.3f} s '
+                               '(+{3:.0f}%)'.format(key, result['seconds'],
+                baseline['seconds'],
+                100 * (result['seconds'] / baseline['seconds'] - 1)))
+        if baseline['peak_memory_mb'] and result['peak_memory_mb'] and \
+                result['peak_memory_mb'] > \
+                baseline['peak_memory_mb'] * (1 + memory_threshold):
+            regressions.append('{0}: {1:.1f} MB vs. baseline {2:.1f} MB '
+                               '(+{3:.0f}%)'.format(key,
+                result['peak_memory_mb'], baseline['peak_memory_mb'],
+                100 * (result['peak_memory_mb'] /
+                       baseline['peak_memory_mb'] - 1)))
+
+    return regressions
+
+
+# ----------------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------------
+def main(argv=None):
+    """
+    Run benchmarks from the command line (see module docstring).
+    """
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="""
+        Time Mindboggle functions on synthetic surfaces and volumes,
+        and compare with saved baselines.""")
+    parser.add_argument('-b', '--benchmarks', nargs='+', default=[],
+                        choices=[x[0] for x in BENCHMARKS],
+                        metavar='NAME', help='benchmarks to run '
+                        '(default: all): ' +
+                        ', '.join([x[0] for x in BENCHMARKS]))
+    parser.add_argument('--sizes', nargs='+', default=[], choices=SIZES,
+                        help='input sizes (default: per benchmark)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='maximum number of timed calls (default: 3)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure peak memory')
+    parser.add_argument('--output-dir', default='',
+                        help='directory for synthetic and output files '
+                             '(default: temporary directory)')
+    parser.add_argument('--output', default='',
+                        help='save results to this json file')
+    parser.add_argument('--save-baselines', default='', metavar='FILE',
+                        help='save results as baselines to this json file')
+    parser.add_argument('--baselines', default='', metavar='FILE',
+                        help='compare results with baselines in this file')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help='allowed fractional increase in run time '
+                             '(default: 0.25)')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='allowed fractional increase in peak memory '
+                             '(default: 0.25)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args.repeat,
+                             not args.no_memory, args.output_dir)
+    if args.output:
+        with open(args.output, 'w') as fid:
+            json.dump(results, fid, indent=2)
+    if args.save_baselines:
+        save_baselines(results, args.save_baselines)
+        print("Baselines saved to {0}".format(args.save_baselines))
+    if args.baselines:
+        regressions = compare_to_baselines(results, args.baselines,
+                                           args.time_threshold,
+                                           args.memory_threshold)
+        for regression in regressions:
+            print("Regression: " + regression)
+        if regressions:
+            return 1
+        print("No regressions relative to {0}".format(args.baselines))
+
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+"""
+Deterministic synthetic surfaces and volumes for benchmarking.
+
+Inputs are generated offline from a random seed, so that timings of
+Mindboggle functions can be compared across runs and machines without
+fetching test data:
+
+    - geodesic (icosahedral) spheres of 10*frequency**2 + 2 vertices
+    - bumpy "gyrified" spheres with depth, curvature and label scalars
+    - segmentation (cortex/noncortex) and label volumes
+
+Copyright 2016,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
+
+"""
+
+
+def icosphere(frequency=32, radius=100.0):
+    """
+    Generate a geodesic sphere by subdividing the faces of an icosahedron.
+
+    Each icosahedron face is divided into frequency**2 triangles, and all
+    vertices are projected onto the sphere, resulting in
+    10 * frequency**2 + 2 vertices and 20 * frequency**2 faces
+    (e.g., frequency=32: 10,242 vertices; frequency=173: 299,292 vertices).
+
+    Parameters
+    ----------
+    frequency : integer
+        number of divisions of each icosahedron edge
+    radius : float
+        sphere radius
+
+    Returns
+    -------
+    points : numpy array of floats (npoints x 3)
+        coordinates for all vertices
+    faces : numpy array of integers (nfaces x 3)
+        indices to three vertices per face (outward orientation)
+
+    Examples
+    --------
+    >>> from mindboggle.benchmarks.synthetic import icosphere
+    >>> points, faces = icosphere(frequency=4, radius=1.0)
+    >>> points.shape, faces.shape
+    ((162, 3), (320, 3))
+
+    """
+    import numpy as np
+
+    frequency = int(frequency)
+    if frequency < 1:
+        raise IOError("Use a frequency of at least 1.")
+
+    # ------------------------------------------------------------------------
+    # Icosahedron:
+    # ------------------------------------------------------------------------
+    t = (1.0 + np.sqrt(5.0)) / 2.0
+    vertices = np.array([[-1, t, 0], [1, t, 0], [-1, -t, 0], [1, -t, 0],
+                         [0, -1, t], [0, 1, t], [0, -1, -t], [0, 1, -t],
+                         [t, 0, -1], [t, 0, 1], [-t, 0, -1], [-t, 0, 1]],
+                        dtype=np.float64)
+    ico_faces = np.array([[0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10],
+                          [0, 10, 11], [1, 5, 9], [5, 11, 4], [11, 10, 2],
+                          [10, 7, 6], [7, 1, 8], [3, 9, 4], [3, 4, 2],
+                          [3, 2, 6], [3, 6, 8], [3, 8, 9], [4, 9, 5],
+                          [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]])
+
+    # ------------------------------------------------------------------------
+    # Barycentric grid of (i, j) steps along the edges of each face:
+    # ------------------------------------------------------------------------
+    i, j = np.meshgrid(np.arange(frequency + 1), np.arange(frequency + 1),
+                       indexing='ij')
+    inside = i + j <= frequency
+    i = i[inside]
+    j = j[inside]
+    grid_index = -np.ones((frequency + 1, frequency + 1), dtype=np.int64)
+    grid_index[i, j] = np.arange(len(i))
+
+    # Points on each face (the sum is exact for points shared by faces):
+    c0 = (frequency - i - j).astype(np.float64)[np.newaxis, :, np.newaxis]
+    c1 = i.astype(np.float64)[np.newaxis, :, np.newaxis]
+    c2 = j.astype(np.float64)[np.newaxis, :, np.newaxis]
+    v0 = vertices[ico_faces[:, 0]][:, np.newaxis, :]
+    v1 = vertices[ico_faces[:, 1]][:, np.newaxis, :]
+    v2 = vertices[ico_faces[:, 2]][:, np.newaxis, :]
+    face_points = ((c0 * v0 + c1 * v1) + c2 * v2).reshape((-1, 3))
+
+    # Triangles on each face ("up" and "down" triangles of the grid):
+    up = i + j < frequency
+    down = i + j < frequency - 1
+    triangles = np.vstack((
+        np.column_stack((grid_index[i[up], j[up]],
+                         grid_index[i[up] + 1, j[up]],
+                         grid_index[i[up], j[up] + 1])),
+        np.column_stack((grid_index[i[down] + 1, j[down]],
+                         grid_index[i[down] + 1, j[down] + 1],
+                         grid_index[i[down], j[down] + 1]))))
+    offsets = len(i) * np.arange(len(ico_faces))
+    face_triangles = (triangles[np.newaxis, :, :] +
+                      offsets[:, np.newaxis, np.newaxis]).reshape((-1, 3))
+
+    # ------------------------------------------------------------------------
+    # Merge points shared by faces and project them onto the sphere:
+    # ------------------------------------------------------------------------
+    points, inverse = np.unique(face_points, axis=0, return_inverse=True)
+    inverse = np.ravel(inverse)
+    faces = inverse[face_triangles]
+    points = radius * points / np.sqrt(np.sum(points * points,
+                                              axis=1))[:, np.newaxis]
+
+    return points, faces
+
+
+def bumps(directions, nbumps=24, frequency=6.0, seed=0):
+    """
+    Smooth random field on the unit sphere (sum of plane waves).
+
+    Parameters
+    ----------
+    directions : numpy array of floats (N x 3)
+        unit vectors
+    nbumps : integer
+        number of waves
+    frequency : float
+        wave frequency (higher for more, narrower folds)
+    seed : integer
+        random seed
+
+    Returns
+    -------
+    field : numpy array of floats
+        values between -1 and 1 for all directions
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.benchmarks.synthetic import bumps
+    >>> field = bumps(np.eye(3))
+    >>> field.shape, bool(np.all(np.abs(field) <= 1))
+    ((3,), True)
+
+    """
+    import numpy as np
+
+    random = np.random.RandomState(seed)
+    waves = random.normal(size=(nbumps, 3))
+    waves /= np.sqrt(np.sum(waves * waves, axis=1))[:, np.newaxis]
+    phases = random.uniform(0, 2 * np.pi, nbumps)
+
+    field = np.zeros(len(directions))
+    for iwave in range(nbumps):
+        field += np.cos(frequency * np.dot(directions, waves[iwave]) +
+                        phases[iwave])
+
+    return field / nbumps
+
+
+def sphere_labels(directions, nlabels=32, label_offset=1, seed=0):
+    """
+    Label unit vectors by their nearest of nlabels random directions.
+
+    Parameters
+    ----------
+    directions : numpy array of floats (N x 3)
+        unit vectors
+    nlabels : integer
+        number of (contiguous) labeled regions
+    label_offset : integer
+        first label number
+    seed : integer
+        random seed
+
+    Returns
+    -------
+    labels : numpy array of integers
+        label numbers for all directions
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.benchmarks.synthetic import sphere_labels
+    >>> sphere_labels(np.eye(3), nlabels=4).tolist()
+    [3, 4, 3]
+
+    """
+    import numpy as np
+
+    random = np.random.RandomState(seed + 1)
+    centers = random.normal(size=(nlabels, 3))
+    centers /= np.sqrt(np.sum(centers * centers, axis=1))[:, np.newaxis]
+
+    return np.argmax(np.dot(directions, centers.T), axis=1) + label_offset
+
+
+def gyrified_sphere(frequency=32, radius=100.0, amplitude=0.1, nlabels=32,
+                    seed=0):
+    """
+    Generate a bumpy ("gyrified") sphere with depth, curvature and labels.
+
+    Vertices of a geodesic sphere are displaced radially by a smooth random
+    field. Depth is the normalized distance from the outermost vertex,
+    curvature is a mean curvature estimate (umbrella operator projected on
+    the vertex normal, positive in folds), and labels are contiguous
+    regions around random directions.
+
+    Parameters
+    ----------
+    frequency : integer
+        number of divisions of each icosahedron edge (see icosphere())
+    radius : float
+        mean sphere radius
+    amplitude : float
+        radial displacement as a fraction of the radius
+    nlabels : integer
+        number of labeled regions
+    seed : integer
+        random seed
+
+    Returns
+    -------
+    points : numpy array of floats (npoints x 3)
+        coordinates for all vertices
+    faces : numpy array of integers (nfaces x 3)
+        indices to three vertices per face
+    depths : numpy array of floats
+        depth values (between 0 and 1) for all vertices
+    curvatures : numpy array of floats
+        curvature values for all vertices
+    labels : numpy array of integers
+        label numbers for all vertices
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.benchmarks.synthetic import gyrified_sphere
+    >>> points, faces, depths, curvatures, labels = gyrified_sphere(8)
+    >>> len(points), len(faces), len(np.unique(labels))
+    (642, 1280, 32)
+    >>> float(depths.min()), float(depths.max())
+    (0.0, 1.0)
+
+    """
+    import numpy as np
+    from scipy import sparse
+
+    points, faces = icosphere(frequency, 1.0)
+    npoints = len(points)
+
+    # Displace vertices radially:
+    radii = radius * (1.0 + amplitude * bumps(points, seed=seed))
+    labels = sphere_labels(points, nlabels, seed=seed)
+    normals = points.copy()
+    points = points * radii[:, np.newaxis]
+
+    # Depth from the outermost vertex:
+    depths = (radii.max() - radii) / (radii.max() - radii.min())
+
+    # Mean curvature estimate (umbrella operator along the normal):
+    edges = np.vstack((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+    adjacency = sparse.coo_matrix((np.ones(len(edges)),
+                                   (edges[:, 0], edges[:, 1])),
+                                  shape=(npoints, npoints)).tocsr()
+    adjacency = ((adjacency + adjacency.T) > 0).astype(np.float64)
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    umbrella = adjacency.dot(points) / degrees[:, np.newaxis] - points
+    edge_length = np.mean(np.sqrt(np.sum(
+        (points[edges[:, 0]] - points[edges[:, 1]])**2, axis=1)))
+    curvatures = np.sum(umbrella * normals, axis=1) / edge_length**2
+
+    return points, faces, depths, curvatures, labels
+
+
+def synthetic_volumes(size=96, cortex_thickness=3, amplitude=0.05,
+                      nlabels=32, label_offset=1000, seed=0):
+    """
+    Generate segmentation and label volumes of a bumpy synthetic brain.
+
+    Voxels inside a bumpy sphere are noncortex (3), except for a shell of
+    cortex (2) near its surface; voxels outside are background (0).
+    Brain voxels are labeled by direction from the center (as in
+    sphere_labels()), and background voxels are labeled 0.
+
+    Parameters
+    ----------
+    size : integer
+        number of voxels along each axis
+    cortex_thickness : float
+        cortex thickness (voxels)
+    amplitude : float
+        radial displacement as a fraction of the radius
+    nlabels : integer
+        number of labeled regions
+    label_offset : integer
+        first label number
+    seed : integer
+        random seed
+
+    Returns
+    -------
+    segmented : numpy array of integers (size x size x size)
+        0 for background, 2 for cortex, 3 for noncortex
+    labeled : numpy array of integers (size x size x size)
+        label numbers (0 for background)
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.benchmarks.synthetic import synthetic_volumes
+    >>> segmented, labeled = synthetic_volumes(32, nlabels=8)
+    >>> np.unique(segmented).tolist()
+    [0, 2, 3]
+    >>> len(np.unique(labeled))
+    9
+
+    """
+    import numpy as np
+
+    center = (size - 1) / 2.0
+    x = np.arange(size) - center
+    X, Y, Z = np.meshgrid(x, x, x, indexing='ij')
+    distances = np.sqrt(X * X + Y * Y + Z * Z)
+    directions = np.column_stack((X.ravel(), Y.ravel(), Z.ravel())) / \
+        np.maximum(distances.ravel(), 1e-9)[:, np.newaxis]
+
+    # Bumpy brain surface radius in each direction:
+    radius = 0.4 * size
+    radii = radius * (1.0 + amplitude * bumps(directions, seed=seed))
+    radii = radii.reshape(distances.shape)
+
+    segmented = np.zeros(distances.shape, dtype=np.int16)
+    segmented[distances <= radii] = 3
+    segmented[(distances <= radii) &
+              (distances > radii - cortex_thickness)] = 2
+
+    labeled = sphere_labels(directions, nlabels, label_offset, seed)
+    labeled = labeled.reshape(distances.shape).astype(np.int16)
+    labeled[segmented == 0] = 0
+
+    return segmented, labeled
+
+
+def write_synthetic_volumes(output_dir='.', size=96, cortex_thickness=3,
+                            amplitude=0.05, nlabels=32, label_offset=1000,
+                            seed=0):
+    """
+    Save synthetic_volumes() as nifti files (1mm isotropic voxels).
+
+    Parameters
+    ----------
+    output_dir : string
+        output directory
+    size, cortex_thickness, amplitude, nlabels, label_offset, seed
+        see synthetic_volumes()
+
+    Returns
+    -------
+    segmented_file : string
+        segmentation volume (0 background, 2 cortex, 3 noncortex)
+    labeled_file : string
+        label volume
+    labels : list of integers
+        label numbers
+
+    Examples
+    --------
+    >>> from mindboggle.benchmarks.synthetic import write_synthetic_volumes
+    >>> segmented_file, labeled_file, labels = write_synthetic_volumes(
+    ...     '.', 32, nlabels=8) # doctest: +SKIP
+
+    """
+    import os
+    import numpy as np
+    import nibabel as nb
+
+    segmented, labeled = synthetic_volumes(size, cortex_thickness, amplitude,
+                                           nlabels, label_offset, seed)
+    stem = 'synthetic_{0}_seed{1}_'.format(size, seed)
+    segmented_file = os.path.join(output_dir, stem + 'segmented.nii.gz')
+    labeled_file = os.path.join(output_dir, stem + 'labeled.nii.gz')
+    nb.save(nb.Nifti1Image(segmented, np.eye(4)), segmented_file)
+    nb.save(nb.Nifti1Image(labeled, np.eye(4)), labeled_file)
+    labels = [int(x) for x in np.unique(labeled) if x != 0]
+
+    return segmented_file, labeled_file, labels
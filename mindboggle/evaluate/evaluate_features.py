@@ -21,7 +21,8 @@ Copyright 2015,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
 """
 
 def evaluate_deep_features(features_file, labels_file, sulci_file='', hemi='',
-                           excludeIDs=[-1], output_vtk_name='', verbose=True):
+                           excludeIDs=[-1], output_vtk_name='', verbose=True,
+                           geodesic=False):
     """
     Evaluate deep surface features by computing the minimum distance from each
     label border vertex to all of the feature vertices in the same sulcus,
@@ -44,6 +45,9 @@ def evaluate_deep_features(features_file, labels_file, sulci_file='', hemi='',
         contains a surface with mean distances as scalars
     verbose : bool
         print mean distances to standard output?
+    geodesic : bool
+        measure geodesic distances along the surface within each sulcus
+        (instead of Euclidean distances)?
 
     Returns
     -------
@@ -123,17 +127,12 @@ def evaluate_deep_features(features_file, labels_file, sulci_file='', hemi='',
     # ------------------------------------------------------------------------
     # Loop through sulci:
     # ------------------------------------------------------------------------
-    # For each list of sorted label pairs (corresponding to a sulcus):
-    for isulcus, label_pairs in enumerate(dkt.sulcus_label_pair_lists):
-
-        # Keep the border points with label pair labels:
-        label_pair_border_indices = [x for i,x in enumerate(border_indices)
-                          if np.unique(border_label_tuples[i]).tolist()
-                          in label_pairs]
-
-        # Store the points as sulcus IDs in the border IDs array:
-        if label_pair_border_indices:
-            label_borders[label_pair_border_indices] = isulcus
+    # Store the border points whose label pairs define a sulcus
+    # as sulcus IDs (index into dkt.sulcus_label_pair_lists):
+    border_sulcus_IDs = dkt.sulcus_ids(border_label_tuples)
+    in_sulcus = border_sulcus_IDs >= 0
+    label_borders[np.asarray(border_indices)[in_sulcus]] = \
+        border_sulcus_IDs[in_sulcus]
 
     if len(np.unique(label_borders)) > 1:
 
@@ -145,7 +144,8 @@ def evaluate_deep_features(features_file, labels_file, sulci_file='', hemi='',
         sourceIDs = features
         targetIDs = label_borders
         distances, distance_matrix = source_to_target_distances(
-            sourceIDs, targetIDs, points, segmentIDs, excludeIDs)
+            sourceIDs, targetIDs, points, segmentIDs, excludeIDs,
+            geodesic, faces)
 
         # Compute mean distances for each feature:
         nfeatures = min(np.shape(distance_matrix)[1], nsulcus_lists)
@@ -181,7 +181,8 @@ def evaluate_deep_features(features_file, labels_file, sulci_file='', hemi='',
         sourceIDs = label_borders
         targetIDs = features
         distances, distance_matrix = source_to_target_distances(
-            sourceIDs, targetIDs, points, segmentIDs, excludeIDs)
+            sourceIDs, targetIDs, points, segmentIDs, excludeIDs,
+            geodesic, faces)
 
         # Compute mean distances for each feature:
         nfeatures = min(np.shape(distance_matrix)[1], nsulcus_lists)
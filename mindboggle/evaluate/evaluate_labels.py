@@ -5,7 +5,8 @@ Compute surface and volume label overlaps.
 
 Compute the Dice and Jaccard overlap measures for each labeled region
 of two labeled surfaces or image volumes, for example one that has been
-manually labeled and one that has been automatically labeled.
+manually labeled and one that has been automatically labeled,
+or of one reference labeling and many others (evaluate_overlaps_batch).
 
 Results have been saved to https://osf.io/7gmeq/
 
@@ -90,9 +91,10 @@ def evaluate_surface_overlaps(labels, index, table1, table2,
     index : integer
         index (starting from zero) to column of table containing label indices
     table1 : string
-        table with index labels for scalar values
+        vertices table with index labels for scalar values
+        (.npz, .parquet, .feather or .csv)
     table2 : string
-        table with index labels for scalar values
+        vertices table with index labels for scalar values
     output_file : string
         (optional) output file name
 
@@ -126,13 +128,12 @@ def evaluate_surface_overlaps(labels, index, table1, table2,
     ...     output_file=output_file, save_output=save_output) # doctest: +SKIP
 
     """
-    import pandas as pd
-
     from mindboggle.guts.compute import compute_overlaps
+    from mindboggle.mio.tables import read_vertex_table
 
     # Load surface label tables:
-    df1 = pd.read_csv(table1)
-    df2 = pd.read_csv(table2)
+    df1 = read_vertex_table(table1)
+    df2 = read_vertex_table(table2)
     list1 = df1.iloc[:, index]
     list2 = df2.iloc[:, index]
     print(list1)
@@ -142,6 +143,235 @@ def evaluate_surface_overlaps(labels, index, table1, table2,
     return dice_overlaps, jacc_overlaps, output_file
 
 
+def read_label_list(label_file, index=1):
+    """
+    Read labels from an image volume, VTK surface or vertices table file.
+
+    Parameters
+    ----------
+    label_file : string
+        nibabel-readable image volume, ``vtk file`` with label scalars,
+        or Mindboggle vertices table (.npz, .parquet, .feather or .csv)
+    index : integer
+        index (starting from zero) to column of table containing label
+        indices (only used for vertices tables)
+
+    Returns
+    -------
+    label_list : 1-D numpy array
+        labels, one per voxel or vertex
+
+    Examples
+    --------
+    >>> from mindboggle.evaluate.evaluate_labels import read_label_list
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> label_file = fetch_data(urls['left_freesurfer_labels'], '', '.vtk')
+    >>> label_list = read_label_list(label_file)
+    >>> label_list[0:5].tolist() # doctest: +SKIP
+    [1029.0, 1029.0, 1008.0, 1029.0, 1029.0]
+
+    """
+    import numpy as np
+
+    if label_file.endswith('.vtk'):
+        from mindboggle.mio.vtks import read_scalars
+
+        label_list, name = read_scalars(label_file, True, True)
+    elif label_file.endswith(('.npz', '.parquet', '.feather', '.csv')):
+        from mindboggle.mio.tables import read_vertex_table
+
+        label_list = read_vertex_table(label_file).iloc[:, index].values
+    else:
+        import nibabel as nb
+
+        label_list = nb.load(label_file).get_data()
+
+    return np.ravel(label_list)
+
+
+# Reference labels shared by overlap worker processes:
+_reference_labels = None
+
+
+def _mp_reference_labels_initializer(reference_file, index):
+    global _reference_labels
+    _reference_labels = read_label_list(reference_file, index)
+
+
+def _label_file_overlaps(labels, reference_labels, label_file, index,
+                         output_file, save_output):
+    import numpy as np
+    import pandas as pd
+
+    from mindboggle.guts.compute import label_confusion_matrix
+    from mindboggle.guts.compute import confusion_matrix_overlaps
+
+    # Count all pairs of reference and file labels at once:
+    confusion_matrix, unique_labels = label_confusion_matrix(
+        reference_labels, read_label_list(label_file, index), labels)
+    dice, jacc, volsim = confusion_matrix_overlaps(confusion_matrix)
+
+    # Arrange overlap values in the order of the labels
+    # (or of the sorted unique labels found, if no labels are given):
+    if len(labels):
+        ilabels = np.searchsorted(unique_labels, labels)
+    else:
+        labels = unique_labels
+        ilabels = np.arange(len(unique_labels))
+    dice_overlaps = dice[ilabels]
+    jacc_overlaps = jacc[ilabels]
+    volume_similarities = volsim[ilabels]
+
+    if save_output:
+        df = pd.DataFrame({'ID': labels,
+                           'Dice overlap': dice_overlaps,
+                           'Jaccard overlap': jacc_overlaps,
+                           'Volume similarity': volume_similarities},
+                          columns=['ID', 'Dice overlap', 'Jaccard overlap',
+                                   'Volume similarity'])
+        df.to_csv(output_file, index=False)
+
+    return dice_overlaps, jacc_overlaps, volume_similarities, \
+        confusion_matrix, unique_labels, output_file
+
+
+def _mp_overlaps_worker(args):
+    labels, label_file, index, output_file, save_output = args
+    return _label_file_overlaps(labels, _reference_labels, label_file, index,
+                                output_file, save_output)
+
+
+def evaluate_overlaps_batch(labels, reference_file, label_files, index=1,
+                            output_files=[], save_output=True, nprocesses=1):
+    """
+    Compute label overlaps between one reference and many labeled files.
+
+    The reference labels are read once per process, and each labeled
+    file (image volume, VTK surface or vertices table; see
+    read_label_list()) is compared with the reference through a single
+    label confusion matrix (see label_confusion_matrix() and
+    confusion_matrix_overlaps() in mindboggle.guts.compute),
+    optionally in a pool of processes.
+
+    Parameters
+    ----------
+    labels : list
+        label indices (if empty, use the sorted unique labels found in
+        the reference and each label file, which must be the same for
+        all label files)
+    reference_file : string
+        reference labels (such as manual labels or an atlas)
+    label_files : list of strings
+        labels to compare with the reference (same format and size)
+    index : integer
+        index (starting from zero) to column of tables containing
+        label indices (only used for vertices tables)
+    output_files : list of strings
+        (optional) output file names, one per label file
+    save_output : bool
+        save output files?
+    nprocesses : integer
+        number of processes (1 to process files serially)
+
+    Returns
+    -------
+    dice_overlaps : numpy array
+        Dice overlap values (one row per label file, one column per label)
+    jacc_overlaps : numpy array
+        Jaccard overlap values (one row per label file, one column per label)
+    volume_similarities : numpy array
+        volume similarity values (one row per label file,
+        one column per label)
+    confusion_matrices : numpy array of integers
+        label confusion matrix for each label file
+        [#label files by #unique labels + 1 by #unique labels + 1]:
+        number of elements with the i-th sorted unique label in the
+        reference and the j-th in the label file (the last row and column
+        count elements whose label is not among the labels)
+    output_files : list of strings
+        output text file names with overlap values
+
+    Examples
+    --------
+    >>> # Compare FreeSurfer and ants labels with FreeSurfer labels:
+    >>> from mindboggle.evaluate.evaluate_labels import evaluate_overlaps_batch
+    >>> from mindboggle.mio.labels import DKTprotocol
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> reference_file = fetch_data(urls['freesurfer_labels'], '', '.nii.gz')
+    >>> file2 = fetch_data(urls['ants_labels'], '', '.nii.gz')
+    >>> dkt = DKTprotocol()
+    >>> labels = dkt.cerebrum_cortex_DKT31_numbers
+    >>> dice, jacc, volsim, confusion_matrices, output_files = \\
+    ...     evaluate_overlaps_batch(labels, reference_file,
+    ...         [reference_file, file2], save_output=False,
+    ...         nprocesses=2) # doctest: +SKIP
+    >>> dice[0].min() # doctest: +SKIP
+    1.0
+    >>> confusion_matrices.shape # doctest: +SKIP
+    (2, 32, 32)
+
+    """
+    import os
+    import numpy as np
+
+    if output_files and len(output_files) != len(label_files):
+        raise IOError("Number of output files and label files differ")
+    if not output_files:
+        if save_output:
+            output_files = [os.path.join(os.getcwd(),
+                            'ID_dice_jaccard_{0}.csv'.format(ifile))
+                            for ifile in range(len(label_files))]
+        else:
+            output_files = ['' for x in label_files]
+
+    args = [(labels, label_file, index, output_files[ifile], save_output)
+            for ifile, label_file in enumerate(label_files)]
+
+    if nprocesses > 1 and len(args) > 1:
+        import multiprocessing as mp
+
+        process_pool = mp.Pool(min(nprocesses, len(args)),
+                               _mp_reference_labels_initializer,
+                               (reference_file, index))
+        try:
+            results = process_pool.map(_mp_overlaps_worker, args)
+            process_pool.close()
+        finally:
+            process_pool.terminate()
+            process_pool.join()
+    else:
+        reference_labels = read_label_list(reference_file, index)
+        results = [_label_file_overlaps(labels, reference_labels, label_file,
+                                        index, output_file, save_output)
+                   for labels, label_file, index, output_file, save_output
+                   in args]
+
+    # Without given labels, every file must contain the same labels
+    # (so that rows and confusion matrices line up):
+    unique_labels = results[0][4] if results else np.unique(labels)
+    for result in results[1:]:
+        if not np.array_equal(result[4], unique_labels):
+            raise IOError("Label files contain different labels; "
+                          "specify the labels to compare.")
+    nlabels = len(labels) if len(labels) else len(unique_labels)
+    ncodes = len(unique_labels) + 1
+
+    dice_overlaps = np.array([x[0] for x in results]).reshape(
+        (len(label_files), nlabels))
+    jacc_overlaps = np.array([x[1] for x in results]).reshape(
+        (len(label_files), nlabels))
+    volume_similarities = np.array([x[2] for x in results]).reshape(
+        (len(label_files), nlabels))
+    confusion_matrices = np.array([x[3] for x in results]).reshape(
+        (len(label_files), ncodes, ncodes))
+    output_files = [x[5] for x in results]
+
+    return dice_overlaps, jacc_overlaps, volume_similarities, \
+        confusion_matrices, output_files
+
+
 def evaluate_surface_overlaps_cpp(command, labels_file1, labels_file2,
                                   output_file):
     """
@@ -209,6 +439,7 @@ if __name__ == "__main__":
     from mindboggle.mio.labels import DKTprotocol
     from mindboggle.evaluate.evaluate_labels import evaluate_volume_overlaps
     from mindboggle.evaluate.evaluate_labels import evaluate_surface_overlaps
+    from mindboggle.mio.tables import find_vertex_table
 
     from math import pi
     from bokeh.models import HoverTool
@@ -313,10 +544,10 @@ if __name__ == "__main__":
             for n in range(1, number+1):
                 subject = name+'-'+str(n)
                 for surf in surfs:
-                    file1 = os.path.join(mindboggled, subject, 'tables',
-                                         surf, 'vertices.csv')
-                    file2 = os.path.join(labels_dir, subject, 'tables',
-                                         surf, 'vertices.csv')
+                    file1 = find_vertex_table(os.path.join(mindboggled,
+                                              subject, 'tables', surf))
+                    file2 = find_vertex_table(os.path.join(labels_dir,
+                                              subject, 'tables', surf))
                     print(file1)
                     print(file2)
                     output_file = "{0}_{1}_surface_label_overlaps.csv".\
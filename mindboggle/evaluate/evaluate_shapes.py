@@ -50,6 +50,7 @@ if __name__ == "__main__":
 
         from mindboggle.guts.compute import distcorr
         from mindboggle.mio.labels import DKTprotocol
+        from mindboggle.mio.tables import find_vertex_table, read_vertex_table
 
         dkt = DKTprotocol()
         label_namesL = dkt.left_cerebrum_cortex_DKT31_names
@@ -63,8 +64,8 @@ if __name__ == "__main__":
         subjects = [x.strip() for x in fid.readlines()]
 
         table_dir = '/Users/arno/Data/manual_tables'
-        table_pathL = 'tables/left_cortical_surface/vertices.csv'
-        table_pathR = 'tables/right_cortical_surface/vertices.csv'
+        table_pathL = 'tables/left_cortical_surface'
+        table_pathR = 'tables/right_cortical_surface'
 
         # --------------------------------------------------------------------
         # Loop through subjects and save distance correlations between
@@ -74,10 +75,12 @@ if __name__ == "__main__":
         for isubject, subject in enumerate(subjects):
 
             # Load shape tables:
-            tableL = os.path.join(table_dir, subject, table_pathL)
-            tableR = os.path.join(table_dir, subject, table_pathR)
-            columnsL = pd.read_csv(tableL, sep=",", index_col="label ID")
-            columnsR = pd.read_csv(tableR, sep=",", index_col="label ID")
+            tableL = find_vertex_table(os.path.join(table_dir, subject,
+                                                    table_pathL))
+            tableR = find_vertex_table(os.path.join(table_dir, subject,
+                                                    table_pathR))
+            columnsL = read_vertex_table(tableL, index_col="label ID")
+            columnsR = read_vertex_table(tableR, index_col="label ID")
 
             for ilabel, labelL in enumerate(labelsL):
                 print(subject + ', ' + str(labelL))
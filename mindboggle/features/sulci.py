@@ -12,7 +12,7 @@ Copyright 2016,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
 
 def extract_sulci(labels_file, folds_or_file, hemi, min_boundary=1,
                   sulcus_names=[], save_file=False, output_file='',
-                  background_value=-1, verbose=False):
+                  background_value=-1, verbose=False, nprocesses=1):
     """
     Identify sulci from folds in a brain surface according to a labeling
     protocol that includes a list of label pairs defining each sulcus.
@@ -67,6 +67,9 @@ def extract_sulci(labels_file, folds_or_file, hemi, min_boundary=1,
         background value
     verbose : bool
         print statements?
+    nprocesses : integer
+        number of processes to extract sulci from folds in parallel
+        (1 to process folds serially)
 
     Returns
     -------
@@ -156,9 +159,10 @@ def extract_sulci(labels_file, folds_or_file, hemi, min_boundary=1,
     import numpy as np
 
     from mindboggle.mio.vtks import read_scalars, read_vtk, rewrite_scalars
-    from mindboggle.guts.mesh import find_neighbors
-    from mindboggle.guts.segment import extract_borders, propagate, segment_regions
+    from mindboggle.guts.mesh import find_neighbors, adjacency_matrix
     from mindboggle.mio.labels import DKTprotocol
+    from mindboggle.features.sulci import _mp_extract_fold_sulci_init, \
+        _mp_extract_fold_sulci_worker
 
     # Load fold numbers if folds_or_file is a string:
     if isinstance(folds_or_file, str):
@@ -181,6 +185,8 @@ def extract_sulci(labels_file, folds_or_file, hemi, min_boundary=1,
     points, indices, lines, faces, labels, scalar_names, npoints, \
             input_vtk = read_vtk(labels_file)
     neighbor_lists = find_neighbors(faces, npoints)
+    adjacency = adjacency_matrix(neighbor_lists=neighbor_lists,
+                                 npoints=npoints)
 
     # Array of sulcus IDs for fold vertices, initialized as -1.
     # Since we do not touch gyral vertices and vertices whose labels
@@ -189,249 +195,48 @@ def extract_sulci(labels_file, folds_or_file, hemi, min_boundary=1,
     sulci = background_value * np.ones(npoints)
 
     # ------------------------------------------------------------------------
-    # Loop through folds
+    # Group vertices by fold (in increasing vertex order within each fold)
+    # ------------------------------------------------------------------------
+    folds = np.asarray(folds)
+    order = np.argsort(folds, kind='stable')
+    fold_numbers, starts = np.unique(folds[order], return_index=True)
+    fold_indices = np.split(order, starts[1:])
+    args = [(int(x), fold_indices[i]) for i, x in enumerate(fold_numbers)
+            if x != background_value]
+    n_folds = len(args)
+
+    # ------------------------------------------------------------------------
+    # Extract sulci from each fold, optionally in a pool of processes
+    # sharing the mesh arrays; folds do not overlap, so the sulcus IDs
+    # do not depend on the order in which folds are processed
     # ------------------------------------------------------------------------
-    fold_numbers = [int(x) for x in np.unique(folds) if x != background_value]
-    n_folds = len(fold_numbers)
     if verbose:
         print("Extract sulci from {0} folds...".format(n_folds))
     t0 = time()
-    for n_fold in fold_numbers:
-        fold_indices = [i for i,x in enumerate(folds) if x == n_fold]
-        len_fold = len(fold_indices)
-
-        # List the labels in this fold:
-        fold_labels = [labels[x] for x in fold_indices]
-        unique_fold_labels = [int(x) for x in np.unique(fold_labels)
-                              if x != background_value]
-
-        # --------------------------------------------------------------------
-        # NO MATCH -- fold has fewer than two labels
-        # --------------------------------------------------------------------
-        if verbose and len(unique_fold_labels) < 2:
-            # Ignore: sulci already initialized with -1 values:
-            if not unique_fold_labels:
-                print("  Fold {0} ({1} vertices): "
-                      "NO MATCH -- fold has no labels".
-                      format(n_fold, len_fold))
-            else:
-                print("  Fold {0} ({1} vertices): "
-                  "NO MATCH -- fold has only one label ({2})".
-                  format(n_fold, len_fold, unique_fold_labels[0]))
-            # Ignore: sulci already initialized with -1 values
-
-        else:
-            # Find all label boundary pairs within the fold:
-            indices_fold_pairs, fold_pairs, unique_fold_pairs = \
-                extract_borders(fold_indices, labels, neighbor_lists,
-                                ignore_values=[], return_label_pairs=True)
-
-            # Find fold label pairs in the protocol (pairs are already sorted):
-            fold_pairs_in_protocol = [x for x in unique_fold_pairs
-                                      if x in dkt.unique_sulcus_label_pairs]
-
-            if verbose and unique_fold_labels:
-                print("  Fold {0} labels: {1} ({2} vertices)".format(n_fold,
-                      ', '.join([str(x) for x in unique_fold_labels]),
-                      len_fold))
-            # ----------------------------------------------------------------
-            # NO MATCH -- fold has no sulcus label pair
-            # ----------------------------------------------------------------
-            if verbose and not fold_pairs_in_protocol:
-                print("  Fold {0}: NO MATCH -- fold has no sulcus label pair".
-                      format(n_fold, len_fold))
-
-            # ----------------------------------------------------------------
-            # Possible matches
-            # ----------------------------------------------------------------
-            else:
-                if verbose:
-                    print("  Fold {0} label pairs in protocol: {1}".format(n_fold,
-                          ', '.join([str(x) for x in fold_pairs_in_protocol])))
-
-                # Labels in the protocol (includes repeats across label pairs):
-                labels_in_pairs = [x for lst in fold_pairs_in_protocol
-                                   for x in lst]
-
-                # Labels that appear in one or more sulcus label boundary:
-                unique_labels = []
-                nonunique_labels = []
-                for label in np.unique(labels_in_pairs):
-                    if len([x for x in labels_in_pairs if x == label]) == 1:
-                        unique_labels.append(label)
-                    else:
-                        nonunique_labels.append(label)
-
-                # ------------------------------------------------------------
-                # Vertices whose labels are in only one sulcus label pair
-                # ------------------------------------------------------------
-                # Find vertices with a label that is in only one of the fold's
-                # label pairs (the other label in the pair can exist in other
-                # pairs). Assign the vertices the sulcus with the label pair
-                # if they are connected to the label boundary for that pair.
-                # ------------------------------------------------------------
-                if unique_labels:
-
-                    for pair in fold_pairs_in_protocol:
-
-                        # If one or both labels in label pair is/are unique:
-                        unique_labels_in_pair = [x for x in pair
-                                                 if x in unique_labels]
-                        n_unique = len(unique_labels_in_pair)
-                        if n_unique:
-
-                            ID = None
-                            for i, pair_list in enumerate(pair_lists):
-                                if not isinstance(pair_list, list):
-                                    pair_list = [pair_list]
-                                if pair in pair_list:
-                                    ID = i
-                                    break
-                            if ID:
-                                # Seeds from label boundary vertices
-                                # (fold_pairs and pair already sorted):
-                                indices_pair = [x for i,x
-                                    in enumerate(indices_fold_pairs)
-                                    if fold_pairs[i] == pair]
-
-                                # Vertices with unique label(s) in pair:
-                                indices_unique_labels = [fold_indices[i]
-                                     for i,x in enumerate(fold_labels)
-                                     if x in unique_labels_in_pair]
-                                             #dkt.unique_sulcus_label_pairs]
-
-                                # Propagate sulcus ID from seeds to vertices
-                                # with "unique" labels (only exist in one
-                                # label pair in a fold); propagation ensures
-                                # that sulci consist of contiguous vertices
-                                # for each label boundary:
-                                sulci2 = segment_regions(indices_unique_labels,
-                                         neighbor_lists,
-                                         min_region_size=1,
-                                         seed_lists=[indices_pair],
-                                         keep_seeding=False,
-                                         spread_within_labels=True,
-                                         labels=labels,
-                                         label_lists=[],
-                                         values=[], max_steps='',
-                                         background_value=background_value,
-                                         verbose=False)
-
-                                sulci[sulci2 != background_value] = ID
-
-                                # Print statement:
-                                if verbose:
-                                    if n_unique == 1:
-                                        ps1 = 'One label'
-                                    else:
-                                        ps1 = 'Both labels'
-                                    if len(sulcus_names):
-                                        ps2 = sulcus_names[ID]
-                                    else:
-                                        ps2 = ''
-                                    print("    {0} unique to one fold pair: "
-                                          "{1} {2}".
-                                          format(ps1, ps2,
-                                                 unique_labels_in_pair))
-
-                # ------------------------------------------------------------
-                # Vertex labels shared by multiple label pairs
-                # ------------------------------------------------------------
-                # Propagate labels from label borders to vertices with labels
-                # that are shared by multiple label pairs in the fold.
-                # ------------------------------------------------------------
-                if len(nonunique_labels):
-                    # For each label shared by different label pairs:
-                    for label in nonunique_labels:
-                        # Print statement:
-                        if verbose:
-                            print("    Propagate sulcus borders with label {0}".
-                                  format(int(label)))
-
-                        # Construct seeds from label boundary vertices:
-                        seeds = background_value * np.ones(npoints)
-
-                        for ID, pair_list in enumerate(pair_lists):
-                            if not isinstance(pair_list, list):
-                                pair_list = [pair_list]
-                            label_pairs = [x for x in pair_list if label in x]
-                            for label_pair in label_pairs:
-                                indices_pair = [x for i,x
-                                    in enumerate(indices_fold_pairs)
-                                    if np.sort(fold_pairs[i]).
-                                    tolist() == label_pair]
-                                if indices_pair:
-
-                                    # Do not include short boundary segments:
-                                    if min_boundary > 1:
-                                        indices_pair2 = []
-                                        seeds2 = segment_regions(indices_pair,
-                                                    neighbor_lists, 1, [],
-                                                    False, False, [], [],
-                                                    [], '', background_value,
-                                                    verbose)
-
-                                        useeds2 = [x for x in
-                                                   np.unique(seeds2)
-                                                   if x != background_value]
-                                        for seed2 in useeds2:
-                                            iseed2 = [i for i,x
-                                                      in enumerate(seeds2)
-                                                      if x == seed2]
-                                            if len(iseed2) >= min_boundary:
-                                                indices_pair2.extend(iseed2)
-                                            elif verbose:
-                                                if len(iseed2) == 1:
-                                                    print("    Remove "
-                                                          "assignment "
-                                                          "of ID {0} from "
-                                                          "1 vertex".
-                                                          format(seed2))
-                                                else:
-                                                    print("    Remove "
-                                                          "assignment "
-                                                          "of ID {0} from "
-                                                          "{1} vertices".
-                                                          format(seed2,
-                                                                 len(iseed2)))
-                                        indices_pair = indices_pair2
-
-                                    # Assign sulcus IDs to seeds:
-                                    seeds[indices_pair] = ID
-
-                        # Identify vertices with the label:
-                        indices_label = [fold_indices[i] for i,x
-                                         in enumerate(fold_labels)
-                                         if x == label]
-                        if len(indices_label):
-
-                            # Propagate sulcus ID from seeds to vertices
-                            # with a given shared label:
-                            seg_vs_prop = False
-                            if seg_vs_prop:
-                                indices_seeds = []
-                                for seed in [x for x in np.unique(seeds)
-                                             if x != background_value]:
-                                   indices_seeds.append([i for i,x
-                                                         in enumerate(seeds)
-                                                         if x == seed])
-
-                                sulci2 = segment_regions(indices_label,
-                                            neighbor_lists, 50, indices_seeds,
-                                            False, True, labels, [], [], '',
-                                            background_value, verbose)
-                            else:
-                                label_array = background_value * \
-                                              np.ones(npoints)
-                                label_array[indices_label] = 1
-                                sulci2 = propagate(points, faces,
-                                            label_array, seeds, sulci,
-                                            max_iters=10000,
-                                            tol=0.001, sigma=5,
-                                            background_value=background_value,
-                                            verbose=verbose)
-                            sulci[sulci2 != background_value] = \
-                                sulci2[sulci2 != background_value]
+    shared = dict(points=points, faces=faces, labels=np.asarray(labels),
+                  neighbor_lists=neighbor_lists, adjacency=adjacency,
+                  pair_lists=pair_lists, hemi=hemi, min_boundary=min_boundary,
+                  sulcus_names=sulcus_names,
+                  background_value=background_value, verbose=verbose)
+    if nprocesses > 1 and n_folds > 1:
+        import multiprocessing as mp
+
+        process_pool = mp.Pool(min(nprocesses, n_folds),
+                               _mp_extract_fold_sulci_init, (shared,))
+        try:
+            for (n_fold, indices_fold), fold_sulci in \
+                    zip(args, process_pool.imap(_mp_extract_fold_sulci_worker,
+                                                args)):
+                sulci[indices_fold] = fold_sulci
+            process_pool.close()
+        finally:
+            process_pool.terminate()
+            process_pool.join()
+    else:
+        _mp_extract_fold_sulci_init(shared)
+        for n_fold, indices_fold in args:
+            sulci[indices_fold] = _mp_extract_fold_sulci_worker((n_fold,
+                                                                 indices_fold))
 
     sulcus_numbers = [int(x) for x in np.unique(sulci)
                       if x != background_value]
@@ -487,6 +292,290 @@ def extract_sulci(labels_file, folds_or_file, hemi, min_boundary=1,
     return sulci, n_sulci, sulci_file
 
 
+def extract_fold_sulci(n_fold, fold_indices, points, faces, labels,
+                       neighbor_lists, adjacency, pair_lists, hemi,
+                       min_boundary=1, sulcus_names=[], background_value=-1,
+                       verbose=False):
+    """
+    Identify sulci in one fold (see extract_sulci()).
+
+    Sulcus IDs are only assigned to the fold's vertices, so folds can be
+    processed independently of each other.
+
+    Parameters
+    ----------
+    n_fold : integer
+        fold number
+    fold_indices : numpy array of integers
+        indices to the fold's vertices (in increasing order)
+    points : list of lists of three floats
+        coordinates for all vertices
+    faces : list of lists of three integers
+        indices to three vertices per face (indices start from zero)
+    labels : numpy array of integers
+        label numbers for all vertices
+    neighbor_lists : list of lists of integers
+        each list contains indices to neighboring vertices for each vertex
+    adjacency : scipy.sparse matrix
+        vertex adjacency matrix (see mindboggle.guts.mesh.adjacency_matrix())
+    pair_lists : list of lists of pairs of integers
+        sulcus label pairs for each sulcus in the hemisphere
+    hemi : string
+        hemisphere abbreviation in {'lh', 'rh'} for sulcus labels
+    min_boundary : integer
+        minimum number of vertices for a sulcus label boundary segment
+    sulcus_names : list of strings
+        names of sulci
+    background_value : integer or float
+        background value
+    verbose : bool
+        print statements?
+
+    Returns
+    -------
+    fold_sulci : numpy array of integers
+        sulcus numbers for the fold's vertices (-1 for non-sulcus vertices)
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.guts.mesh import find_neighbors, adjacency_matrix
+    >>> from mindboggle.mio.labels import DKTprotocol
+    >>> from mindboggle.features.sulci import extract_fold_sulci
+    >>> faces = [[0,1,2], [1,2,3], [2,3,4], [3,4,5], [4,5,6], [5,6,7]]
+    >>> neighbor_lists = find_neighbors(faces, 8)
+    >>> adjacency = adjacency_matrix(faces, npoints=8)
+    >>> labels = np.array([1003, 1003, 1003, 1028, 1028, 1028, 1028, 1028])
+    >>> pair_lists = DKTprotocol().left_sulcus_label_pair_lists
+    >>> fold_sulci = extract_fold_sulci(0, np.arange(8), [], faces, labels,
+    ...     neighbor_lists, adjacency, pair_lists, 'lh')
+    >>> [int(x) for x in fold_sulci]
+    [1, 1, 1, 1, 1, 1, 1, 1]
+
+    """
+    import numpy as np
+    from collections import Counter
+
+    from mindboggle.guts.segment import connected_components, \
+        component_sizes, propagate, segment_regions
+    from mindboggle.mio.labels import DKTprotocol
+
+    npoints = len(labels)
+    sulci = background_value * np.ones(npoints)
+    len_fold = len(fold_indices)
+
+    # List the labels in this fold:
+    fold_labels = labels[fold_indices]
+    unique_fold_labels = [int(x) for x in np.unique(fold_labels)
+                          if x != background_value]
+
+    # ------------------------------------------------------------------------
+    # NO MATCH -- fold has fewer than two labels
+    # ------------------------------------------------------------------------
+    if verbose and len(unique_fold_labels) < 2:
+        # Ignore: sulci already initialized with -1 values:
+        if not unique_fold_labels:
+            print("  Fold {0} ({1} vertices): "
+                  "NO MATCH -- fold has no labels".
+                  format(n_fold, len_fold))
+        else:
+            print("  Fold {0} ({1} vertices): "
+              "NO MATCH -- fold has only one label ({2})".
+              format(n_fold, len_fold, unique_fold_labels[0]))
+        # Ignore: sulci already initialized with -1 values
+
+    else:
+        # Find all label boundary pairs within the fold, grouping the
+        # boundary vertices by their (sorted) label pair, in order of
+        # first appearance (as in extract_borders()):
+        pair_indices = {}
+        for index in fold_indices.tolist():
+            pair = np.unique(labels[neighbor_lists[index]])
+            if len(pair) >= 2:
+                pair_indices.setdefault(tuple(pair.tolist()),
+                                        []).append(index)
+        unique_fold_pairs = [list(x) for x in pair_indices]
+
+        # Find fold label pairs in the protocol (pairs are already sorted),
+        # and their sulcus IDs in this hemisphere (-1 if in the other):
+        in_protocol = DKTprotocol.is_sulcus_label_pair(unique_fold_pairs)
+        fold_pairs_in_protocol = [x for i,x in enumerate(unique_fold_pairs)
+                                  if in_protocol[i]]
+        pair_IDs = DKTprotocol.sulcus_ids(fold_pairs_in_protocol, hemi)
+
+        if verbose and unique_fold_labels:
+            print("  Fold {0} labels: {1} ({2} vertices)".format(n_fold,
+                  ', '.join([str(x) for x in unique_fold_labels]),
+                  len_fold))
+        # --------------------------------------------------------------------
+        # NO MATCH -- fold has no sulcus label pair
+        # --------------------------------------------------------------------
+        if verbose and not fold_pairs_in_protocol:
+            print("  Fold {0}: NO MATCH -- fold has no sulcus label pair".
+                  format(n_fold, len_fold))
+
+        # --------------------------------------------------------------------
+        # Possible matches
+        # --------------------------------------------------------------------
+        else:
+            if verbose:
+                print("  Fold {0} label pairs in protocol: {1}".format(n_fold,
+                      ', '.join([str(x) for x in fold_pairs_in_protocol])))
+
+            # Labels that appear in one or more sulcus label boundary
+            # (count repeats across label pairs):
+            label_counts = Counter([x for lst in fold_pairs_in_protocol
+                                    for x in lst])
+            unique_labels = [x for x in sorted(label_counts)
+                             if label_counts[x] == 1]
+            nonunique_labels = [x for x in sorted(label_counts)
+                                if label_counts[x] > 1]
+
+            # ----------------------------------------------------------------
+            # Vertices whose labels are in only one sulcus label pair
+            # ----------------------------------------------------------------
+            # Find vertices with a label that is in only one of the fold's
+            # label pairs (the other label in the pair can exist in other
+            # pairs). Assign the vertices the sulcus with the label pair
+            # if they are connected to the label boundary for that pair.
+            # ----------------------------------------------------------------
+            if unique_labels:
+
+                for ipair, pair in enumerate(fold_pairs_in_protocol):
+
+                    # If one or both labels in label pair is/are unique:
+                    unique_labels_in_pair = [x for x in pair
+                                             if x in unique_labels]
+                    n_unique = len(unique_labels_in_pair)
+                    if n_unique:
+
+                        ID = None
+                        if pair_IDs[ipair] >= 0:
+                            ID = int(pair_IDs[ipair])
+                        if ID:
+                            # Seeds from label boundary vertices:
+                            indices_pair = pair_indices[tuple(pair)]
+
+                            # Vertices with unique label(s) in pair:
+                            indices_unique_labels = fold_indices[
+                                np.isin(fold_labels, unique_labels_in_pair)]
+
+                            # Propagate sulcus ID from seeds to vertices
+                            # with "unique" labels (only exist in one
+                            # label pair in a fold); propagation ensures
+                            # that sulci consist of contiguous vertices
+                            # for each label boundary:
+                            sulci2 = segment_regions(
+                                indices_unique_labels.tolist(),
+                                neighbor_lists,
+                                min_region_size=1,
+                                seed_lists=[indices_pair],
+                                keep_seeding=False,
+                                spread_within_labels=True,
+                                labels=labels,
+                                label_lists=[],
+                                values=[], max_steps='',
+                                background_value=background_value,
+                                verbose=False)
+
+                            sulci[sulci2 != background_value] = ID
+
+                            # Print statement:
+                            if verbose:
+                                if n_unique == 1:
+                                    ps1 = 'One label'
+                                else:
+                                    ps1 = 'Both labels'
+                                if len(sulcus_names):
+                                    ps2 = sulcus_names[ID]
+                                else:
+                                    ps2 = ''
+                                print("    {0} unique to one fold pair: "
+                                      "{1} {2}".
+                                      format(ps1, ps2,
+                                             unique_labels_in_pair))
+
+            # ----------------------------------------------------------------
+            # Vertex labels shared by multiple label pairs
+            # ----------------------------------------------------------------
+            # Propagate labels from label borders to vertices with labels
+            # that are shared by multiple label pairs in the fold.
+            # ----------------------------------------------------------------
+            for label in nonunique_labels:
+                # Print statement:
+                if verbose:
+                    print("    Propagate sulcus borders with label {0}".
+                          format(int(label)))
+
+                # Construct seeds from label boundary vertices:
+                seeds = background_value * np.ones(npoints)
+
+                for ID, pair_list in enumerate(pair_lists):
+                    if not isinstance(pair_list, list):
+                        pair_list = [pair_list]
+                    label_pairs = [x for x in pair_list if label in x]
+                    for label_pair in label_pairs:
+                        indices_pair = pair_indices.get(tuple(label_pair), [])
+                        if indices_pair:
+
+                            # Do not include short boundary segments:
+                            if min_boundary > 1:
+                                segments, nsegments = connected_components(
+                                    indices_pair, adjacency, background_value)
+                                sizes = component_sizes(segments, None,
+                                                        background_value)
+                                if verbose:
+                                    for seed2 in np.where(
+                                            sizes < min_boundary)[0]:
+                                        if sizes[seed2] == 1:
+                                            print("    Remove assignment of "
+                                                  "ID {0} from 1 vertex".
+                                                  format(seed2))
+                                        else:
+                                            print("    Remove assignment of "
+                                                  "ID {0} from {1} vertices".
+                                                  format(seed2, sizes[seed2]))
+                                indices_pair = np.asarray(indices_pair)[
+                                    sizes[segments[indices_pair]] >=
+                                    min_boundary]
+
+                            # Assign sulcus IDs to seeds:
+                            seeds[indices_pair] = ID
+
+                # Identify vertices with the label:
+                indices_label = fold_indices[fold_labels == label]
+                if len(indices_label):
+
+                    # Propagate sulcus ID from seeds to vertices
+                    # with a given shared label:
+                    label_array = background_value * np.ones(npoints)
+                    label_array[indices_label] = 1
+                    sulci2 = propagate(points, faces,
+                                       label_array, seeds, sulci,
+                                       max_iters=10000,
+                                       tol=0.001, sigma=5,
+                                       background_value=background_value,
+                                       verbose=verbose)
+                    sulci[sulci2 != background_value] = \
+                        sulci2[sulci2 != background_value]
+
+    return sulci[fold_indices]
+
+
+# Mesh arrays shared by the processes of extract_sulci()'s process pool:
+_fold_sulci_data = {}
+
+
+def _mp_extract_fold_sulci_init(data):
+    _fold_sulci_data.clear()
+    _fold_sulci_data.update(data)
+
+
+def _mp_extract_fold_sulci_worker(args):
+    from mindboggle.features.sulci import extract_fold_sulci
+    return extract_fold_sulci(*args, **_fold_sulci_data)
+
+
 # ============================================================================
 # Doctests
 # ============================================================================
@@ -169,22 +169,92 @@ def vector_distance(vector1, vector2, normalize=False):
             vector2 = np.asarray(vector2)
         if normalize:
             vector_diff = np.zeros(len(vector1))
-            for i in range(len(vector1)):
-                max_v1v2 = max([vector1[i], vector2[i]])
-                if max_v1v2 > 0:
-                    vector_diff[i] = (vector1[i] - vector2[i]) / max_v1v2
+            max_v1v2 = np.maximum(vector1, vector2)
+            positive = max_v1v2 > 0
+            vector_diff[positive] = (vector1[positive] - vector2[positive]) / \
+                                    max_v1v2[positive]
         else:
             vector_diff = vector1 - vector2
-        return np.sqrt(sum((vector_diff)**2)) / np.size(vector1)
+        return np.sqrt(np.sum((vector_diff)**2)) / np.size(vector1)
     else:
         print("Vectors have to be of equal size to compute distance.")
         return None
 
 
-def pairwise_vector_distances(vectors, save_file=False, normalize=False):
+def block_vector_distances(vectors1, vectors2, normalize=False):
+    """
+    Compute the distance between every vector in one set and in another.
+
+    Distances are computed as in vector_distance(), with
+    scipy.spatial.distance.cdist, or by broadcasting over chunks of
+    vectors1 to normalize each element of each pair of vectors.
+
+    Parameters
+    ----------
+    vectors1 : array of 1-D lists or arrays of integers or floats
+    vectors2 : array of 1-D lists or arrays of integers or floats
+        vectors of the same size as in vectors1
+    normalize : bool
+        normalize each element of the vectors?
+
+    Returns
+    -------
+    distances : numpy array of floats [len(vectors1) by len(vectors2)]
+        distances between each vector in vectors1 and in vectors2
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.guts.compute import block_vector_distances
+    >>> vectors1 = [[1,2,3],[0,3,5]]
+    >>> vectors2 = [[0,3.5,5],[1,1,1]]
+    >>> print(np.array_str(block_vector_distances(vectors1, vectors2),
+    ...       precision=5, suppress_small=True))
+    [[0.89753 0.74536]
+     [0.16667 1.52753]]
+    >>> print(np.array_str(block_vector_distances(vectors1, vectors2, True),
+    ...       precision=5, suppress_small=True))
+    [[0.38639 0.27778]
+     [0.04762 0.48125]]
+
+    """
+    import numpy as np
+    from scipy.spatial.distance import cdist
+
+    vectors1 = np.asarray(vectors1, dtype=float)
+    vectors2 = np.asarray(vectors2, dtype=float)
+    nvalues = vectors1.shape[1]
+
+    if not normalize:
+        return cdist(vectors1, vectors2) / nvalues
+
+    # Normalize differences by the larger of each pair of values
+    # (differences are zero where neither value is positive),
+    # broadcasting over chunks of about 2^20 differences:
+    distances = np.zeros((len(vectors1), len(vectors2)))
+    step = max(1, 2**20 // max(1, len(vectors2) * nvalues))
+    for i1 in range(0, len(vectors1), step):
+        values1 = vectors1[i1:i1 + step, np.newaxis, :]
+        max_v1v2 = np.maximum(values1, vectors2)
+        max_v1v2[max_v1v2 <= 0] = np.inf
+        vector_diff = values1 - vectors2
+        vector_diff /= max_v1v2
+        distances[i1:i1 + step] = np.sqrt(np.einsum('ijk,ijk->ij',
+            vector_diff, vector_diff)) / nvalues
+
+    return distances
+
+
+def pairwise_vector_distances(vectors, save_file=False, normalize=False,
+                              block_size=1024, memmap_file=''):
     """
     Compare every pair of equal-sized vectors.
 
+    Distances are computed by block_vector_distances() in blocks of
+    block_size by block_size vectors, optionally into a memory-mapped
+    matrix in a numpy .npy file, so that the matrix for many vectors
+    need not fit in memory.
+
     Parameters
     ----------
     vectors : array of 1-D lists or arrays of integers or floats
@@ -192,10 +262,14 @@ def pairwise_vector_distances(vectors, save_file=False, normalize=False):
         save file?
     normalize : bool
         normalize each element of the vectors?
+    block_size : integer
+        number of vectors per block
+    memmap_file : string
+        numpy .npy file to hold the distance matrix (if not empty)
 
     Returns
     -------
-    vector_distances : numpy array of integers or floats
+    vector_distances : numpy array (or memmap) of integers or floats
         distances between each pair of vectors
     outfile : string [optional]
         output filename for pairwise_vector_distances
@@ -215,37 +289,48 @@ def pairwise_vector_distances(vectors, save_file=False, normalize=False):
      [0.      0.      0.16667 1.52753]
      [0.      0.      0.      1.60728]
      [0.      0.      0.      0.     ]]
+    >>> vector_distances2, outfile = pairwise_vector_distances(vectors,
+    ...     save_file, normalize, 3, 'vector_distances.npy')
+    >>> np.allclose(vector_distances, np.load('vector_distances.npy'))
+    True
 
     """
     import os
     import numpy as np
-    from mindboggle.guts.compute import vector_distance
+    from mindboggle.guts.compute import block_vector_distances
 
     # Make sure argument is a numpy array
-    if not isinstance(vectors, np.ndarray):
-        vectors = np.array(vectors)
+    vectors = np.asarray(vectors, dtype=float)
+    nvectors = len(vectors)
 
     # Initialize output
-    vector_distances = np.zeros((len(vectors), len(vectors)))
+    if memmap_file:
+        vector_distances = np.lib.format.open_memmap(memmap_file, mode='w+',
+            dtype=float, shape=(nvectors, nvectors))
+    else:
+        vector_distances = np.zeros((nvectors, nvectors))
 
     # --------------------------------------------------------------------------
     # Compute distance between each pair of vectors
+    # (blocks of the upper triangle of the distance matrix)
     # --------------------------------------------------------------------------
-    # Loop through every pair of vectors
-    for ihist1 in range(len(vectors)):
-        for ihist2 in range(len(vectors)):
-            if ihist2 >= ihist1:
-
-                # Store pairwise distances between histogram values
-                d = vector_distance(1.0*vectors[ihist1],
-                                            1.0*vectors[ihist2],
-                                            normalize=normalize)
-                vector_distances[ihist1, ihist2] = d
+    for i1 in range(0, nvectors, block_size):
+        i2 = min(i1 + block_size, nvectors)
+        for j1 in range(i1, nvectors, block_size):
+            j2 = min(j1 + block_size, nvectors)
+            distances = block_vector_distances(vectors[i1:i2],
+                                               vectors[j1:j2], normalize)
+            if j1 == i1:
+                distances = np.triu(distances)
+            vector_distances[i1:i2, j1:j2] = distances
+
+    if memmap_file:
+        vector_distances.flush()
 
     if save_file:
         outfile = os.path.join(os.getcwd(), 'vector_distances.txt')
         np.savetxt(outfile, vector_distances,
-                   fmt=len(vectors) * '%.4f ', delimiter='\t', newline='\n')
+                   fmt=nvectors * '%.4f ', delimiter='\t', newline='\n')
         if not os.path.exists(outfile):
             raise IOError(outfile + " not found")
     else:
@@ -254,13 +339,105 @@ def pairwise_vector_distances(vectors, save_file=False, normalize=False):
     return vector_distances, outfile
 
 
+def nearest_vectors(vectors, k=10, normalize=False, block_size=1024):
+    """
+    Find the nearest vectors to each of a set of equal-sized vectors.
+
+    Distances are computed by block_vector_distances() in blocks of
+    block_size by block_size vectors, keeping only the k nearest vectors
+    found so far for each vector, so the full distance matrix is never
+    constructed.
+
+    Parameters
+    ----------
+    vectors : array of 1-D lists or arrays of integers or floats
+    k : integer
+        number of nearest vectors (other than itself) for each vector
+    normalize : bool
+        normalize each element of the vectors?
+    block_size : integer
+        number of vectors per block
+
+    Returns
+    -------
+    neighbor_indices : numpy array of integers [#vectors by k]
+        indices to the k nearest vectors to each vector, nearest first
+    neighbor_distances : numpy array of floats [#vectors by k]
+        distances to the k nearest vectors to each vector
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.guts.compute import nearest_vectors
+    >>> vectors = [[1,2,3],[0,3,5],[0,3.5,5],[1,1,1]]
+    >>> neighbor_indices, neighbor_distances = nearest_vectors(vectors, 2,
+    ...     False, 3)
+    >>> neighbor_indices.tolist()
+    [[3, 1], [2, 0], [1, 0], [0, 1]]
+    >>> print(np.array_str(neighbor_distances, precision=5))
+    [[0.74536 0.8165 ]
+     [0.16667 0.8165 ]
+     [0.16667 0.89753]
+     [0.74536 1.52753]]
+
+    """
+    import numpy as np
+    from mindboggle.guts.compute import block_vector_distances
+
+    vectors = np.asarray(vectors, dtype=float)
+    nvectors = len(vectors)
+    k = max(0, min(k, nvectors - 1))
+
+    neighbor_indices = np.zeros((nvectors, k), dtype=int)
+    neighbor_distances = np.zeros((nvectors, k))
+
+    for i1 in range(0, nvectors, block_size):
+        i2 = min(i1 + block_size, nvectors)
+        rows = np.arange(i2 - i1)[:, np.newaxis]
+        best_indices = np.zeros((i2 - i1, 0), dtype=int)
+        best_distances = np.zeros((i2 - i1, 0))
+        for j1 in range(0, nvectors, block_size):
+            j2 = min(j1 + block_size, nvectors)
+            distances = block_vector_distances(vectors[i1:i2],
+                                               vectors[j1:j2], normalize)
+
+            # Exclude each vector from its own neighbors:
+            columns = np.arange(j1, j2)
+            distances[np.arange(i1, i2)[:, np.newaxis] == columns] = np.inf
+
+            # Keep the k nearest vectors found so far:
+            best_distances = np.hstack((best_distances, distances))
+            best_indices = np.hstack((best_indices,
+                np.broadcast_to(columns, distances.shape)))
+            if best_distances.shape[1] > k:
+                keep = np.argpartition(best_distances, k - 1, axis=1)[:, :k]
+                best_distances = best_distances[rows, keep]
+                best_indices = best_indices[rows, keep]
+
+        # Sort by distance (then by index):
+        order = np.lexsort((best_indices, best_distances), axis=1)
+        neighbor_indices[i1:i2] = best_indices[rows, order]
+        neighbor_distances[i1:i2] = best_distances[rows, order]
+
+    return neighbor_indices, neighbor_distances
+
+
 def source_to_target_distances(sourceIDs, targetIDs, points,
-                               segmentIDs=[], excludeIDs=[-1]):
+                               segmentIDs=[], excludeIDs=[-1],
+                               geodesic=False, faces=[]):
     """
     Create a Euclidean distance matrix between source and target points.
 
     Compute the Euclidean distance from each source point to
     its nearest target point, optionally within each segment.
+    All segments are searched at once with a single k-d tree
+    (scipy.spatial.cKDTree): each segment is moved away from the others
+    along a fourth coordinate, so that a source point's nearest target
+    point always lies in the same segment.
+
+    Geodesic distances along the edges of the surface mesh are computed
+    instead with one multi-source Dijkstra search from all target points
+    (scipy.sparse.csgraph.dijkstra), over the mesh edges within segments.
 
     Example::
 
@@ -282,8 +459,14 @@ def source_to_target_distances(sourceIDs, targetIDs, points,
         different segment (unlike above, where value in sourceIDs or
         targetIDs doesn't matter, so long as its not in excludeIDs);
         source/target distances are computed within each segment
+        (distinct non-integer IDs are distinct segments, but share the
+        distance_matrix column of their integer part)
     excludeIDs : list of integers
         IDs to exclude
+    geodesic : bool
+        compute geodesic (shortest path) distances along mesh edges?
+    faces : list of lists of three integers
+        indices to three vertices per face (required if geodesic)
 
     Returns
     -------
@@ -292,50 +475,115 @@ def source_to_target_distances(sourceIDs, targetIDs, points,
     distance_matrix : numpy array [#points by maximum segment ID + 1]
         distances organized by segments (columns)
 
+    Examples
+    --------
+    >>> from mindboggle.guts.compute import source_to_target_distances
+    >>> points = [[0,0,0], [1,0,0], [2,0,0], [3,0,0], [4,0,0], [5,0,0]]
+    >>> sourceIDs = [1, -1, -1, 1, -1, 1]
+    >>> targetIDs = [-1, 1, -1, -1, 1, -1]
+    >>> segmentIDs = [0, 0, 0, 2, 2, -1]
+    >>> distances, distance_matrix = source_to_target_distances(sourceIDs,
+    ...     targetIDs, points, segmentIDs)
+    >>> [float(x) for x in distances]
+    [1.0, -1.0, -1.0, 1.0, -1.0, -1.0]
+    >>> distance_matrix.shape
+    (6, 3)
+    >>> segmentIDs = [1.5, 1.7, 1.7, 1.5, 1.5, -1]
+    >>> distances, distance_matrix = source_to_target_distances(sourceIDs,
+    ...     targetIDs, points, segmentIDs)
+    >>> [float(x) for x in distances]
+    [4.0, -1.0, -1.0, 1.0, -1.0, -1.0]
+    >>> faces = [[0,1,2], [1,2,3], [2,3,4], [3,4,5]]
+    >>> points[1] = [1,1,0]
+    >>> distances, distance_matrix = source_to_target_distances(sourceIDs,
+    ...     targetIDs, points, [], [-1], True, faces)
+    >>> [round(float(x), 4) for x in distances]
+    [1.4142, -1.0, -1.0, 1.0, -1.0, 1.0]
+
     """
     import numpy as np
-    from mindboggle.guts.compute import point_distance
 
-    if isinstance(points, list):
-        points = np.asarray(points)
+    points = np.asarray(points, dtype=float)
     npoints = len(points)
 
-    # Extract unique segment IDs (or use all points as a single segment):
+    # Number segments 0, 1, ... by their unique IDs (so that distinct
+    # non-integer IDs remain distinct segments), or use all points
+    # as a single segment:
     if np.size(segmentIDs):
-        segments = [x for x in np.unique(segmentIDs) if x not in excludeIDs]
+        segmentIDs = np.asarray(segmentIDs)
+        in_segment = ~np.isin(segmentIDs, excludeIDs)
+        segments, codes = np.unique(segmentIDs[in_segment],
+                                    return_inverse=True)
     else:
-        segmentIDs = np.zeros(npoints)
-        segments = [0]
-    nsegments = max(segments) + 1
+        in_segment = np.ones(npoints, dtype=bool)
+        segments = np.array([0])
+        codes = np.zeros(npoints, dtype=int)
+    segment_codes = -1 * np.ones(npoints, dtype=int)
+    segment_codes[in_segment] = codes
+
+    # Distance matrix column for each segment (its integer ID):
+    segment_columns = segments.astype(int)
+    nsegments = max(segment_columns) + 1 if len(segments) else 1
 
     # Initialize outputs:
     distances = -1 * np.ones(npoints)
     distance_matrix = -1 * np.ones((npoints, nsegments))
 
-    # For each segment:
-    for segment in segments:
-        segment_indices = [i for i,x in enumerate(segmentIDs)
-                           if x == segment]
-
-        # Find all source points in the segment:
-        source_indices = [i for i,x in enumerate(sourceIDs)
-                          if x not in excludeIDs
-                          if i in segment_indices]
-        # Find all target points in the segment:
-        target_indices = [i for i,x in enumerate(targetIDs)
-                          if x not in excludeIDs
-                          if i in segment_indices]
+    # Find all source and target points in the segments:
+    is_source = ~np.isin(sourceIDs, excludeIDs) & in_segment
+    is_target = ~np.isin(targetIDs, excludeIDs) & in_segment
 
-        if source_indices and target_indices:
+    # Only sources in segments with targets have distances:
+    is_source &= np.isin(segment_codes, segment_codes[is_target])
+    source_indices = np.where(is_source)[0]
+    target_indices = np.where(is_target)[0]
+    if not len(source_indices):
+        return distances, distance_matrix
 
-            # For each source point in the segment:
-            for isource in source_indices:
+    # ------------------------------------------------------------------------
+    # Geodesic distances from all targets along edges within segments:
+    # ------------------------------------------------------------------------
+    if geodesic:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+        from mindboggle.guts.mesh import adjacency_matrix
+
+        if not np.size(faces):
+            raise IOError("Geodesic distances require mesh faces.")
+        edges = adjacency_matrix(faces, npoints=npoints).tocoo()
+        within = in_segment[edges.row] & in_segment[edges.col] & \
+                 (segment_codes[edges.row] == segment_codes[edges.col])
+        rows = edges.row[within]
+        cols = edges.col[within]
+        lengths = np.sqrt(((points[rows] - points[cols]) ** 2).sum(axis=1))
+        graph = csr_matrix((lengths, (rows, cols)), shape=(npoints, npoints))
+
+        source_distances = dijkstra(graph, directed=False,
+                                    indices=target_indices,
+                                    min_only=True)[source_indices]
+        reached = np.isfinite(source_distances)
+        source_indices = source_indices[reached]
+        source_distances = source_distances[reached]
 
-                # Find the closest target point:
-                d, i = point_distance(points[isource],
-                                      points[target_indices])
-                distances[isource] = d
-                distance_matrix[isource, segment] = d
+    # ------------------------------------------------------------------------
+    # Euclidean distances to the nearest target in the same segment:
+    # ------------------------------------------------------------------------
+    else:
+        from scipy.spatial import cKDTree
+
+        # Separate segments by more than the extent of all the points:
+        extent = np.ptp(points[in_segment], axis=0).sum() + 1
+        offsets = extent * segment_codes
+        tree = cKDTree(np.column_stack((points[target_indices],
+                                        offsets[target_indices])))
+        source_distances, foo = tree.query(
+            np.column_stack((points[source_indices],
+                             offsets[source_indices])))
+
+    distances[source_indices] = source_distances
+    distance_matrix[source_indices,
+                    segment_columns[segment_codes[source_indices]]] = \
+        source_distances
 
     return distances, distance_matrix
 
@@ -898,19 +1146,27 @@ def stats_per_label(values, labels, include_labels=[], exclude_labels=[],
            lower_quarts, upper_quarts, label_list
 
 
-def count_per_label(labels, include_labels=[], exclude_labels=[]):
+def count_per_label(labels, include_labels=[], exclude_labels=[],
+                    chunk_size=10000000):
     """
     Compute the number of times each label occurs.
 
+    All label values are counted in a single pass over the labels
+    (processed in chunks, so memory-mapped image data is never copied
+    in full): each chunk is counted with np.bincount when its label
+    range is small, or with a sparse histogram (np.unique) otherwise.
+
     Parameters
     ----------
-    labels : numpy 1-D array of integers
-        labels (e.g., one label per vertex of a mesh)
+    labels : numpy array of integers (any shape)
+        labels (e.g., one label per vertex of a mesh or voxel of an image)
     include_labels : list of integers
         labels to include
         (if empty, use unique numbers in image volume file)
     exclude_labels : list of integers
         labels to be excluded
+    chunk_size : integer
+        number of labels to count at a time
 
     Returns
     -------
@@ -931,6 +1187,8 @@ def count_per_label(labels, include_labels=[], exclude_labels=[]):
     [9, 10, 11, 12]
     >>> counts
     [0, 3, 4, 5]
+    >>> count_per_label([3, 2000000000, 3, -1])
+    ([-1, 3, 2000000000], [1, 2, 1])
 
     >>> import nibabel as nb
     >>> from mindboggle.mio.vtks import read_scalars
@@ -961,25 +1219,213 @@ def count_per_label(labels, include_labels=[], exclude_labels=[]):
     else:
         raise IOError("labels should be a numpy array.")
 
+    # Flatten without copying (image data are often in Fortran order):
+    labels = labels.ravel(order='K')
+    max_dense_range = 1000000
+
+    # Count every label value, one chunk at a time:
+    values = [np.array([], dtype=np.int64)]
+    totals = [np.array([], dtype=np.int64)]
+    for start in range(0, labels.shape[0], chunk_size):
+        chunk = np.asarray(labels[start:start + chunk_size])
+        if chunk.dtype.kind == 'f':
+            chunk = chunk[chunk == np.floor(chunk)]
+        chunk = chunk.astype(np.int64)
+        if not chunk.size:
+            continue
+        min_label = chunk.min()
+        if chunk.max() - min_label < max_dense_range:
+            chunk_counts = np.bincount(chunk - min_label)
+            chunk_values = np.nonzero(chunk_counts)[0]
+            values.append(chunk_values + min_label)
+            totals.append(chunk_counts[chunk_values])
+        else:
+            chunk_values, chunk_counts = np.unique(chunk, return_counts=True)
+            values.append(chunk_values)
+            totals.append(chunk_counts)
+    values, inverse = np.unique(np.concatenate(values), return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=np.concatenate(totals),
+                         minlength=len(values)).astype(np.int64)
+
     # Unique list of labels:
     if include_labels:
         label_list = include_labels
     else:
-        label_list = np.unique(labels).tolist()
-    label_list = [int(x) for x in label_list if int(x) not in exclude_labels]
+        label_list = values.tolist()
+    unique_labels = [int(x) for x in label_list
+                     if int(x) not in exclude_labels]
+
+    # Look up the count for each label:
+    counts = np.zeros(len(unique_labels), dtype=np.int64)
+    if len(values) and unique_labels:
+        Ilabels = np.searchsorted(values, unique_labels)
+        Ilabels[Ilabels == len(values)] = 0
+        found = values[Ilabels] == unique_labels
+        counts[found] = totals[Ilabels[found]]
+    counts = counts.tolist()
+
+    return unique_labels, counts
+
 
-    # Loop through labels:
-    unique_labels = []
-    counts = []
-    for ilabel, label in enumerate(label_list):
+def label_confusion_matrix(list1, list2, labels=[], chunk_size=10000000):
+    """
+    Compute the confusion matrix between two labelings in a single pass.
 
-        # Find which voxels contain the label in each volume:
-        indices = np.where(labels == label)[0]
-        count = len(indices)
-        unique_labels.append(label)
-        counts.append(count)
+    Each element of both lists is coded by the position of its value in
+    the sorted labels (values that are not among the labels share one
+    extra "other" code), and the paired codes are counted with a single
+    np.bincount per chunk, so the cost is linear in the number of
+    elements no matter how many labels are compared.
 
-    return unique_labels, counts
+    Parameters
+    ----------
+    list1 : numpy array (or list) of numbers (any shape)
+        first labeling (e.g., one label per vertex or voxel)
+    list2 : numpy array (or list) of numbers (same size as list1)
+        second labeling
+    labels : list of integers
+        labels to compare (if empty, use the unique values in both lists)
+    chunk_size : integer
+        number of elements to count at a time
+
+    Returns
+    -------
+    confusion_matrix : (len(unique_labels)+1)**2 numpy array of integers
+        number of elements labeled unique_labels[i] in list1 and
+        unique_labels[j] in list2; the last row and column count
+        elements whose label is not among unique_labels
+    unique_labels : numpy array
+        sorted unique labels (row and column order of confusion_matrix)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.compute import label_confusion_matrix
+    >>> list1 = [1, 1, 1, 2, 2, 3, 5]
+    >>> list2 = [1, 1, 2, 2, 2, 5, 3]
+    >>> confusion_matrix, unique_labels = label_confusion_matrix(list1,
+    ...     list2, labels=[1, 2, 3])
+    >>> unique_labels.tolist()
+    [1, 2, 3]
+    >>> confusion_matrix.tolist()
+    [[2, 1, 0, 0], [0, 2, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]]
+
+    """
+    import numpy as np
+
+    list1 = np.ravel(list1)
+    list2 = np.ravel(list2)
+    if np.size(list1) != np.size(list2):
+        raise IOError("Files are different sizes")
+
+    if len(labels):
+        unique_labels = np.unique(labels)
+    else:
+        unique_labels = np.union1d(np.unique(list1), np.unique(list2))
+    nlabels = len(unique_labels)
+    ncodes = nlabels + 1
+
+    # ------------------------------------------------------------------------
+    # Code each value by its position in the sorted labels
+    # (nlabels for values that are not among the labels):
+    # ------------------------------------------------------------------------
+    def label_codes(values):
+        if not nlabels or not len(values):
+            return np.zeros(len(values), dtype=np.int64)
+
+        # Integer values spanning a small range: dense lookup table.
+        if values.dtype.kind in 'iub':
+            lo = int(values.min())
+            hi = int(values.max())
+            if hi - lo < 10000000:
+                lut = np.full(hi - lo + 1, nlabels, dtype=np.int64)
+                inrange = (unique_labels >= lo) & (unique_labels <= hi) & \
+                          (unique_labels == np.floor(unique_labels))
+                lut[unique_labels[inrange].astype(np.int64) - lo] = \
+                    np.nonzero(inrange)[0]
+                return lut[values.astype(np.int64) - lo]
+
+        # Otherwise: binary search in the sorted labels.
+        codes = np.searchsorted(unique_labels, values)
+        np.minimum(codes, nlabels - 1, out=codes)
+        codes[unique_labels[codes] != values] = nlabels
+        return codes
+
+    # ------------------------------------------------------------------------
+    # Count paired codes (row-major index into the confusion matrix):
+    # ------------------------------------------------------------------------
+    confusion_matrix = np.zeros(ncodes * ncodes, dtype=np.int64)
+    chunk_size = max(int(chunk_size), 1)
+    for start in range(0, np.size(list1), chunk_size):
+        pairs = label_codes(list1[start:start + chunk_size]) * ncodes + \
+                label_codes(list2[start:start + chunk_size])
+        confusion_matrix += np.bincount(pairs, minlength=ncodes * ncodes)
+    confusion_matrix = confusion_matrix.reshape((ncodes, ncodes))
+
+    return confusion_matrix, unique_labels
+
+
+def confusion_matrix_overlaps(confusion_matrix):
+    """
+    Compute overlap measures for each label of a label confusion matrix.
+
+    Dice = 2|A and B| / (|A| + |B|), Jaccard = |A and B| / |A or B|, and
+    volume similarity = 1 - ||A| - |B|| / (|A| + |B|), where A and B
+    are the elements with a given label in the first and second labeling.
+    Measures are zero for labels that are missing from either labeling.
+
+    Parameters
+    ----------
+    confusion_matrix : (N+1)x(N+1) numpy array of integers
+        output of label_confusion_matrix() (the last row and column
+        count elements that are not among the N labels)
+
+    Returns
+    -------
+    dice_overlaps : numpy array
+        Dice overlap value for each of the N labels
+    jacc_overlaps : numpy array
+        Jaccard overlap value for each of the N labels
+    volume_similarities : numpy array
+        volume similarity value for each of the N labels
+
+    Examples
+    --------
+    >>> from mindboggle.guts.compute import label_confusion_matrix
+    >>> from mindboggle.guts.compute import confusion_matrix_overlaps
+    >>> list1 = [1, 1, 1, 2, 2, 3, 5]
+    >>> list2 = [1, 1, 2, 2, 2, 5, 3]
+    >>> confusion_matrix, unique_labels = label_confusion_matrix(list1,
+    ...     list2, labels=[1, 2, 3, 4])
+    >>> dice, jacc, volsim = confusion_matrix_overlaps(confusion_matrix)
+    >>> [float('{0:.2f}'.format(x)) for x in dice]
+    [0.8, 0.8, 0.0, 0.0]
+    >>> [float('{0:.2f}'.format(x)) for x in jacc]
+    [0.67, 0.67, 0.0, 0.0]
+    >>> [float('{0:.2f}'.format(x)) for x in volsim]
+    [0.8, 0.8, 1.0, 0.0]
+
+    """
+    import numpy as np
+
+    confusion_matrix = np.asarray(confusion_matrix)
+    nlabels = confusion_matrix.shape[0] - 1
+    intersections = np.diag(confusion_matrix)[:nlabels].astype(np.float64)
+    sizes1 = confusion_matrix.sum(axis=1)[:nlabels].astype(np.float64)
+    sizes2 = confusion_matrix.sum(axis=0)[:nlabels].astype(np.float64)
+    totals = sizes1 + sizes2
+
+    # Only compute measures for labels present in both labelings:
+    present = (sizes1 > 0) & (sizes2 > 0)
+    dice_overlaps = np.zeros(nlabels)
+    jacc_overlaps = np.zeros(nlabels)
+    volume_similarities = np.zeros(nlabels)
+    dice_overlaps[present] = 2.0 * intersections[present] / totals[present]
+    jacc_overlaps[present] = intersections[present] / \
+        (totals[present] - intersections[present])
+    volume_similarities[present] = 1.0 - \
+        np.abs(sizes1[present] - sizes2[present]) / totals[present]
+
+    return dice_overlaps, jacc_overlaps, volume_similarities
 
 
 def compute_overlaps(targets, list1, list2, output_file='', save_output=True,
@@ -987,6 +1433,9 @@ def compute_overlaps(targets, list1, list2, output_file='', save_output=True,
     """
     Compute overlap for each target between two lists of numbers.
 
+    All targets are measured at once from the label confusion matrix
+    of the two lists (see label_confusion_matrix()).
+
     Parameters
     ----------
     targets : list of integers
@@ -1008,6 +1457,7 @@ def compute_overlaps(targets, list1, list2, output_file='', save_output=True,
         Jaccard overlap values
     output_file : string
         output text file name with overlap values
+        (and volume similarity values)
 
     Examples
     --------
@@ -1033,53 +1483,40 @@ def compute_overlaps(targets, list1, list2, output_file='', save_output=True,
     import numpy as np
     import pandas as pd
 
-    if isinstance(list1, list):
-        list1 = np.array(list1)
-    if isinstance(list2, list):
-        list2 = np.array(list2)
-
-    if np.size(list1) != np.size(list2):
-        raise IOError("Files are different sizes")
+    from mindboggle.guts.compute import label_confusion_matrix
+    from mindboggle.guts.compute import confusion_matrix_overlaps
 
-    # Initialize output:
-    dice_overlaps = np.zeros(len(targets))
-    jacc_overlaps = np.zeros(len(targets))
     if save_output and not output_file:
         output_file = os.path.join(os.getcwd(), 'ID_dice_jaccard.csv')
 
-    # Loop through targets:
-    for itarget, target in enumerate(targets):
-
-        # Find which indices contain the target:
-        list1_indices = np.where(list1 == target)[0]
-        list2_indices = np.where(list2 == target)[0]
-        len1 = len(list1_indices)
-        len2 = len(list2_indices)
-
-        # Compute their intersection and union:
-        len_intersection = len(np.intersect1d(list2_indices, list1_indices))
-        len_union = len(np.union1d(list2_indices, list1_indices))
+    # Count all pairs of labels at once:
+    confusion_matrix, unique_labels = label_confusion_matrix(list1, list2,
+                                                             targets)
+    dice, jacc, volsim = confusion_matrix_overlaps(confusion_matrix)
 
-        # If there is at least one target in each list:
-        if len2 * len1 > 0:
-
-            # Compute Dice and Jaccard coefficients:
-            dice = np.float(2.0 * len_intersection) / (len2 + len1)
-            jacc = np.float(len_intersection) / len_union
-            dice_overlaps[itarget] = dice
-            jacc_overlaps[itarget] = jacc
-            if verbose:
+    # Arrange overlap values in the order of the targets:
+    dice_overlaps = np.zeros(len(targets))
+    jacc_overlaps = np.zeros(len(targets))
+    volume_similarities = np.zeros(len(targets))
+    if len(targets):
+        itargets = np.searchsorted(unique_labels, targets)
+        dice_overlaps = dice[itargets]
+        jacc_overlaps = jacc[itargets]
+        volume_similarities = volsim[itargets]
+    if verbose:
+        for itarget, target in enumerate(targets):
+            if volume_similarities[itarget] > 0:
                 print('target: {0}, dice: {1:.2f}, jacc: {2:.2f}'.format(
-                      target, dice, jacc))
+                      target, dice_overlaps[itarget],
+                      jacc_overlaps[itarget]))
 
     # Save output:
     if save_output:
-        #np.savetxt(output_file, overlaps, fmt='%d %.4f %.4f',
-        #           delimiter='\t', newline='\n')
         df1 = pd.DataFrame({'ID': targets})
         df2 = pd.DataFrame({'Dice overlap': dice_overlaps})
         df3 = pd.DataFrame({'Jaccard overlap': jacc_overlaps})
-        df = pd.concat([df1, df2, df3], axis=1)
+        df4 = pd.DataFrame({'Volume similarity': volume_similarities})
+        df = pd.concat([df1, df2, df3, df4], axis=1)
         df.to_csv(output_file, index=False)
 
     return dice_overlaps, jacc_overlaps, output_file
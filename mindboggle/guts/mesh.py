@@ -135,6 +135,71 @@ def find_neighbors(faces, npoints):
     return neighbor_lists
 
 
+def adjacency_matrix(faces=[], neighbor_lists=[], npoints=0):
+    """
+    Construct a sparse vertex adjacency matrix of a triangular mesh.
+
+    The matrix is built either from faces or from neighbor lists
+    (see find_neighbors()), and is the input to the connected-component
+    and graph functions in scipy.sparse.csgraph.
+
+    Parameters
+    ----------
+    faces : list of lists of three integers or Mx3 numpy array
+        the integers for each face are indices to vertices, starting from zero
+    neighbor_lists : list of lists of integers
+        each list contains indices to neighboring vertices for each vertex
+        (used if faces is empty)
+    npoints: integer
+        number of vertices on the mesh (if 0, inferred from neighbor_lists
+        or from the largest index in faces)
+
+    Returns
+    -------
+    adjacency : scipy.sparse.csr_matrix of booleans
+        symmetric npoints x npoints matrix, True for each pair of
+        vertices that share an edge
+
+    Examples
+    --------
+    >>> from mindboggle.guts.mesh import adjacency_matrix
+    >>> faces = [[0,1,2],[0,2,3],[0,3,4],[0,1,4],[4,3,1]]
+    >>> adjacency = adjacency_matrix(faces, npoints=6)
+    >>> adjacency.shape
+    (6, 6)
+    >>> adjacency[0].indices.tolist()
+    [1, 2, 3, 4]
+    >>> neighbor_lists = [[1, 2, 3, 4], [0, 2, 4, 3], [0, 1, 3], [0, 2, 4, 1],
+    ...                   [0, 3, 1], []]
+    >>> (adjacency != adjacency_matrix(neighbor_lists=neighbor_lists)).nnz
+    0
+
+    """
+    import numpy as np
+    from scipy.sparse import coo_matrix
+
+    if len(faces):
+        faces = np.asarray(faces, dtype=np.int64)
+        if not npoints:
+            npoints = int(faces.max()) + 1
+        rows = faces[:, [0, 1, 2, 1, 2, 0]].ravel()
+        cols = faces[:, [1, 2, 0, 0, 1, 2]].ravel()
+    else:
+        if not npoints:
+            npoints = len(neighbor_lists)
+        sizes = [len(x) for x in neighbor_lists]
+        rows = np.repeat(np.arange(len(neighbor_lists)), sizes)
+        cols = np.fromiter((x for neighbors in neighbor_lists
+                            for x in neighbors), dtype=np.int64,
+                           count=int(np.sum(sizes)))
+
+    adjacency = coo_matrix((np.ones(len(rows), dtype=bool), (rows, cols)),
+                           shape=(npoints, npoints)).tocsr()
+    adjacency.sum_duplicates()
+
+    return adjacency
+
+
 def find_neighbors_vertex(faces, index):
     """
     Find neighbors to a surface mesh vertex.
@@ -240,6 +305,132 @@ def find_neighborhood(neighbor_lists, indices, nedges=1):
     return neighborhood
 
 
+def pad_neighbor_lists(neighbor_lists, indices, pad_value=-1):
+    """
+    Construct a 2-D array of neighbor indices for given surface mesh vertices.
+
+    Each row contains the neighbors of one vertex, padded with pad_value
+    to the maximum number of neighbors, so that neighborhoods of many
+    vertices can be gathered with a single array index operation.
+
+    Parameters
+    ----------
+    neighbor_lists : list of lists of integers
+        each list contains indices to neighboring vertices for each vertex
+    indices : list or numpy array of integers
+        indices of surface vertices (one row for each)
+    pad_value : integer
+        value for empty array elements
+
+    Returns
+    -------
+    neighbor_array : numpy array of integers
+        len(indices) x (maximum number of neighbors) array of neighbor indices
+
+    Examples
+    --------
+    >>> from mindboggle.guts.mesh import pad_neighbor_lists
+    >>> neighbor_lists = [[0,1],[0,2],[1,4,5],[2],[],[0,1,4,5]]
+    >>> pad_neighbor_lists(neighbor_lists, [1,3,4,5]).tolist()
+    [[0, 2, -1, -1], [2, -1, -1, -1], [-1, -1, -1, -1], [0, 1, 4, 5]]
+
+    """
+    import numpy as np
+    from itertools import chain
+
+    indices = np.asarray(indices, dtype=int).ravel()
+    nneighbors = np.array([len(neighbor_lists[x]) for x in indices],
+                          dtype=int)
+    max_nneighbors = nneighbors.max() if nneighbors.size else 0
+
+    neighbor_array = pad_value * np.ones((len(indices), max_nneighbors),
+                                         dtype=int)
+    if nneighbors.sum():
+        flat = np.fromiter(chain.from_iterable(neighbor_lists[x]
+                                               for x in indices),
+                           dtype=int, count=nneighbors.sum())
+        rows = np.repeat(np.arange(len(indices)), nneighbors)
+        starts = np.cumsum(nneighbors) - nneighbors
+        columns = np.arange(len(flat)) - np.repeat(starts, nneighbors)
+        neighbor_array[rows, columns] = flat
+
+    return neighbor_array
+
+
+def find_neighborhood_pairs(neighbor_lists, indices, nedges=1):
+    """
+    Find vertices in the neighborhood of each of many surface mesh vertices.
+
+    This is a multi-source version of find_neighborhood(): all of the
+    neighborhoods are grown together, one edge at a time, by propagating
+    (source, vertex) pairs rather than by running a separate search
+    for each source vertex.
+
+    Parameters
+    ----------
+    neighbor_lists : list of lists of integers
+        each list contains indices to neighboring vertices for each vertex
+    indices : list of integers
+        indices of (unique) source vertices
+    nedges : integer
+        number of edges to propagate from each source vertex
+
+    Returns
+    -------
+    sources : numpy array of integers
+        positions in indices of the source vertex for each pair
+    neighbors : numpy array of integers
+        indices to vertices in the neighborhood of each pair's source
+        (the source vertex itself is excluded, as in find_neighborhood)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.mesh import find_neighborhood_pairs
+    >>> neighbor_lists = [[0,1],[0,2],[1,4,5],[2],[],[0,1,4,5]]
+    >>> sources, neighbors = find_neighborhood_pairs(neighbor_lists,
+    ...                                              [1,3,4], 2)
+    >>> [sorted(neighbors[sources == i].tolist()) for i in range(3)]
+    [[0, 2, 4, 5], [1, 2, 4, 5], []]
+
+    """
+    import numpy as np
+
+    from mindboggle.guts.mesh import pad_neighbor_lists
+
+    indices = np.asarray(indices, dtype=int).ravel()
+    nvertices = len(neighbor_lists)
+
+    # Encode each (source, vertex) pair as a single integer:
+    seen = np.arange(len(indices)) * nvertices + indices
+    frontier = seen.copy()
+    found = []
+    for iedge in range(nedges):
+        if not frontier.size:
+            break
+
+        # Expand all frontier vertices for all sources at once:
+        vertices, inverse = np.unique(frontier % nvertices,
+                                      return_inverse=True)
+        neighbor_array = pad_neighbor_lists(neighbor_lists, vertices)
+        candidates = neighbor_array[inverse.ravel()]
+        sources = np.repeat(frontier // nvertices, candidates.shape[1])
+        candidates = candidates.ravel()
+        keep = candidates >= 0
+        codes = np.unique(sources[keep] * nvertices + candidates[keep])
+
+        # Remove pairs that have already been reached:
+        frontier = codes[~np.isin(codes, seen, assume_unique=True)]
+        seen = np.union1d(seen, frontier)
+        found.append(frontier)
+
+    if found:
+        codes = np.concatenate(found)
+    else:
+        codes = np.array([], dtype=int)
+
+    return codes // nvertices, codes % nvertices
+
+
 def find_endpoints(indices, neighbor_lists):
     """
     Extract endpoints from connected set of vertices.
@@ -752,11 +943,14 @@ def decimate(points, faces, reduction=0.75, smooth_steps=25,
     """
     Decimate vtk triangular mesh with vtk.vtkDecimatePro.
 
+    The vtk mesh is built from (and returned as) numpy arrays
+    through vtk.util.numpy_support, rather than point by point.
+
     Parameters
     ----------
-    points : list of lists of floats
+    points : list of lists of floats or Nx3 numpy array
         each element is a list of 3-D coordinates of a vertex on a surface mesh
-    faces : list of lists of integers
+    faces : list of lists of integers or Mx3 numpy array
         each element is list of 3 indices of vertices that form a face
         on a surface mesh
     reduction : float
@@ -772,12 +966,12 @@ def decimate(points, faces, reduction=0.75, smooth_steps=25,
 
     Returns
     -------
-    points : list of lists of floats
+    points : numpy array of floats
         decimated points
-    faces : list of lists of integers
+    faces : numpy array of integers
         decimated faces
-    scalars : list of integers or floats
-        scalars for output VTK file
+    scalars : numpy array of floats
+        scalars for output VTK file (empty if no scalars)
     output_vtk : string
         output decimated vtk file
 
@@ -808,34 +1002,34 @@ def decimate(points, faces, reduction=0.75, smooth_steps=25,
 
     """
     import os
+    import numpy as np
     import vtk
+    from vtk.util import numpy_support
 
     # ------------------------------------------------------------------------
     # vtk points:
     # ------------------------------------------------------------------------
     vtk_points = vtk.vtkPoints()
-    [vtk_points.InsertPoint(i, x[0], x[1], x[2]) for i,x in enumerate(points)]
+    vtk_points.SetData(numpy_support.numpy_to_vtk(
+        np.ascontiguousarray(points, dtype=np.float64), deep=True))
 
     # ------------------------------------------------------------------------
-    # vtk faces:
+    # vtk faces (each cell is stored as: 3, index1, index2, index3):
     # ------------------------------------------------------------------------
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    cells = np.hstack((3 * np.ones((len(faces), 1), dtype=np.int64), faces))
     vtk_faces = vtk.vtkCellArray()
-    for face in faces:
-        vtk_face = vtk.vtkPolygon()
-        vtk_face.GetPointIds().SetNumberOfIds(3)
-        vtk_face.GetPointIds().SetId(0, face[0])
-        vtk_face.GetPointIds().SetId(1, face[1])
-        vtk_face.GetPointIds().SetId(2, face[2])
-        vtk_faces.InsertNextCell(vtk_face)
+    vtk_faces.SetCells(len(faces), numpy_support.numpy_to_vtkIdTypeArray(
+        np.ascontiguousarray(cells.ravel()), deep=True))
 
     # ------------------------------------------------------------------------
     # vtk scalars:
     # ------------------------------------------------------------------------
-    if scalars:
-        vtk_scalars = vtk.vtkFloatArray()
+    use_scalars = len(scalars) > 0
+    if use_scalars:
+        vtk_scalars = numpy_support.numpy_to_vtk(
+            np.ascontiguousarray(scalars, dtype=np.float32), deep=True)
         vtk_scalars.SetName("scalars")
-        for scalar in scalars:
-            vtk_scalars.InsertNextValue(scalar)
 
     # ------------------------------------------------------------------------
     # vtkPolyData:
@@ -843,7 +1037,7 @@ def decimate(points, faces, reduction=0.75, smooth_steps=25,
     polydata = vtk.vtkPolyData()
     polydata.SetPoints(vtk_points)
     polydata.SetPolys(vtk_faces)
-    if scalars:
+    if use_scalars:
         polydata.GetPointData().SetScalars(vtk_scalars)
 
     # ------------------------------------------------------------------------
@@ -910,24 +1104,137 @@ def decimate(points, faces, reduction=0.75, smooth_steps=25,
     # ------------------------------------------------------------------------
     # Extract decimated points, faces, and scalars:
     # ------------------------------------------------------------------------
-    points = [list(out.GetPoint(point_id))
-              for point_id in range(out.GetNumberOfPoints())]
+    if out.GetNumberOfPoints() > 0:
+        points = numpy_support.vtk_to_numpy(out.GetPoints().GetData())
+    else:
+        points = np.zeros((0, 3))
     if out.GetNumberOfPolys() > 0:
-        polys = out.GetPolys()
-        pt_data = out.GetPointData()
-        faces = [[int(polys.GetData().GetValue(j))
-                  for j in range(i*4 + 1, i*4 + 4)]
-                  for i in range(polys.GetNumberOfCells())]
-        if scalars:
-            scalars = [pt_data.GetScalars().GetValue(i)
-                       for i in range(len(points))]
+        faces = numpy_support.vtk_to_numpy(
+            out.GetPolys().GetData()).reshape(-1, 4)[:, 1:].astype(int)
+        if use_scalars:
+            scalars = numpy_support.vtk_to_numpy(
+                out.GetPointData().GetScalars())
+        else:
+            scalars = np.array([])
     else:
-        faces = []
-        scalars = []
+        faces = np.zeros((0, 3), dtype=int)
+        scalars = np.array([])
 
     return points, faces, scalars, output_vtk
 
 
+def decimate_pyramid(points, faces, reductions=[0.5, 0.75, 0.9],
+                     smooth_steps=25, cache_dir=''):
+    """
+    Decimate a triangular mesh to several resolutions, cached on disk.
+
+    Each mesh is cached in one .npz file named after a hash of its
+    points, faces and smoothing steps, so the same surface (or labeled
+    region of a surface) is decimated only once across runs, and any
+    resolution in the pyramid can be picked without decimating again.
+    Resolutions missing from the cache are computed and added to it.
+
+    Parameters
+    ----------
+    points : list of lists of floats or Nx3 numpy array
+        each element is a list of 3-D coordinates of a vertex on a surface mesh
+    faces : list of lists of integers or Mx3 numpy array
+        each element is list of 3 indices of vertices that form a face
+        on a surface mesh
+    reductions : list of floats
+        fractions of mesh faces to remove, one per resolution
+    smooth_steps : integer
+        number of smoothing steps
+    cache_dir : string
+        directory of cached pyramids ('' to decimate without caching)
+
+    Returns
+    -------
+    pyramid : dictionary
+        (points, faces) numpy arrays for each reduction (key)
+    cache_file : string
+        name of the cache file ('' if not cached)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.mesh import decimate_pyramid
+    >>> from mindboggle.mio.vtks import read_vtk
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> input_vtk = fetch_data(urls['left_freesurfer_labels'], '', '.vtk')
+    >>> points, f1, f2, faces, scalars, f3, f4, f5 = read_vtk(input_vtk)
+    >>> pyramid, cache_file = decimate_pyramid(points, faces, [0.5, 0.75],
+    ...     25, 'decimate_pyramid')
+    >>> points2, faces2 = pyramid[0.5]
+    >>> (len(points), len(points2))
+    (145069, 72535)
+    >>> (len(faces), len(faces2))
+    (290134, 145066)
+
+    """
+    import os
+    import hashlib
+    import numpy as np
+
+    from mindboggle.guts.mesh import decimate
+
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    faces = np.ascontiguousarray(faces, dtype=np.int64)
+
+    def level_name(reduction):
+        return '{0:g}'.format(reduction)
+
+    # ------------------------------------------------------------------------
+    # Load cached resolutions:
+    # ------------------------------------------------------------------------
+    pyramid = {}
+    cache_file = ''
+    if cache_dir:
+        mesh_hash = hashlib.sha1()
+        mesh_hash.update(points.tobytes())
+        mesh_hash.update(faces.tobytes())
+        mesh_hash.update(str(smooth_steps).encode())
+        cache_file = os.path.join(cache_dir, 'decimated_{0}.npz'.
+                                  format(mesh_hash.hexdigest()))
+        if os.path.exists(cache_file):
+            cached = np.load(cache_file)
+            for reduction in reductions:
+                name = level_name(reduction)
+                if 'points_' + name in cached.files:
+                    pyramid[reduction] = (cached['points_' + name],
+                                          cached['faces_' + name])
+
+    # ------------------------------------------------------------------------
+    # Decimate to missing resolutions and update the cache:
+    # ------------------------------------------------------------------------
+    missing = [x for x in reductions if x not in pyramid]
+    for reduction in missing:
+        points2, faces2, foo1, foo2 = decimate(points, faces, reduction,
+                                               smooth_steps, [], False)
+        pyramid[reduction] = (points2, faces2)
+
+    if cache_file and missing:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        levels = {}
+        if os.path.exists(cache_file):
+            cached = np.load(cache_file)
+            levels = dict((x, cached[x]) for x in cached.files)
+        for reduction in missing:
+            name = level_name(reduction)
+            levels['points_' + name], levels['faces_' + name] = \
+                pyramid[reduction]
+
+        # Write to a temporary file first so that concurrent runs
+        # never read a partially written cache:
+        temp_file = '{0}.{1}.npz'.format(cache_file[:-len('.npz')],
+                                         os.getpid())
+        np.savez(temp_file, **levels)
+        os.replace(temp_file, cache_file)
+
+    return pyramid, cache_file
+
+
 def decimate_file(input_vtk, reduction=0.5, smooth_steps=100,
                   save_vtk=True, output_vtk=''):
     """
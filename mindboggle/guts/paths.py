@@ -912,56 +912,167 @@ def track_segments(seed, segments, neighbor_lists, values, sink,
     """
     import numpy as np
 
-    if not sink:
-        import sys
-        sys.exit('Missing sink vertices.')
+    from mindboggle.guts.paths import track_rings
 
-    track = [seed]
+    rings = -1 * np.ones(len(neighbor_lists), dtype=int)
     for isegment, segment in enumerate(segments):
+        rings[segment] = isegment
 
-        # Find the seed's neighborhood N in the segment:
-        N = neighbor_lists[seed]
-        N = [x for x in N if values[x] != background_value]
-        segment_set = set(segment)
-        N_segment = list(segment_set.intersection(frozenset(N)))
-        if N:
-
-            # Add the neighborhood vertex with the maximum value to the track:
-            if N_segment:
-                seed = N_segment[np.argmax(values[N_segment])]
-                track.append(seed)
-
-                # If the track has run into the region's border, return the track:
-                #if list(set(N_segment).intersection(sink)):
-                if seed in sink:
-                    return track
-
-            # If there is no neighbor in the new segment,
-            # back up to the previous segment:
-            elif isegment > 0:
-                bridge = []
-                max_bridge = 0
-                N_previous = list(set(N).intersection(segments[isegment-1]))
-                for Np in N_previous:
-                    N_next = list(segment_set.intersection(neighbor_lists[Np]))
-                    if N_next:
-                        if np.max(values[N_next]) > max_bridge:
-                            seed = N_next[np.argmax(values[N_next])]
-                            bridge = [Np, seed]
-                            max_bridge = np.max(values[N_next])
-                if bridge:
-                    track.extend(bridge)
-
-                    # If the track has run into the region's border, return the track:
-                    if seed in sink:
-                        return track
-
-        # If there is no neighborhood for the seed, return None:
-        else:
-            return None
+    track = track_rings([seed], rings, neighbor_lists, values, sink,
+                        background_value)[0]
+
+    return track
+
+
+def track_rings(seeds, rings, neighbor_lists, values, sink,
+                background_value=-1):
+    """
+    Build tracks from many seed vertices together through concentric rings.
+
+    This is the multi-seed version of track_segments(): all tracks advance
+    in lockstep from one ring to the next, and each step for all of them
+    is taken with array operations on padded neighbor arrays, so that
+    the cost is linear in the number of region vertices.
+
+    At each ring, a track moves to the neighbor in the ring with the
+    maximum value. If there is no such neighbor, the track bridges
+    from a neighbor in the previous ring to the ring (if any bridge vertex
+    has a positive value). A track ends when it reaches a sink vertex.
+
+    Parameters
+    ----------
+    seeds : list of integers
+        indices to initial seed vertices from which to grow tracks
+    rings : numpy array of integers
+        ring number for each vertex (-1 outside the rings;
+        see segment.find_ring_indices())
+    neighbor_lists : list of lists of integers
+        indices to neighboring vertices for each vertex
+    values : numpy array of floats
+        values for all vertices that help to guide the tracks
+    sink : list of integers
+        indices for vertices that end a track
+    background_value : integer
+        background value
+
+    Returns
+    -------
+    tracks : list of lists of integers (or None)
+        indices of ordered vertices for each seed's track
+        (None if the track does not reach the sink)
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.guts.paths import track_rings
+    >>> neighbor_lists = [[1,2],[0,3],[0,3,4],[1,2,5],[2,5],[3,4]]
+    >>> rings = np.array([-1, 0, 0, 1, 1, 2])
+    >>> values = np.array([0, 1, 2, 1, 3, 1])
+    >>> track_rings([0], rings, neighbor_lists, values, [5])
+    [[0, 2, 4, 5]]
+    >>> track_rings([0, 1], rings, neighbor_lists, values, [4])
+    [[0, 2, 4], None]
+
+    """
+    import numpy as np
+
+    from mindboggle.guts.mesh import pad_neighbor_lists
+
+    if not len(sink):
+        import sys
+        sys.exit('Missing sink vertices.')
+
+    seeds = np.asarray(seeds, dtype=int).ravel()
+    nvertices = len(neighbor_lists)
+
+    # Append a sentinel vertex (index -1) for padded neighbor elements:
+    rings = np.append(np.asarray(rings, dtype=int), -1)
+    values = np.append(np.asarray(values, dtype=float), background_value)
+    is_sink = np.zeros(nvertices + 1, dtype=bool)
+    is_sink[sink] = True
+
+    # Neighbors of seed and ring vertices (the only vertices ever visited),
+    # with an extra row of padding for all other vertices:
+    local = np.union1d(seeds, np.where(rings[:-1] >= 0)[0])
+    neighbor_array = pad_neighbor_lists(neighbor_lists, local)
+    neighbor_array = np.vstack((neighbor_array,
+                                -1 * np.ones(neighbor_array.shape[1],
+                                             dtype=int)))
+    lookup = len(local) * np.ones(nvertices + 1, dtype=int)
+    lookup[local] = np.arange(len(local))
+
+    current = seeds.copy()
+    active = np.ones(len(seeds), dtype=bool)
+    reached = np.zeros(len(seeds), dtype=bool)
+    steps_walkers = [np.arange(len(seeds))]
+    steps_vertices = [seeds]
+    nrings = rings.max() + 1
+    for iring in range(nrings):
+        walkers = np.where(active)[0]
+        if not walkers.size:
+            break
+
+        # Find each seed's neighborhood N (excluding background values):
+        N = neighbor_array[lookup[current[walkers]]]
+        in_N = values[N] != background_value
+
+        # If there is no neighborhood for a seed, end its track:
+        has_N = in_N.any(axis=1)
+        active[walkers[~has_N]] = False
+        walkers, N, in_N = walkers[has_N], N[has_N], in_N[has_N]
+        rows = np.arange(len(walkers))
+
+        # Add the neighborhood vertex in the ring with the maximum value:
+        in_ring = in_N & (rings[N] == iring)
+        stepped = in_ring.any(axis=1)
+        best = N[rows, np.argmax(np.where(in_ring, values[N], -np.inf),
+                                 axis=1)]
+        moved = walkers[stepped]
+        current[moved] = best[stepped]
+        steps_walkers.append(moved)
+        steps_vertices.append(best[stepped])
+
+        # If there is no neighbor in the ring,
+        # bridge from a neighbor in the previous ring:
+        if iring > 0 and not stepped.all():
+            bridging = walkers[~stepped]
+            Nb = N[~stepped]
+            in_previous = in_N[~stepped] & (rings[Nb] == iring - 1)
+            NN = neighbor_array[lookup[Nb]]
+            bridge_values = values[NN]
+            in_bridge = in_previous[:, :, np.newaxis] & \
+                        (rings[NN] == iring) & (bridge_values > 0)
+            bridge_values = np.where(in_bridge, bridge_values, -np.inf)
+            bridge_values = bridge_values.reshape(len(bridging), -1)
+            Ibest = np.argmax(bridge_values, axis=1)
+            bridged = np.isfinite(bridge_values[np.arange(len(bridging)),
+                                                Ibest])
+            Ibest = Ibest[bridged]
+            brows = np.where(bridged)[0]
+            previous = Nb[brows, Ibest // NN.shape[2]]
+            bridge = NN[brows, Ibest // NN.shape[2], Ibest % NN.shape[2]]
+            bridging = bridging[bridged]
+            current[bridging] = bridge
+            steps_walkers.extend([bridging, bridging])
+            steps_vertices.extend([previous, bridge])
+            moved = np.concatenate((moved, bridging))
+
+        # If a track has run into the region's border, end the track:
+        done = moved[is_sink[current[moved]]]
+        reached[done] = True
+        active[done] = False
+
+    # Gather the vertices of each track in the order they were visited:
+    steps_walkers = np.concatenate(steps_walkers)
+    steps_vertices = np.concatenate(steps_vertices)
+    order = np.argsort(steps_walkers, kind='mergesort')
+    bounds = np.cumsum(np.bincount(steps_walkers, minlength=len(seeds)))
+    vertices = np.split(steps_vertices[order], bounds[:-1])
+    tracks = [vertices[i].tolist() if reached[i] else None
+              for i in range(len(seeds))]
+
+    return tracks
 
-    # If the track remains empty or does not reach the border, return the track:
-    return None
 
 def find_outer_endpoints(indices, neighbor_lists, values, values_seeding,
                          min_separation=10, background_value=-1,
@@ -972,7 +1083,7 @@ def find_outer_endpoints(indices, neighbor_lists, values, values_seeding,
 
     This algorithm propagates multiple tracks from seed vertices
     at a given depth within a region of a surface mesh to the boundary
-    of the region (via the track_segments() function).
+    of the region (via the track_rings() function).
     The tracks terminate at boundary vertices that can serve as endpoints
     of fundus curves running along the depths of a fold.
 
@@ -1051,10 +1162,10 @@ def find_outer_endpoints(indices, neighbor_lists, values, values_seeding,
     """
     import numpy as np
 
-    from mindboggle.guts.segment import extract_borders
-    from mindboggle.guts.segment import segment_rings
-    from mindboggle.guts.paths import track_segments
-    from mindboggle.guts.mesh import find_neighborhood
+    from mindboggle.guts.segment import find_ring_indices
+    from mindboggle.guts.paths import track_rings
+    from mindboggle.guts.mesh import pad_neighbor_lists, \
+        find_neighborhood_pairs
 
     # ------------------------------------------------------------------------
     # Settings:
@@ -1065,27 +1176,44 @@ def find_outer_endpoints(indices, neighbor_lists, values, values_seeding,
     do_filter_tracks = True
 
     # Initialize R, T, S, V:
-    R = indices[:]
-    T = []
+    R = np.asarray(indices, dtype=int)
     S = np.array(values_seeding)
     V = np.array(values)
+    nvertices = len(neighbor_lists)
+
+    def region_borders(region):
+        """
+        Find vertices with neighbors both inside and outside of a region.
+
+        This gives the same vertices as extract_borders() applied to all
+        vertices labeled by region membership, but only visits the region
+        and its immediate neighbors.
+        """
+        in_region = np.zeros(nvertices + 1, dtype=bool)
+        in_region[region] = True
+        candidates = np.union1d(region,
+                                pad_neighbor_lists(neighbor_lists, region))
+        candidates = candidates[candidates >= 0]
+        N = pad_neighbor_lists(neighbor_lists, candidates)
+        is_neighbor = N >= 0
+        inside = (in_region[N] & is_neighbor).any(axis=1)
+        outside = (~in_region[N] & is_neighbor).any(axis=1)
+
+        return candidates[inside & outside]
 
     # ------------------------------------------------------------------------
     # Extract region boundary:
     # ------------------------------------------------------------------------
-    B = np.ones(len(V))
-    B[indices] = 2
-    borders, foo1, foo2 = extract_borders(list(range(len(B))), B,
-                                          neighbor_lists)
+    borders = region_borders(R)
 
     # ------------------------------------------------------------------------
     # Initialize seeds with vertices at the median-depth boundary:
     # ------------------------------------------------------------------------
     if do_threshold:
-        thresholdS = np.median(S[indices]) #+ np.std(S[indices])
-        indices_high = [x for x in indices if S[x] >= thresholdS]
+        thresholdS = np.median(S[R]) #+ np.std(S[R])
+        indices_high = R[S[R] >= thresholdS]
         # Make sure threshold is within the maximum values of the boundary:
-        if list(frozenset(indices_high).intersection(borders)):
+        if np.intersect1d(indices_high, borders).size:
             do_threshold = False
         else:
             if verbose:
@@ -1095,34 +1223,31 @@ def find_outer_endpoints(indices, neighbor_lists, values, values_seeding,
     # Or initialize seeds with vertices at the shrunken region boundary:
     # ------------------------------------------------------------------------
     if not do_threshold:
-        thresholdS = remove_fraction * np.max(S[indices])
+        thresholdS = remove_fraction * np.max(S[R])
         if verbose:
             print('  Initialize seeds at {0:.2f} of fold depth'.
                 format(1-remove_fraction))
 
     # Extract threshold boundary vertices as seeds:
-    indices_high = [x for x in indices if S[x] >= thresholdS]
-    B = np.ones(len(S))
-    B[indices_high] = 2
-    seeds, foo1, foo2 = extract_borders(list(range(len(S))), B,
-                                        neighbor_lists)
+    indices_high = R[S[R] >= thresholdS]
+    seeds = region_borders(indices_high)
 
     # ------------------------------------------------------------------------
-    # Segment the mesh from the seeds iteratively toward the boundary:
+    # Number the concentric rings of the mesh from the seeds
+    # toward the boundary:
     # ------------------------------------------------------------------------
-    R = list(frozenset(R).difference(indices_high))
-    R = list(frozenset(R).difference(seeds))
-    segments = segment_rings(R, seeds, neighbor_lists, 1, background_value)
+    R = np.setdiff1d(R, indices_high)
+    R = np.setdiff1d(R, seeds)
+    rings = find_ring_indices(R, seeds, neighbor_lists)
 
-    # Run tracks from the seeds through the segments toward the boundary:
+    # Run tracks from all of the seeds together through the rings
+    # toward the boundary:
     if verbose:
         print('    Track through {0} concentric segments ({1} vertices) '
-            'from threshold {2:0.2f}'.format(len(segments), len(R), thresholdS))
-    for seed in seeds:
-        track = track_segments(seed, segments, neighbor_lists, V, borders,
-                               background_value)
-        if track:
-            T.append(track)
+            'from threshold {2:0.2f}'.format(rings.max() + 1, len(R),
+                                             thresholdS))
+    T = [x for x in track_rings(seeds, rings, neighbor_lists, V, borders,
+                                background_value) if x]
 
     # ------------------------------------------------------------------------
     # Filter the tracks in two ways:
@@ -1137,49 +1262,46 @@ def find_outer_endpoints(indices, neighbor_lists, values, values_seeding,
             print('    Filter {0} tracks'.format(len(T)))
 
         # Compute median track values:
-        Tvalues = [np.median(V[x]) for x in T]
+        Tvalues = np.array([np.median(V[x]) for x in T])
 
         # Keep tracks with a high median track value:
         #background = np.median(V[indices])
         #background = np.median(Tvalues) + np.std(Tvalues)
         background = np.median(V[R]) + np.std(V[R])
-        Ihigh = [i for i,x in enumerate(T) if Tvalues[i] > background]
+        Ihigh = np.where(Tvalues > background)[0]
         T = [T[i] for i in Ihigh]
-        Tvalues = [Tvalues[i] for i in Ihigh]
+        Tvalues = Tvalues[Ihigh]
 
         # Gather endpoint vertex indices:
-        E = [x[-1] for x in T]
+        E = np.array([x[-1] for x in T], dtype=int)
+
+        # Find which endpoints are near each other (or the same vertex)
+        # with one search from all of the endpoints:
+        Eunique, Iunique = np.unique(E, return_inverse=True)
+        Iunique = Iunique.ravel()
+        near = np.eye(len(Eunique), dtype=bool)
+        sources, neighbors = find_neighborhood_pairs(neighbor_lists,
+                                                     Eunique, min_separation)
+        is_endpoint = np.isin(neighbors, Eunique)
+        near[sources[is_endpoint],
+             np.searchsorted(Eunique, neighbors[is_endpoint])] = True
 
         # Loop through endpoints:
         E2 = []
         T2 = []
-        while E:
-
-            # Find endpoints close to the first endpoint:
-            near = find_neighborhood(neighbor_lists, [E[0]], min_separation)
-            Isame = [i for i,x in enumerate(E) if x == E[0]]
-            Inear = [i for i,x in enumerate(E) if x in near]
-            if Inear or len(Isame) > 1:
-                Inear.extend(Isame)
-
-                # Select endpoint with the maximum median track value:
-                Imax = Inear[np.argmax([Tvalues[i] for i in Inear])]
-                E2.append(E[Imax])
+        remaining = np.ones(len(E), dtype=bool)
+        for iE in range(len(E)):
+            if remaining[iE]:
+
+                # Select the endpoint (among those close to this endpoint)
+                # with the maximum median track value:
+                Inear = np.where(remaining & near[Iunique[iE], Iunique])[0]
+                Imax = Inear[np.argmax(Tvalues[Inear])]
+                E2.append(int(E[Imax]))
                 T2.append(T[Imax])
 
                 # Keep data for points that are not nearby for the next loop:
-                Ikeep = [i for i in range(len(E)) if i not in Inear]
-                E = [E[i] for i in Ikeep]
-                T = [T[i] for i in Ikeep]
-                Tvalues = [Tvalues[i] for i in Ikeep]
-
-            # If nothing nearby, simply keep the endpoint:
-            else:
-                E2.append(E[0])
-                T2.append(T[0])
-                del(E[0])
-                del(T[0])
-                del(Tvalues[0])
+                remaining[Inear] = False
 
         endpoints = E2
         endtracks = T2
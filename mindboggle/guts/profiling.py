@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+"""
+Profile the run time and resource use of nipype workflow nodes.
+
+A NodeProfiler is passed to a nipype plugin as its status_callback, and
+records for each node its wall time, CPU time, peak resident memory, and
+bytes read and written, optionally with the Python functions that took
+the most time. Profiles are saved per subject (json and csv) and can be
+summarized across subjects to plan capacity and spot regressions.
+
+Nodes run in the calling process by the Linear plugin are measured
+directly (CPU time and I/O include child processes such as the C++
+tools). Nodes run in worker processes (MultiProc, etc.) are measured by
+nipype's resource monitor, which provides duration, peak memory and CPU
+usage but not I/O or function timings.
+
+Copyright 2016,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
+
+"""
+
+# Columns of node profile tables:
+PROFILE_COLUMNS = ['subject', 'node', 'iteration', 'status', 'start',
+                   'wall_seconds', 'cpu_seconds', 'peak_rss_mb',
+                   'read_bytes', 'write_bytes']
+
+
+# ----------------------------------------------------------------------------
+# Process measures
+# ----------------------------------------------------------------------------
+def process_io():
+    """
+    Return bytes read and written by this process and its waited-for
+    children (Linux /proc/self/io).
+
+    Returns
+    -------
+    read_bytes : integer or None
+        bytes read from storage (None if not available)
+    write_bytes : integer or None
+        bytes written to storage (None if not available)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.profiling import process_io
+    >>> read_bytes, write_bytes = process_io()
+
+    """
+    read_bytes = None
+    write_bytes = None
+    try:
+        with open('/proc/self/io', 'r') as fid:
+            for line in fid:
+                key, value = line.split(':')
+                if key == 'read_bytes':
+                    read_bytes = int(value)
+                elif key == 'write_bytes':
+                    write_bytes = int(value)
+    except (IOError, OSError, ValueError):
+        pass
+
+    return read_bytes, write_bytes
+
+
+def process_cpu_seconds():
+    """
+    Return CPU time (user + system) of this process and its waited-for
+    children.
+
+    Examples
+    --------
+    >>> from mindboggle.guts.profiling import process_cpu_seconds
+    >>> process_cpu_seconds() > 0
+    True
+
+    """
+    import os
+
+    times = os.times()
+
+    return times[0] + times[1] + times[2] + times[3]
+
+
+def peak_rss_mb(reset=False):
+    """
+    Return the peak resident memory of this process (Linux VmHWM).
+
+    Parameters
+    ----------
+    reset : bool
+        reset the peak to the current resident memory after reading it
+        (Linux 4.0 and later)?
+
+    Returns
+    -------
+    peak : float or None
+        peak resident memory in megabytes (None if not available)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.profiling import peak_rss_mb
+    >>> peak = peak_rss_mb()
+
+    """
+    peak = None
+    try:
+        with open('/proc/self/status', 'r') as fid:
+            for line in fid:
+                if line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024.0
+                    break
+        if reset:
+            with open('/proc/self/clear_refs', 'w') as fid:
+                fid.write('5')
+    except (IOError, OSError, ValueError):
+        pass
+
+    return peak
+
+
+# ----------------------------------------------------------------------------
+# Node profiler
+# ----------------------------------------------------------------------------
+class NodeProfiler(object):
+    """
+    Nipype status callback that profiles each node of a workflow.
+
+    Parameters
+    ----------
+    subject : string
+        subject name recorded with each node (unless the node is
+        parameterized by a 'subject' iterable)
+    in_process : bool
+        are nodes run in this process (Linear plugin)?
+    sample_functions : bool
+        record the Python functions that took the most time in each node
+        (only for nodes run in this process)?
+    nfunctions : integer
+        number of functions to record per node
+
+    Attributes
+    ----------
+    records : list of dictionaries
+        one dictionary per finished node, with keys PROFILE_COLUMNS
+        and 'functions' (list of dictionaries, if sample_functions)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.profiling import NodeProfiler
+    >>> class Node(object):
+    ...     fullname = 'Mindboggle.Surface_feature_workflow.Folds.a1'
+    ...     parameterization = ['_hemi_rh']
+    >>> node = Node()
+    >>> profiler = NodeProfiler('arno', sample_functions=True)
+    >>> profiler(node, 'start')
+    >>> x = sorted(range(100000))
+    >>> profiler(node, 'end')
+    >>> record = profiler.records[0]
+    >>> record['node'], record['iteration'], record['status']
+    ('Mindboggle.Surface_feature_workflow.Folds', '_hemi_rh', 'end')
+    >>> record['wall_seconds'] >= 0, len(record['functions']) > 0
+    (True, True)
+
+    """
+    def __init__(self, subject='', in_process=True, sample_functions=False,
+                 nfunctions=20):
+        self.subject = subject
+        self.in_process = in_process
+        self.sample_functions = sample_functions and in_process
+        self.nfunctions = nfunctions
+        self.records = []
+        self._running = {}
+
+    def __call__(self, node, status):
+        import cProfile
+        import time
+
+        key = id(node)
+        if status == 'start':
+            start = {'start': time.time(), 'perf': time.perf_counter()}
+            if self.in_process:
+                start['cpu'] = process_cpu_seconds()
+                start['io'] = process_io()
+                peak_rss_mb(reset=True)
+                if self.sample_functions:
+                    start['profiler'] = cProfile.Profile()
+                    start['profiler'].enable()
+            self._running[key] = start
+        elif key in self._running:
+            start = self._running.pop(key)
+            wall_seconds = time.perf_counter() - start['perf']
+            profiler = start.get('profiler')
+            if profiler:
+                profiler.disable()
+            self.records.append(self._record(node, status, start,
+                                             wall_seconds, profiler))
+
+    def _record(self, node, status, start, wall_seconds, profiler):
+        """
+        Return the profile of a finished node.
+        """
+        import re
+        import time
+
+        fullname = getattr(node, 'fullname', str(node))
+        parameterization = getattr(node, 'parameterization', None) or []
+        subject = self.subject
+        for parameter in parameterization:
+            match = re.search(r'_subject_([^/]+)$', str(parameter))
+            if match:
+                subject = match.group(1)
+        record = {'subject': subject,
+                  'node': re.sub(r'\.a\d+$', '', fullname),
+                  'iteration': '/'.join([str(x) for x in parameterization]),
+                  'status': status,
+                  'start': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                         time.localtime(start['start'])),
+                  'wall_seconds': wall_seconds,
+                  'cpu_seconds': None,
+                  'peak_rss_mb': None,
+                  'read_bytes': None,
+                  'write_bytes': None}
+
+        if self.in_process:
+            record['cpu_seconds'] = process_cpu_seconds() - start['cpu']
+            record['peak_rss_mb'] = peak_rss_mb()
+            read_bytes, write_bytes = process_io()
+            if read_bytes is not None and start['io'][0] is not None:
+                record['read_bytes'] = read_bytes - start['io'][0]
+                record['write_bytes'] = write_bytes - start['io'][1]
+
+        # Measures from nipype's resource monitor (worker processes,
+        # and child processes of command-line interfaces):
+        try:
+            runtime = node.result.runtime
+        except Exception:
+            runtime = None
+        if runtime is not None:
+            mem_peak_gb = getattr(runtime, 'mem_peak_gb', None)
+            if mem_peak_gb:
+                record['peak_rss_mb'] = max(record['peak_rss_mb'] or 0,
+                                            1024.0 * mem_peak_gb)
+            if not self.in_process:
+                duration = getattr(runtime, 'duration', None)
+                cpu_percent = getattr(runtime, 'cpu_percent', None)
+                if duration:
+                    record['wall_seconds'] = duration
+                    if cpu_percent:
+                        record['cpu_seconds'] = duration * cpu_percent / 100.0
+
+        if profiler:
+            record['functions'] = hot_functions(profiler, self.nfunctions)
+
+        return record
+
+
+def hot_functions(profiler, nfunctions=20):
+    """
+    Return the functions that took the most time in a cProfile profile.
+
+    Parameters
+    ----------
+    profiler : cProfile.Profile object
+        disabled profiler
+    nfunctions : integer
+        number of functions to return
+
+    Returns
+    -------
+    functions : list of dictionaries
+        function, file, line, calls, self_seconds and cumulative_seconds,
+        in descending order of self_seconds
+
+    Examples
+    --------
+    >>> import cProfile
+    >>> from mindboggle.guts.profiling import hot_functions
+    >>> profiler = cProfile.Profile()
+    >>> profiler.enable()
+    >>> x = sorted(range(100000))
+    >>> profiler.disable()
+    >>> functions = hot_functions(profiler, 1)
+    >>> functions[0]['function']
+    '<built-in method builtins.sorted>'
+
+    """
+    import pstats
+
+    stats = pstats.Stats(profiler).stats
+    keys = sorted(stats, key=lambda x: stats[x][2], reverse=True)
+    functions = []
+    for filename, line, function in keys[:nfunctions]:
+        ncalls, ncalls_total, self_seconds, cumulative_seconds, callers = \
+            stats[(filename, line, function)]
+        functions.append({'function': function, 'file': filename,
+                          'line': line, 'calls': ncalls_total,
+                          'self_seconds': self_seconds,
+                          'cumulative_seconds': cumulative_seconds})
+
+    return functions
+
+
+# ----------------------------------------------------------------------------
+# Reports
+# ----------------------------------------------------------------------------
+def write_node_profile(records, output_stem):
+    """
+    Save node profiles to a json file and a csv table.
+
+    The json file contains all records, including sampled functions;
+    the csv table contains one row per node (PROFILE_COLUMNS).
+
+    Parameters
+    ----------
+    records : list of dictionaries
+        NodeProfiler records
+    output_stem : string
+        output file path without extension
+
+    Returns
+    -------
+    json_file : string
+        output json file
+    csv_file : string
+        output csv table
+
+    Examples
+    --------
+    >>> import os
+    >>> from mindboggle.guts.profiling import write_node_profile
+    >>> records = [{'subject': 'arno', 'node': 'Mindboggle.Folds',
+    ...             'iteration': '_hemi_lh', 'status': 'end',
+    ...             'start': '2016-01-01T00:00:00', 'wall_seconds': 2.0,
+    ...             'cpu_seconds': 1.5, 'peak_rss_mb': 100.0,
+    ...             'read_bytes': 0, 'write_bytes': 1000}]
+    >>> json_file, csv_file = write_node_profile(records, 'arno_profile')
+    >>> os.path.basename(json_file), os.path.basename(csv_file)
+    ('arno_profile.json', 'arno_profile.csv')
+
+    """
+    import os
+    import json
+    import pandas as pd
+
+    output_dir = os.path.dirname(output_stem)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    json_file = os.path.abspath(output_stem + '.json')
+    with open(json_file, 'w') as fid:
+        json.dump(records, fid, indent=2)
+
+    csv_file = os.path.abspath(output_stem + '.csv')
+    df = pd.DataFrame([[x.get(column) for column in PROFILE_COLUMNS]
+                       for x in records], columns=PROFILE_COLUMNS)
+    df.to_csv(csv_file, index=False)
+
+    return json_file, csv_file
+
+
+def summarize_node_profiles(profile_files, output_file=''):
+    """
+    Summarize node profiles across subjects.
+
+    Parameters
+    ----------
+    profile_files : list of strings
+        json files saved by write_node_profile()
+    output_file : string
+        output csv table (if not empty)
+
+    Returns
+    -------
+    summary : pandas DataFrame
+        per node: number of runs and subjects, failed runs, median, mean
+        and maximum wall and CPU seconds, median and maximum peak memory,
+        and mean bytes read and written, sorted by total wall time
+    output_file : string
+        output csv table
+
+    Examples
+    --------
+    >>> from mindboggle.guts.profiling import write_node_profile
+    >>> from mindboggle.guts.profiling import summarize_node_profiles
+    >>> profile_files = []
+    >>> for subject, seconds in [('arno', 2.0), ('berta', 4.0)]:
+    ...     record = {'subject': subject, 'node': 'Mindboggle.Folds',
+    ...               'iteration': '_hemi_lh', 'status': 'end',
+    ...               'start': '2016-01-01T00:00:00',
+    ...               'wall_seconds': seconds, 'cpu_seconds': seconds,
+    ...               'peak_rss_mb': 100.0, 'read_bytes': None,
+    ...               'write_bytes': 1000}
+    ...     profile_files.append(write_node_profile([record],
+    ...                          subject + '_profile')[0])
+    >>> summary, output_file = summarize_node_profiles(profile_files)
+    >>> summary.loc['Mindboggle.Folds', ['runs', 'subjects', 'failed']].tolist()
+    [2, 2, 0]
+    >>> float(summary.loc['Mindboggle.Folds', 'median_wall_seconds'])
+    3.0
+
+    """
+    import json
+    import pandas as pd
+
+    records = []
+    for profile_file in profile_files:
+        with open(profile_file, 'r') as fid:
+            for record in json.load(fid):
+                records.append([record.get(column)
+                                for column in PROFILE_COLUMNS])
+    df = pd.DataFrame(records, columns=PROFILE_COLUMNS)
+    for column in PROFILE_COLUMNS[5:]:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df['failed'] = df['status'] != 'end'
+
+    groups = df.groupby('node')
+    summary = pd.DataFrame({
+        'runs': groups.size(),
+        'subjects': groups['subject'].nunique(),
+        'failed': groups['failed'].sum().astype(int),
+        'total_wall_seconds': groups['wall_seconds'].sum(),
+        'median_wall_seconds': groups['wall_seconds'].median(),
+        'mean_wall_seconds': groups['wall_seconds'].mean(),
+        'max_wall_seconds': groups['wall_seconds'].max(),
+        'median_cpu_seconds': groups['cpu_seconds'].median(),
+        'max_cpu_seconds': groups['cpu_seconds'].max(),
+        'median_peak_rss_mb': groups['peak_rss_mb'].median(),
+        'max_peak_rss_mb': groups['peak_rss_mb'].max(),
+        'mean_read_bytes': groups['read_bytes'].mean(),
+        'mean_write_bytes': groups['write_bytes'].mean()})
+    summary = summary.sort_values('total_wall_seconds', ascending=False)
+
+    if output_file:
+        summary.to_csv(output_file, index_label='node')
+
+    return summary, output_file
+
+
+def apply_resource_estimates(workflow, summary_file, memory_margin=1.2):
+    """
+    Set nodes' memory and processor estimates from profiles.
+
+    Schedulers such as nipype's MultiProc plugin use these estimates
+    to run as many nodes at once as memory and processors allow.
+
+    Parameters
+    ----------
+    workflow : nipype Workflow
+        workflow whose nodes are profiled in the summary
+    summary_file : string
+        csv table saved by summarize_node_profiles()
+    memory_margin : float
+        multiply maximum peak memory by this factor
+
+    Returns
+    -------
+    estimates : dictionary
+        (memory in GB, number of processors) per node name
+    """
+    import numpy as np
+    import pandas as pd
+
+    summary = pd.read_csv(summary_file, index_col='node')
+
+    estimates = {}
+    for name in workflow.list_node_names():
+        fullname = '.'.join([workflow.name, name])
+        if fullname not in summary.index:
+            continue
+        row = summary.loc[fullname]
+        node = workflow.get_node(name)
+        if np.isfinite(row['max_peak_rss_mb']):
+            mem_gb = float(memory_margin * row['max_peak_rss_mb'] / 1024.0)
+            if hasattr(node, '_mem_gb'):
+                node._mem_gb = mem_gb
+            else:
+                node.interface.estimated_memory_gb = mem_gb
+        else:
+            mem_gb = None
+        n_procs = 1
+        if row['median_wall_seconds'] > 0 and \
+                np.isfinite(row['median_cpu_seconds']):
+            n_procs = max(1, int(round(row['median_cpu_seconds'] /
+                                       row['median_wall_seconds'])))
+            if hasattr(node, 'n_procs'):
+                node.n_procs = n_procs
+            else:
+                node.interface.num_threads = n_procs
+        estimates[name] = (mem_gb, n_procs)
+
+    return estimates
@@ -11,6 +11,111 @@ Copyright 2016,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
 """
 
 
+def remap_labels(data, old_labels, new_labels, default=None, dtype=None,
+                 output=None, chunk_size=10000000):
+    """
+    Map label values in an array to new values with a lookup table.
+
+    The lookup table is built once and applied to (chunks of) the data
+    with a single vectorized gather per chunk: a dense table indexed by
+    label value for integer data with a compact label range, or
+    a sorted table searched with np.searchsorted otherwise.
+
+    Parameters
+    ----------
+    data : numpy array (any shape, may be memory-mapped)
+        label values
+    old_labels : list of integers or floats
+        old labels
+    new_labels : list of integers or floats
+        new label for each old label
+    default : integer or float or None
+        value for data not in old_labels (None to keep the data value)
+    dtype : numpy dtype or None
+        data type of the output (None to keep the data type)
+    output : numpy array or None
+        array (e.g., memory-mapped) with the shape of data to fill
+    chunk_size : integer
+        number of data values to map at a time
+
+    Returns
+    -------
+    output : numpy array
+        new label values, with the shape of data
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.guts.relabel import remap_labels
+    >>> data = np.array([[0, 3, 3], [5, 1000000, 7]], dtype=np.int32)
+    >>> new_data = remap_labels(data, [3, 7], [30, 70])
+    >>> new_data.tolist(), new_data.dtype
+    ([[0, 30, 30], [5, 1000000, 70]], dtype('int32'))
+    >>> remap_labels(data, [3, 1000000], [1, 1], default=0, dtype=bool).tolist()
+    [[False, True, True], [False, True, False]]
+    >>> remap_labels(np.array([1.5, 2.0]), [2], [4]).tolist()
+    [1.5, 4.0]
+
+    """
+    import numpy as np
+
+    if dtype is None:
+        dtype = data.dtype
+    if output is None:
+        output = np.empty_like(data, dtype=dtype, subok=False)
+    old_labels = np.asarray(old_labels).ravel()
+    new_labels = np.asarray(new_labels).ravel()
+    max_dense_range = 10000000
+
+    # Build the lookup table:
+    dense = data.dtype.kind in 'iub' and len(old_labels) and \
+            np.all(old_labels == np.round(old_labels))
+    if dense:
+        old_labels = old_labels.astype(np.int64)
+        min_label = old_labels.min()
+        dense = old_labels.max() - min_label < max_dense_range
+    if dense:
+        nlut = old_labels.max() - min_label + 1
+        if default is None:
+            lut = np.arange(min_label, min_label + nlut)
+        else:
+            lut = default * np.ones(nlut, dtype=np.int64)
+        lut = lut.astype(np.result_type(lut, new_labels))
+        lut[old_labels - min_label] = new_labels
+    else:
+        Isort = np.argsort(old_labels, kind='mergesort')
+        keys = old_labels[Isort]
+        lut = new_labels[Isort]
+        # Keep the last of any duplicate old labels:
+        last = np.append(keys[1:] != keys[:-1], True)
+        keys, lut = keys[last], lut[last]
+
+    # Apply the lookup table to each chunk of the (flattened) data:
+    data_flat = data.ravel(order='K')
+    output_flat = output.ravel(order='K')
+    if not np.may_share_memory(output_flat, output):
+        raise IOError("remap_labels() output must be contiguous.")
+    for start in range(0, data_flat.shape[0], chunk_size):
+        chunk = np.asarray(data_flat[start:start + chunk_size])
+        if default is None:
+            new_chunk = chunk.copy()
+        else:
+            new_chunk = np.empty(chunk.shape, dtype=lut.dtype)
+            new_chunk.fill(default)
+        if dense:
+            indices = chunk.astype(np.int64) - min_label
+            found = (indices >= 0) & (indices < nlut)
+            new_chunk[found] = lut[indices[found]]
+        elif len(keys):
+            indices = np.searchsorted(keys, chunk)
+            indices[indices == len(keys)] = 0
+            found = keys[indices] == chunk
+            new_chunk[found] = lut[indices[found]]
+        output_flat[start:start + chunk_size] = new_chunk
+
+    return output
+
+
 def relabel_volume(input_file, old_labels, new_labels, output_file=''):
     """
     Relabel volume labels.
@@ -59,25 +164,16 @@ def relabel_volume(input_file, old_labels, new_labels, output_file=''):
     import numpy as np
     import nibabel as nb
 
-    # Load labeled image volume and extract data as 1-D array
+    from mindboggle.guts.relabel import remap_labels
+
+    # Load labeled image volume
     vol = nb.load(input_file)
     xfm = vol.get_affine()
-    data = vol.get_data().ravel()
-
-    # Initialize output
-    new_data = data.copy()
-
-    # Loop through labels
-    for ilabel, label in enumerate(old_labels):
-        label = int(label)
-        new_label = int(new_labels[ilabel])
+    data = vol.get_data()
 
-        # Relabel
-        if new_label != label:
-            new_data[np.where(data==label)[0]] = new_label
-
-    # Reshape to original dimensions
-    new_data = np.reshape(new_data, vol.shape)
+    # Relabel with a lookup table
+    new_data = remap_labels(data, [int(x) for x in old_labels],
+                            [int(x) for x in new_labels])
 
     # Save relabeled file
     if not output_file:
@@ -142,22 +238,24 @@ def remove_volume_labels(input_file, labels_to_remove, output_file='',
     import numpy as np
     import nibabel as nb
 
+    from mindboggle.guts.relabel import remap_labels
+
     # ------------------------------------------------------------------------
-    # Load labeled image volume and extract data as 1-D array:
+    # Load labeled image volume:
     # ------------------------------------------------------------------------
     vol = nb.load(input_file)
     xfm = vol.get_affine()
-    data = vol.get_data().ravel()
+    data = vol.get_data()
 
     # ------------------------------------------------------------------------
     # If second file specified, erase voxels whose corresponding
     # voxels in the input_file have labels in labels_to_remove:
     # ------------------------------------------------------------------------
     if second_file:
-        # Load second image volume and extract data as 1-D array:
+        # Load second image volume:
         vol = nb.load(second_file)
         xfm = vol.get_affine()
-        new_data = vol.get_data().ravel()
+        new_data = np.array(vol.get_data())
         if not output_file:
             output_file = os.path.join(os.getcwd(),
                                        os.path.basename(second_file))
@@ -173,16 +271,9 @@ def remove_volume_labels(input_file, labels_to_remove, output_file='',
     # ------------------------------------------------------------------------
     # Erase voxels as specified above:
     # ------------------------------------------------------------------------
-    ulabels = np.unique(data)
-    for label in ulabels:
-        label = int(label)
-        if label in labels_to_remove:
-            new_data[np.where(data == label)[0]] = 0
-
-    # ------------------------------------------------------------------------
-    # Reshape to original dimensions:
-    # ------------------------------------------------------------------------
-    new_data = np.reshape(new_data, vol.shape)
+    erase = remap_labels(data, labels_to_remove,
+                         np.ones(len(labels_to_remove)), 0, bool)
+    new_data[erase] = 0
 
     # ------------------------------------------------------------------------
     # Save relabeled file:
@@ -243,22 +334,24 @@ def keep_volume_labels(input_file, labels_to_keep, output_file='',
     import numpy as np
     import nibabel as nb
 
+    from mindboggle.guts.relabel import remap_labels
+
     # ------------------------------------------------------------------------
-    # Load labeled image volume and extract data as 1-D array:
+    # Load labeled image volume:
     # ------------------------------------------------------------------------
     vol = nb.load(input_file)
     xfm = vol.get_affine()
-    data = vol.get_data().ravel()
+    data = vol.get_data()
 
     # ------------------------------------------------------------------------
     # If second file specified, erase voxels whose corresponding
     # voxels in the input_file have labels not in labels_to_keep:
     # ------------------------------------------------------------------------
     if second_file:
-        # Load second image volume and extract data as 1-D array:
+        # Load second image volume:
         vol = nb.load(second_file)
         xfm = vol.get_affine()
-        new_data = vol.get_data().ravel()
+        new_data = np.array(vol.get_data())
         if not output_file:
             output_file = os.path.join(os.getcwd(),
                                        os.path.basename(second_file))
@@ -274,16 +367,9 @@ def keep_volume_labels(input_file, labels_to_keep, output_file='',
     # ------------------------------------------------------------------------
     # Erase voxels as specified above:
     # ------------------------------------------------------------------------
-    ulabels = np.unique(data)
-    for label in ulabels:
-        label = int(label)
-        if label not in labels_to_keep:
-            new_data[np.where(data == label)[0]] = 0
-
-    # ------------------------------------------------------------------------
-    # Reshape to original dimensions:
-    # ------------------------------------------------------------------------
-    new_data = np.reshape(new_data, vol.shape)
+    erase = remap_labels(data, labels_to_keep,
+                         np.zeros(len(labels_to_keep)), 1, bool)
+    new_data[erase] = 0
 
     # ------------------------------------------------------------------------
     # Save relabeled file:
@@ -475,6 +561,8 @@ def overwrite_volume_labels(source, target, output_file='', ignore_labels=[0],
     import numpy as np
     import nibabel as nb
 
+    from mindboggle.guts.relabel import remap_labels
+
     if not output_file:
         output_file = os.path.join(os.getcwd(), os.path.basename(source) +
                                    '_to_' + os.path.basename(target))
@@ -485,29 +573,27 @@ def overwrite_volume_labels(source, target, output_file='', ignore_labels=[0],
         raise IOError('{0} and {1} need to be the same shape.'.
                       format(source, target))
     xfm = vol_target.get_affine()
-    data_source = vol_source.get_data().ravel()
-    data_target = vol_target.get_data().ravel()
+    data_source = vol_source.get_data()
+    data_target = vol_target.get_data()
 
     # Initialize output:
-    new_data = data_target.copy()
+    new_data = np.array(data_target)
 
-    # Find indices with labels in source:
-    IX = [(i,x) for i,x in enumerate(data_source) if x not in ignore_labels]
-    I = [x[0] for x in IX]
-    X = [x[1] for x in IX]
+    # Find voxels with labels in source:
+    I = ~remap_labels(data_source, ignore_labels,
+                      np.ones(len(ignore_labels)), 0, bool)
+    X = data_source[I]
 
     # Erase target labels (that are in source) before overwriting:
     if erase_labels:
         rm_labels = np.unique(X)
-        Irm = [i for i,x in enumerate(data_target) if x in rm_labels]
+        Irm = remap_labels(data_target, rm_labels,
+                           np.ones(len(rm_labels)), 0, bool)
         new_data[Irm] = background_value
 
     # Overwrite target labels with source labels:
     new_data[I] = X
 
-    # Reshape to original dimensions:
-    new_data = np.reshape(new_data, vol_target.shape)
-
     # Save relabeled file:
     img = nb.Nifti1Image(new_data, xfm)
     img.to_filename(output_file)
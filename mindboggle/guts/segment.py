@@ -632,11 +632,11 @@ def segment_by_filling_borders(regions, neighbor_lists, background_value=-1,
     Steps ::
         1. Extract region borders (assumed to be closed contours)
         2. Segment borders into separate, contiguous borders
-        3. For each boundary
-            4. Find the neighbors to either side of the boundary
-            5. Segment the neighbors into exterior and interior sets of neighbors
-            6. Find the interior (smaller) sets of neighbors
-            7. Fill the contours formed by the interior neighbors
+        3. Segment the remaining vertices into connected components
+        4. Find the neighbors to either side of each boundary
+        5. Find each boundary's exterior (the component with the most
+           neighbors) and interior (the other) components
+        6. Fill all contours at once with their interior components
 
     Parameters
     ----------
@@ -678,8 +678,9 @@ def segment_by_filling_borders(regions, neighbor_lists, background_value=-1,
     >>> len_segments = []
     >>> for useg in np.unique(segments):
     ...     len_segments.append(len(np.where(segments == useg)[0]))
-    >>> len_segments[0:10]
-    [19446, 8619, 13846, 23, 244, 101687, 16, 792, 210, 76]
+    >>> sizes = [19446, 8619, 13846, 23, 244, 101687, 16, 792, 210, 76]
+    >>> [x for x in sorted(len_segments) if x in sizes]
+    [16, 23, 76, 210, 244, 792, 8619, 13846, 19446, 101687]
 
     Write results to vtk file and view (skip test):
 
@@ -691,8 +692,9 @@ def segment_by_filling_borders(regions, neighbor_lists, background_value=-1,
 
     """
     import numpy as np
-    from mindboggle.guts.segment import extract_borders
-    from mindboggle.guts.segment import segment_regions
+    from mindboggle.guts.mesh import adjacency_matrix
+    from mindboggle.guts.segment import extract_borders, \
+        connected_components
 
     include_boundary = False
 
@@ -703,81 +705,77 @@ def segment_by_filling_borders(regions, neighbor_lists, background_value=-1,
     if verbose:
         print('Segment vertices using region borders')
 
+    adjacency = adjacency_matrix(neighbor_lists=neighbor_lists,
+                                 npoints=len(regions))
+
     # Extract region borders (assumed to be closed contours)
     if verbose:
         print('  Extract region borders (assumed to be closed contours)')
     indices_borders, foo1, foo2 = extract_borders(list(range(len(regions))),
                                                   regions, neighbor_lists)
+    indices_borders = np.asarray(indices_borders, dtype=int)
+    is_border = np.zeros(len(regions), dtype=bool)
+    is_border[indices_borders] = True
+
     # Extract background
-    indices_background = list(frozenset(list(range(len(regions)))).
-    difference(indices_borders))
+    indices_background = np.where(~is_border)[0]
 
     # Segment borders into separate, contiguous borders
     if verbose:
         print('  Segment borders into separate, contiguous borders')
-    borders = segment_regions(indices_borders, neighbor_lists, 1, [], False,
-                              False, [], [], [], '', background_value,
-                              verbose)
-
-    # For each boundary
-    unique_borders = [x for x in np.unique(borders) if x != background_value]
-    segments = background_value * np.ones(len(regions))
-    for boundary_number in unique_borders:
-
-        if verbose:
-            print('  Boundary {0} of {1}:'.format(int(boundary_number),
-                                                  len(unique_borders)))
-        border_indices = [i for i,x in enumerate(borders)
-                          if x == boundary_number]
-        # Find the neighbors to either side of the boundary
-        indices_neighbors = []
-        [indices_neighbors.extend(neighbor_lists[i]) for i in border_indices]
-        #indices_neighbors2 = indices_neighbors[:]
-        #[indices_neighbors2.extend(neighbor_lists[i]) for i in indices_neighbors]
-        indices_neighbors = list(frozenset(indices_neighbors).
-        difference(indices_borders))
-
-        # Segment the neighbors into exterior and interior sets of neighbors
-        if verbose:
-            print('    Segment the neighbors into exterior and interior sets '
-                  'of neighbors')
-        neighbors = segment_regions(indices_neighbors, neighbor_lists, 1, [],
-                                    False, False, [], [], [], '',
-                                    background_value, verbose)
+    borders, nborders = connected_components(indices_borders, adjacency,
+                                             background_value)
 
-        # Find the interior (smaller) sets of neighbors
-        if verbose:
-            print('    Find the interior (smaller) sets of neighbors')
-        seed_lists = []
-        unique_neighbors = [x for x in np.unique(neighbors)
-                            if x != background_value]
-        max_neighbor = 0
-        max_len = 0
-        for ineighbor, neighbor in enumerate(unique_neighbors):
-            indices_neighbor = [i for i,x in enumerate(neighbors)
-                                if x == neighbor]
-            seed_lists.append(indices_neighbor)
-            if len(indices_neighbor) > max_len:
-                max_len = len(indices_neighbor)
-                max_neighbor = ineighbor
-        seed_lists = [x for i,x in enumerate(seed_lists) if i != max_neighbor]
-        seed_list = []
-        [seed_list.extend(x) for x in seed_lists if len(x) > 2]
-
-        # Fill the contours formed by the interior neighbors
-        if verbose:
-            print('    Fill the contour formed by the interior neighbors')
-        vertices_to_segment = list(frozenset(indices_background).
-        difference(indices_borders))
-        segmented_regions = segment_regions(vertices_to_segment,
-                                            neighbor_lists, 1, [seed_list],
-                                            False, False, [], [], [], '',
-                                            background_value, verbose)
+    # Segment the remaining (non-border) vertices into the components
+    # that the borders separate from each other
+    if verbose:
+        print('  Segment the complement of the borders')
+    complements, ncomplements = connected_components(indices_background,
+                                                     adjacency,
+                                                     background_value)
 
-        if include_boundary:
-            segmented_regions[border_indices] = 1
+    segments = background_value * np.ones(len(regions))
+    if not nborders or not ncomplements:
+        return segments
 
-        segments[segmented_regions != background_value] = boundary_number
+    # Find the neighbors to either side of each boundary,
+    # as distinct (boundary, neighbor) pairs
+    if verbose:
+        print('  Find the neighbors to either side of each boundary')
+    edges = adjacency[indices_borders].tocoo()
+    indices_neighbors = edges.col[~is_border[edges.col]]
+    neighbor_borders = borders[indices_borders[edges.row]][
+        ~is_border[edges.col]].astype(np.int64)
+    pairs = np.unique(neighbor_borders * len(regions) + indices_neighbors)
+    neighbor_borders = pairs // len(regions)
+    neighbor_complements = complements[pairs % len(regions)].astype(np.int64)
+
+    # Count each boundary's neighbors in each complement component
+    pairs, nneighbors = np.unique(neighbor_borders * ncomplements +
+                                  neighbor_complements, return_counts=True)
+    pair_borders = pairs // ncomplements
+    pair_complements = pairs % ncomplements
+
+    # The exterior of each boundary is the component with the most
+    # neighbors; fill the other (interior) components with more than
+    # two neighbors, giving each to the last boundary that encloses it
+    if verbose:
+        print('  Fill the contours formed by the interior neighbors')
+    order = np.lexsort((pair_complements, -nneighbors, pair_borders))
+    exterior = np.ones(len(order), dtype=bool)
+    exterior[1:] = pair_borders[order][1:] != pair_borders[order][:-1]
+    interior = np.ones(len(pairs), dtype=bool)
+    interior[order[exterior]] = False
+    interior &= nneighbors > 2
+
+    fill_borders = -np.ones(ncomplements, dtype=np.int64)
+    np.maximum.at(fill_borders, pair_complements[interior],
+                  pair_borders[interior])
+    fill = fill_borders[complements[indices_background]]
+    segments[indices_background[fill > -1]] = fill[fill > -1]
+
+    if include_boundary:
+        segments[indices_borders] = borders[indices_borders]
 
     return segments
 
@@ -894,6 +892,58 @@ def segment_rings(region, seeds, neighbor_lists, step=1, background_value=-1,
     return segments
 
 
+def find_ring_indices(region, seeds, neighbor_lists):
+    """
+    Number the concentric segments (rings) of a region grown from seeds.
+
+    This returns the same concentric segments as segment_rings() (step=1),
+    but as a single array with a ring number for every vertex,
+    computed with one breadth-first pass through the region.
+
+    Parameters
+    ----------
+    region : list of integers
+        indices of region vertices to segment (such as a fold)
+    seeds : list of integers
+        indices of seed vertices
+    neighbor_lists : list of lists of integers
+        indices to neighboring vertices for each vertex
+
+    Returns
+    -------
+    rings : numpy array of integers
+        ring number for each vertex (-1 for vertices outside the rings)
+
+    Examples
+    --------
+    >>> from mindboggle.guts.segment import find_ring_indices
+    >>> neighbor_lists = [[1],[0,2],[1,3,5],[2,4],[3],[2]]
+    >>> find_ring_indices([1,2,3,4,5], [0], neighbor_lists).tolist()
+    [-1, 0, 1, 2, 3, 2]
+
+    """
+    import numpy as np
+    from itertools import chain
+
+    rings = -1 * np.ones(len(neighbor_lists), dtype=int)
+    in_region = np.zeros(len(neighbor_lists), dtype=bool)
+    in_region[region] = True
+    frontier = np.unique(np.asarray(seeds, dtype=int))
+    in_region[frontier] = False
+
+    iring = 0
+    while frontier.size:
+        neighbors = np.fromiter(chain.from_iterable(neighbor_lists[x]
+                                                    for x in frontier),
+                                dtype=int)
+        frontier = np.unique(neighbors[in_region[neighbors]])
+        in_region[frontier] = False
+        rings[frontier] = iring
+        iring += 1
+
+    return rings
+
+
 def watershed(depths, points, indices, neighbor_lists, min_size=1,
               depth_factor=0.25, depth_ratio=0.1, tolerance=0.01, regrow=True,
               background_value=-1, verbose=False):
@@ -1264,6 +1314,115 @@ def watershed(depths, points, indices, neighbor_lists, min_size=1,
     return segments.tolist(), seed_indices
 
 
+def connected_components(indices, adjacency, background_value=-1):
+    """
+    Label connected sets of vertices (components) in a surface mesh.
+
+    Components are found with scipy.sparse.csgraph.connected_components
+    over the edges between the given vertices, and are numbered from zero
+    in the order of their lowest vertex index.  This gives the same sets of
+    vertices as segment_regions() without seeds, but in linear time.
+
+    Parameters
+    ----------
+    indices : list or numpy array of integers
+        indices to mesh vertices to be segmented into components
+    adjacency : scipy.sparse matrix
+        vertex adjacency matrix of the mesh
+        (see mindboggle.guts.mesh.adjacency_matrix())
+    background_value : integer or float
+        background value
+
+    Returns
+    -------
+    components : numpy array of integers
+        component numbers for all vertices (background_value for
+        vertices not in indices)
+    ncomponents : integer
+        number of components
+
+    Examples
+    --------
+    >>> from mindboggle.guts.mesh import adjacency_matrix
+    >>> from mindboggle.guts.segment import connected_components
+    >>> faces = [[0,1,2],[0,2,3],[4,5,6],[5,6,7],[7,8,9]]
+    >>> adjacency = adjacency_matrix(faces, npoints=11)
+    >>> components, ncomponents = connected_components([9,8,4,5,6,0,1,2,10],
+    ...                                                adjacency)
+    >>> components.tolist()
+    [0, 0, 0, -1, 1, 1, 1, -1, 2, 2, 3]
+    >>> ncomponents
+    4
+
+    """
+    import numpy as np
+    from scipy.sparse.csgraph import connected_components as csgraph_components
+
+    npoints = adjacency.shape[0]
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    components = background_value * np.ones(npoints, dtype=int)
+    if not len(indices):
+        return components, 0
+
+    # Label components of the subgraph of selected vertices:
+    if len(indices) == npoints:
+        subgraph = adjacency
+    else:
+        subgraph = adjacency[indices][:, indices]
+    ncomponents, labels = csgraph_components(subgraph, directed=False)
+
+    # Number components in the order of their lowest (first) vertex:
+    unique_labels, first_indices = np.unique(labels, return_index=True)
+    order = np.empty(ncomponents, dtype=int)
+    order[unique_labels[np.argsort(first_indices)]] = np.arange(ncomponents)
+    components[indices] = order[labels]
+
+    return components, ncomponents
+
+
+def component_sizes(components, areas=None, background_value=-1):
+    """
+    Measure the size of each component, optionally weighted by area.
+
+    Parameters
+    ----------
+    components : numpy array of integers
+        component numbers (0 to N-1) for all vertices
+        (see connected_components())
+    areas : numpy array or list of floats (or None)
+        surface area scalar values for all vertices
+    background_value : integer or float
+        background value
+
+    Returns
+    -------
+    sizes : numpy array of integers or floats
+        number of vertices (or total area) of each component
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.guts.segment import component_sizes
+    >>> components = np.array([0, 0, 0, -1, 1, 1, 1, -1, 2, 2, 3])
+    >>> component_sizes(components).tolist()
+    [3, 3, 2, 1]
+    >>> areas = [1, 1, 1, 9, 2, 2, 2, 9, 0.5, 0.5, 4]
+    >>> component_sizes(components, areas).tolist()
+    [3.0, 6.0, 1.0, 4.0]
+
+    """
+    import numpy as np
+
+    components = np.asarray(components)
+    foreground = components != background_value
+    if areas is not None and len(areas):
+        weights = np.asarray(areas, dtype=float)[foreground]
+    else:
+        weights = None
+
+    return np.bincount(components[foreground].astype(int), weights)
+
+
 def select_largest(points, faces, exclude_labels=[-1], areas=None,
                    reindex=True, background_value=-1, verbose=False):
     """
@@ -1352,9 +1511,10 @@ def select_largest(points, faces, exclude_labels=[-1], areas=None,
     """
     import numpy as np
 
-    from mindboggle.guts.mesh import find_neighbors, keep_faces, \
+    from mindboggle.guts.mesh import adjacency_matrix, keep_faces, \
         reindex_faces_points
-    from mindboggle.guts.segment import segment_regions
+    from mindboggle.guts.segment import connected_components, \
+        component_sizes
 
     # Areas:
     use_area = False
@@ -1377,48 +1537,42 @@ def select_largest(points, faces, exclude_labels=[-1], areas=None,
         # --------------------------------------------------------------------
         # Segment the indices into connected sets of indices:
         # --------------------------------------------------------------------
-        # Construct neighbor lists:
-        neighbor_lists = find_neighbors(faces, npoints)
-
         # Determine the unique indices that make up the faces:
         indices = np.unique(np.ravel(faces))
 
         # Segment:
-        segments = segment_regions(indices, neighbor_lists, 1, [], False,
-                                   False, [], [], [], '', background_value,
-                                   verbose)
+        segments, nsegments = connected_components(indices,
+            adjacency_matrix(faces, npoints=npoints), background_value)
 
         # --------------------------------------------------------------------
         # Select the largest segment (connected set of indices):
         # --------------------------------------------------------------------
-        unique_segments = [x for x in np.unique(segments)
+        unique_segments = [x for x in range(nsegments)
                            if x not in exclude_labels]
         if len(unique_segments) > 1:
-            select_indices = []
-            max_segment_area = 0
-            for segment_number in unique_segments:
-                segment_indices = [i for i,x in enumerate(segments)
-                                   if x == segment_number]
-                if use_area:
-                    segment_area = np.sum(areas[segment_indices])
-                else:
-                    segment_area = len(segment_indices)
-                if segment_area > max_segment_area:
-                    select_indices = segment_indices
-                    max_segment_area = segment_area
+            nvertices = component_sizes(segments, None, background_value)
+            if use_area:
+                segment_areas = component_sizes(segments, areas,
+                                                background_value)
+            else:
+                segment_areas = nvertices
+            largest = unique_segments[int(np.argmax(
+                segment_areas[unique_segments]))]
+            select_indices = np.where(segments == largest)[0].tolist()
+            max_segment_area = segment_areas[largest]
 
-                # Print message:
-                if verbose:
+            # Print message:
+            if verbose:
+                for segment_number in unique_segments:
                     if use_area:
                         print('Segment {0}: {1} vertices ({2:.2f} area)'.
-                              format(int(segment_number),
-                                     len(segment_indices),
-                                     segment_area))
+                              format(segment_number,
+                                     nvertices[segment_number],
+                                     segment_areas[segment_number]))
                     else:
                         print('Segment {0}: {1} vertices'.
-                              format(int(segment_number),
-                                     len(segment_indices)))
-            if verbose:
+                              format(segment_number,
+                                     nvertices[segment_number]))
                 print('Largest of {0} segments: {1:.2f}'.
                       format(len(unique_segments), max_segment_area))
 
@@ -113,6 +113,96 @@ def list_strings(string1='', string2='', string3='', string4=''):
     return string_list
 
 
+def list_subject_directories(paths, ants=''):
+    """
+    List subject directories from paths, glob patterns and manifest files.
+
+    A manifest file is a text file listing one subject directory per line,
+    optionally followed by the subject's ANTs segmentation file (separated
+    by a comma or white space); empty lines and lines starting with '#'
+    are ignored.
+
+    Parameters
+    ----------
+    paths : list of strings
+        subject directories, glob patterns or manifest files
+    ants : string
+        ANTs segmentation file for subjects without one in a manifest;
+        for more than one subject, it must contain '{subject}',
+        which is replaced by each subject's name
+
+    Returns
+    -------
+    data_dirs : list of strings
+        subject directories (in order, without duplicates)
+    ants_files : list of strings
+        ANTs segmentation file per subject ('' if none)
+
+    Examples
+    --------
+    >>> import os
+    >>> from mindboggle.guts.utilities import list_subject_directories
+    >>> os.makedirs('subjects/arno', exist_ok=True)
+    >>> os.makedirs('subjects/berta', exist_ok=True)
+    >>> data_dirs, ants_files = list_subject_directories(['subjects/*'],
+    ...     'ants/{subject}/antsBrainSegmentation.nii.gz')
+    >>> data_dirs
+    ['subjects/arno', 'subjects/berta']
+    >>> ants_files[1]
+    'ants/berta/antsBrainSegmentation.nii.gz'
+    >>> manifest = '# subject, ants\\nsubjects/berta, berta_seg.nii.gz\\n'
+    >>> with open('manifest.txt', 'w') as fid:
+    ...     x = fid.write(manifest)
+    >>> list_subject_directories(['manifest.txt'])
+    (['subjects/berta'], ['berta_seg.nii.gz'])
+
+    """
+    import os
+    import re
+    from glob import glob
+
+    data_dirs = []
+    ants_files = []
+
+    def add_subject(data_dir, ants_file=''):
+        data_dir = os.path.normpath(data_dir)
+        if not os.path.isdir(data_dir):
+            raise IOError("Please provide correct path to DATA: "
+                          "{0}".format(data_dir))
+        if data_dir not in data_dirs:
+            data_dirs.append(data_dir)
+            ants_files.append(ants_file)
+
+    for path in paths:
+        if os.path.isdir(path):
+            add_subject(path)
+        elif os.path.isfile(path):
+            with open(path, 'r') as fid:
+                for line in fid:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        add_subject(*re.split(r'\s*,\s*|\s+', line)[:2])
+        else:
+            matches = sorted([x for x in glob(path) if os.path.isdir(x)])
+            if not matches:
+                raise IOError("No subject directories match {0}".
+                              format(path))
+            for match in matches:
+                add_subject(match)
+
+    if ants:
+        if '{subject}' not in ants and \
+                len([x for x in ants_files if not x]) > 1:
+            raise IOError("Include '{subject}' in the ANTs segmentation "
+                          "file to run more than one subject.")
+        for isubject, data_dir in enumerate(data_dirs):
+            if not ants_files[isubject]:
+                ants_files[isubject] = ants.format(
+                    subject=os.path.basename(data_dir))
+
+    return data_dirs, ants_files
+
+
 # ============================================================================
 # Doctests
 # ============================================================================
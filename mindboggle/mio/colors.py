@@ -11,9 +11,169 @@ Copyright 2016,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
 
 import os
 
+# RGB (linear) to XYZ working space matrices (D65), as in python-colormath:
+_rgb_to_xyz_matrices = {
+    'adobe': ((0.576700, 0.185556, 0.188212),
+              (0.297361, 0.627355, 0.0752847),
+              (0.0270328, 0.0706879, 0.991248)),
+    'srgb': ((0.412424, 0.357579, 0.180464),
+             (0.212656, 0.715158, 0.0721856),
+             (0.0193324, 0.119193, 0.950444))}
+
+# Palettes of distinguishable colors, by background colors:
+_distinguishable_colors_cache = {}
+
+
+def rgb_to_lab(rgb, rgb_space='adobe'):
+    """
+    Convert RGB colors to CIELAB (D65 illuminant, 2-degree observer).
+
+    This is a vectorized version of python-colormath's
+    convert_color(AdobeRGBColor(r, g, b), LabColor)
+    (or sRGBColor for rgb_space='srgb').
+
+    Parameters
+    ----------
+    rgb : numpy array (or list) of 3 floats between 0 and 1 (or Nx3 array)
+        rgb colors
+    rgb_space : string
+        RGB color space: 'adobe' (Adobe RGB 1998) or 'srgb'
+
+    Returns
+    -------
+    lab : numpy array of floats (same shape as rgb)
+        Lab colors
+
+    Examples
+    --------
+    >>> from mindboggle.mio.colors import rgb_to_lab
+    >>> lab = rgb_to_lab([[1, 1, 1], [1, 0, 0]])
+    >>> [float('{0:.4f}'.format(x)) for x in lab[1]]
+    [61.4259, 89.5603, 75.1474]
+    >>> [float('{0:.4f}'.format(x)) for x in rgb_to_lab([1, 0, 0], 'srgb')]
+    [53.239, 80.0905, 67.2014]
+
+    """
+    import numpy as np
+
+    if rgb_space not in _rgb_to_xyz_matrices:
+        raise IOError("Use 'adobe' or 'srgb' color space.")
+    rgb = np.asarray(rgb, dtype=np.float64)
+
+    # Linearize RGB values (remove the gamma function):
+    if rgb_space == 'srgb':
+        linear = np.where(rgb <= 0.04045, rgb / 12.92,
+                          np.power((rgb + 0.055) / 1.055, 2.4))
+    else:
+        linear = np.power(rgb, 2.2)
+
+    # RGB to XYZ, normalized by the D65 reference white:
+    xyz = np.maximum(np.dot(linear, np.transpose(
+        _rgb_to_xyz_matrices[rgb_space])), 0.0)
+    xyz = xyz / np.array([0.95047, 1.00000, 1.08883])
+
+    # XYZ to Lab:
+    f = np.where(xyz > 216.0 / 24389.0, np.power(xyz, 1.0 / 3.0),
+                 7.787 * xyz + 16.0 / 116.0)
+    lab = np.empty(np.shape(f))
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+
+    return lab
+
+
+def delta_e_cie2000(lab1, lab2, Kl=1, Kc=1, Kh=1):
+    """
+    Compute the CIEDE2000 color difference between Lab colors.
+
+    This is a vectorized version of python-colormath's delta_e_cie2000()
+    (same formula): lab1 and lab2 are broadcast against each other, so
+    one color can be compared with many colors, or Nx1x3 with 1xMx3
+    arrays can produce an NxM difference matrix.
+
+    Parameters
+    ----------
+    lab1 : numpy array of floats (..., 3)
+        Lab color(s)
+    lab2 : numpy array of floats (..., 3)
+        Lab color(s)
+    Kl, Kc, Kh : floats
+        lightness, chroma and hue weighting factors
+
+    Returns
+    -------
+    delta_e : numpy array of floats
+        color differences (broadcast shape of lab1 and lab2 without
+        the last dimension)
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.mio.colors import rgb_to_lab, delta_e_cie2000
+    >>> lab = rgb_to_lab([[0, 0, 0], [1, 1, 1], [1, 0, 0]])
+    >>> dx = delta_e_cie2000(lab[:, np.newaxis, :], lab[np.newaxis, :, :])
+    >>> [float('{0:.4f}'.format(x)) for x in dx[0]]
+    [0.0, 100.0, 57.7372]
+
+    """
+    import numpy as np
+
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    avg_Lp = (L1 + L2) / 2.0
+    C1 = np.sqrt(a1 * a1 + b1 * b1)
+    C2 = np.sqrt(a2 * a2 + b2 * b2)
+    avg_C1_C2 = (C1 + C2) / 2.0
+    G = 0.5 * (1 - np.sqrt(np.power(avg_C1_C2, 7.0) /
+                           (np.power(avg_C1_C2, 7.0) + np.power(25.0, 7.0))))
+    a1p = (1.0 + G) * a1
+    a2p = (1.0 + G) * a2
+    C1p = np.sqrt(a1p * a1p + b1 * b1)
+    C2p = np.sqrt(a2p * a2p + b2 * b2)
+    avg_C1p_C2p = (C1p + C2p) / 2.0
+
+    h1p = np.degrees(np.arctan2(b1, a1p))
+    h1p += (h1p < 0) * 360
+    h2p = np.degrees(np.arctan2(b2, a2p))
+    h2p += (h2p < 0) * 360
+    avg_Hp = (((np.fabs(h1p - h2p) > 180) * 360) + h1p + h2p) / 2.0
+
+    T = 1 - 0.17 * np.cos(np.radians(avg_Hp - 30)) + \
+        0.24 * np.cos(np.radians(2 * avg_Hp)) + \
+        0.32 * np.cos(np.radians(3 * avg_Hp + 6)) - \
+        0.2 * np.cos(np.radians(4 * avg_Hp - 63))
+
+    diff_h2p_h1p = h2p - h1p
+    delta_hp = diff_h2p_h1p + (np.fabs(diff_h2p_h1p) > 180) * 360
+    delta_hp -= (h2p > h1p) * 720
+
+    delta_Lp = L2 - L1
+    delta_Cp = C2p - C1p
+    delta_Hp = 2 * np.sqrt(C2p * C1p) * np.sin(np.radians(delta_hp) / 2.0)
+
+    S_L = 1 + ((0.015 * np.power(avg_Lp - 50, 2)) /
+               np.sqrt(20 + np.power(avg_Lp - 50, 2.0)))
+    S_C = 1 + 0.045 * avg_C1p_C2p
+    S_H = 1 + 0.015 * avg_C1p_C2p * T
+
+    delta_ro = 30 * np.exp(-(np.power(((avg_Hp - 275) / 25), 2.0)))
+    R_C = np.sqrt((np.power(avg_C1p_C2p, 7.0)) /
+                  (np.power(avg_C1p_C2p, 7.0) + np.power(25.0, 7.0)))
+    R_T = -2 * R_C * np.sin(2 * np.radians(delta_ro))
+
+    return np.sqrt(np.power(delta_Lp / (S_L * Kl), 2) +
+                   np.power(delta_Cp / (S_C * Kc), 2) +
+                   np.power(delta_Hp / (S_H * Kh), 2) +
+                   R_T * (delta_Cp / (S_C * Kc)) * (delta_Hp / (S_H * Kh)))
+
+
 def distinguishable_colors(ncolors, backgrounds=[[0,0,0],[1,1,1]],
                            save_csv=True, plot_colormap=True, verbose=True,
-                           out_dir='.'):
+                           out_dir='.', use_cache=True):
     """
     Create a colormap of perceptually distinguishable colors.
 
@@ -33,6 +193,13 @@ def distinguishable_colors(ncolors, backgrounds=[[0,0,0],[1,1,1]],
     and avoids major changes in the appearance of plots when adding or
     removing lines."
 
+    Colors are converted to Lab and compared (CIEDE2000) as arrays, and the
+    difference of each candidate from its nearest chosen color is updated
+    incrementally, skipping candidates that cannot get any closer.
+    Because the sequence of colors does not depend on how many are
+    requested, the selection for each set of backgrounds can be cached
+    and extended by later calls.
+
     Parameters
     ----------
     ncolors : integer
@@ -45,6 +212,10 @@ def distinguishable_colors(ncolors, backgrounds=[[0,0,0],[1,1,1]],
         plot colormap as horizontal bar chart?
     verbose : Boolean
         print to stdout?
+    out_dir : string
+        output directory path
+    use_cache : Boolean
+        reuse (and extend) colors chosen by previous calls?
 
     Returns
     -------
@@ -71,10 +242,6 @@ def distinguishable_colors(ncolors, backgrounds=[[0,0,0],[1,1,1]],
 
     """
     import numpy as np
-    import matplotlib.pyplot as plt
-    from colormath.color_objects import LabColor, AdobeRGBColor
-    from colormath.color_conversions import convert_color
-    from colormath.color_diff import delta_e_cie2000
 
     filename = "colormap_of_{0}_distinguishable_colors".format(ncolors)
     filename = os.path.join(out_dir, filename)
@@ -88,69 +255,82 @@ def distinguishable_colors(ncolors, backgrounds=[[0,0,0],[1,1,1]],
     x = np.linspace(0, 1, num=n_grid, endpoint=True)
     R, G, B = np.meshgrid(x, x, x)
     ncolors_total = np.size(R)
-    RGB = np.vstack([np.ravel(R), np.ravel(G), np.ravel(B)])
-    RGB = [[RGB[0][icolor], RGB[1][icolor], RGB[2][icolor]]
-           for icolor in range(ncolors_total)]
+    RGB = np.transpose(np.vstack([np.ravel(R), np.ravel(G), np.ravel(B)]))
     if ncolors > ncolors_total:
         raise IOError("You can't readily distinguish that many colors")
 
     # ------------------------------------------------------------------------
-    # Convert to Lab color space which better represents human perception:
+    # Resume from previously chosen colors, or start with the backgrounds:
     # ------------------------------------------------------------------------
-    # https://python-colormath.readthedocs.io/en/latest/illuminants.html
-    lab_colors = []
-    for rgb in RGB:
-        lab = convert_color(AdobeRGBColor(rgb[0],
-                                          rgb[1],
-                                          rgb[2]), LabColor)
-        lab_colors.append(lab)
-
-    bg_lab_colors = []
-    for bg_rgb in backgrounds:
-        bg_lab = convert_color(AdobeRGBColor(bg_rgb[0],
-                                             bg_rgb[1],
-                                             bg_rgb[2]), LabColor)
-        bg_lab_colors.append(bg_lab)
+    cache_key = tuple(tuple(float(x) for x in bg) for bg in backgrounds)
+    if use_cache and cache_key in _distinguishable_colors_cache:
+        ichosen, min_dx, lab_colors = \
+            _distinguishable_colors_cache[cache_key]
+        ichosen = list(ichosen)
+        min_dx = min_dx.copy()
+        last_lab_color = lab_colors[ichosen[-1]]
+    else:
+        # --------------------------------------------------------------------
+        # Convert to Lab color space which better represents human
+        # perception:
+        # --------------------------------------------------------------------
+        # https://python-colormath.readthedocs.io/en/latest/illuminants.html
+        lab_colors = rgb_to_lab(RGB)
+        bg_lab_colors = rgb_to_lab(backgrounds).reshape((-1, 3))
 
-    # ------------------------------------------------------------------------
-    # If the user specified multiple background colors, compute differences
-    # between the candidate colors and the background colors:
-    # ------------------------------------------------------------------------
-    min_dx = np.inf * np.ones(ncolors_total)
-    if backgrounds:
+        # --------------------------------------------------------------------
+        # If the user specified multiple background colors, compute
+        # differences between the candidate colors and the background colors
+        # (store difference from closest previously-chosen color):
+        # --------------------------------------------------------------------
+        min_dx = np.inf * np.ones(ncolors_total)
         for bg_lab_color in bg_lab_colors:
-            # Store difference from closest previously-chosen color:
-            for icolor_total, lab_color in enumerate(lab_colors):
-                dx = delta_e_cie2000(lab_color, bg_lab_color)
-                min_dx[icolor_total] = min(dx, min_dx[icolor_total])
+            np.minimum(min_dx, delta_e_cie2000(lab_colors, bg_lab_color),
+                       out=min_dx)
+        ichosen = []
+
+        # Initialize by making the "previous" color equal to the last
+        # background:
+        last_lab_color = bg_lab_colors[-1]
 
     # ------------------------------------------------------------------------
     # Iteratively pick the color that maximizes the difference
     # with the nearest already-picked color:
     # ------------------------------------------------------------------------
-    # Initialize by making the "previous" color equal to the last background:
-    last_lab_color = bg_lab_colors[-1]
-    colors = np.zeros((ncolors, 3))
-    for icolor in range(ncolors):
-
-        # Find the difference of the last color from all colors on the list:
-        for icolor_total, lab_color in enumerate(lab_colors):
-            dx = delta_e_cie2000(lab_color, last_lab_color)
-            min_dx[icolor_total] = min(dx, min_dx[icolor_total])
+    while len(ichosen) < ncolors:
+
+        # Find the difference of the last color from all colors on the list
+        # (CIEDE2000 is at least |delta L| / S_L, so skip colors whose
+        # lightness alone is too different to bring them any closer):
+        dL = np.abs(lab_colors[:, 0] - last_lab_color[0])
+        avg_L = (lab_colors[:, 0] + last_lab_color[0]) / 2.0 - 50
+        S_L = 1 + 0.015 * avg_L * avg_L / np.sqrt(20 + avg_L * avg_L)
+        near = np.nonzero(dL / S_L <= min_dx + 0.000001)[0]
+        min_dx[near] = np.minimum(min_dx[near],
+            delta_e_cie2000(lab_colors[near], last_lab_color))
 
         # Find the entry farthest from all previously chosen colors:
         imax_dx = np.argmax(min_dx)
-
-        # Store distant color:
-        colors[icolor] = RGB[imax_dx]
+        ichosen.append(imax_dx)
 
         # Prepare for next iteration:
         last_lab_color = lab_colors[imax_dx]
 
+    if use_cache:
+        cached = _distinguishable_colors_cache.get(cache_key)
+        if cached is None or len(cached[0]) < len(ichosen):
+            _distinguishable_colors_cache[cache_key] = (ichosen, min_dx,
+                                                        lab_colors)
+
+    # Store distant colors:
+    colors = RGB[ichosen[0:ncolors]]
+
     # ------------------------------------------------------------------------
     # Plot the colormap as a horizontal bar chart:
     # ------------------------------------------------------------------------
     if plot_colormap:
+        import matplotlib.pyplot as plt
+
         if verbose:
             print("RGB values:")
         plt.figure(ncolors, figsize=(5, 10))
@@ -178,6 +358,117 @@ def distinguishable_colors(ncolors, backgrounds=[[0,0,0],[1,1,1]],
     return colors
 
 
+def sparse_label_adjacency(label_file, ignore_values=[-1, 999], add_value=0):
+    """
+    Find adjacent label pairs and return a sparse label adjacency matrix.
+
+    Label pairs are collected in a single pass over the edges of a surface
+    mesh (VTK file) or over the voxel faces of an image volume (each axis
+    of the volume is compared once with its shifted copy), and duplicate
+    pairs are removed with np.unique on packed pair codes.
+
+    For surfaces, each pair of labels on either side of a mesh edge is
+    stored once (lower label number first), and pairs with an ignored label
+    are skipped. For volumes, pairs are stored in both directions, skipping
+    ignored labels and (as before) neighboring labels that are not positive.
+
+    Parameters
+    ----------
+    label_file : string
+        path to VTK surface file or nibabel-readable volume file with labels
+    ignore_values : list of integers
+        labels to ignore
+    add_value : integer
+        value to add to labels
+
+    Returns
+    -------
+    labels : list
+        label numbers (row and column order of the adjacency matrix)
+    matrix : scipy.sparse csr_matrix of floats
+        adjacency matrix (1 for a pair of adjacent labels)
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import nibabel as nb
+    >>> from mindboggle.mio.colors import sparse_label_adjacency
+    >>> data = np.array([[[0, 3, 3], [2, 2, 3], [2, 4, 4]]], dtype='int16')
+    >>> nb.save(nb.Nifti1Image(data, np.eye(4)), 'adjacency_test.nii.gz')
+    >>> labels, matrix = sparse_label_adjacency('adjacency_test.nii.gz',
+    ...                                         ignore_values=[-1, 0])
+    >>> labels
+    [2, 3, 4]
+    >>> matrix.toarray().tolist()
+    [[0.0, 1.0, 1.0], [1.0, 0.0, 1.0], [1.0, 1.0, 0.0]]
+
+    """
+    import numpy as np
+    from scipy import sparse
+
+    from mindboggle.mio.vtks import read_vtk
+
+    # ------------------------------------------------------------------------
+    # Labels on either side of each surface mesh edge:
+    # ------------------------------------------------------------------------
+    if label_file.endswith('.vtk'):
+        f1,f2,f3, faces, labels, f4, npoints, f5 = read_vtk(label_file,
+                                                            True, True)
+        labels = np.asarray(labels)
+        faces = np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+        edges = np.vstack((faces[:, [0, 1]], faces[:, [1, 2]],
+                           faces[:, [2, 0]]))
+        labels1 = labels[edges[:, 0]]
+        labels2 = labels[edges[:, 1]]
+        differ = labels1 != labels2
+        labels1, labels2 = np.minimum(labels1[differ], labels2[differ]), \
+                           np.maximum(labels1[differ], labels2[differ])
+        keep = ~(np.isin(labels1, ignore_values) |
+                 np.isin(labels2, ignore_values))
+
+    # ------------------------------------------------------------------------
+    # Labels on either side of each voxel face (volume vs. shifted volume):
+    # ------------------------------------------------------------------------
+    elif label_file.endswith('.nii.gz'):
+        from nibabel import load
+
+        L = load(label_file).get_data()
+        labels1 = []
+        labels2 = []
+        for axis in range(L.ndim):
+            lower = [slice(None)] * L.ndim
+            upper = [slice(None)] * L.ndim
+            lower[axis] = slice(None, -1)
+            upper[axis] = slice(1, None)
+            lower = L[tuple(lower)]
+            upper = L[tuple(upper)]
+            differ = lower != upper
+            labels1.extend([lower[differ], upper[differ]])
+            labels2.extend([upper[differ], lower[differ]])
+        labels1 = np.concatenate(labels1)
+        labels2 = np.concatenate(labels2)
+        keep = ~np.isin(labels1, ignore_values) & (labels2 > 0)
+
+    else:
+        raise IOError("Use appropriate input file type.")
+
+    labels1 = labels1[keep].astype(np.int64) + int(add_value)
+    labels2 = labels2[keep].astype(np.int64) + int(add_value)
+
+    # ------------------------------------------------------------------------
+    # Unique pairs (packed as row * nlabels + column) in a sparse matrix:
+    # ------------------------------------------------------------------------
+    unique_labels = np.union1d(labels1, labels2)
+    nlabels = np.size(unique_labels)
+    pairs = np.unique(np.searchsorted(unique_labels, labels1) * nlabels +
+                      np.searchsorted(unique_labels, labels2))
+    matrix = sparse.csr_matrix((np.ones(len(pairs)),
+                                (pairs // nlabels, pairs % nlabels)),
+                               shape=(nlabels, nlabels))
+
+    return unique_labels.tolist(), matrix
+
+
 def label_adjacency_matrix(label_file, ignore_values=[-1, 999], add_value=0,
                            save_table=True, output_format='csv',
                            verbose=True, out_dir='.'):
@@ -185,9 +476,10 @@ def label_adjacency_matrix(label_file, ignore_values=[-1, 999], add_value=0,
     Extract surface or volume label boundaries, find unique label pairs,
     and write adjacency matrix (useful for constructing a colormap).
 
-    Each row of the (upper triangular) adjacency matrix corresponds to an
-    index to a unique label, where each column has a 1 if the label indexed
-    by that column is adjacent to the label indexed by the row.
+    Each row of the adjacency matrix corresponds to an index to a unique
+    label, where each column has a 1 if the label indexed by that column
+    is adjacent to the label indexed by the row (upper triangular for
+    surfaces; see sparse_label_adjacency()).
 
     Parameters
     ----------
@@ -242,73 +534,22 @@ def label_adjacency_matrix(label_file, ignore_values=[-1, 999], add_value=0,
     True
 
     """
-    import numpy as np
     import pandas as pd
-    from nibabel import load
-    from scipy import ndimage
 
-    from mindboggle.guts.mesh import find_neighbors
-    from mindboggle.guts.segment import extract_borders
-    from mindboggle.mio.vtks import read_vtk
+    from mindboggle.mio.colors import sparse_label_adjacency
 
-    # Use Mindboggle's extract_borders() function for surface VTK files:
+    labels, matrix = sparse_label_adjacency(label_file, ignore_values,
+                                            add_value)
     if label_file.endswith('.vtk'):
-        f1,f2,f3, faces, labels, f4, npoints, f5 = read_vtk(label_file,
-                                                            True, True)
-        neighbor_lists = find_neighbors(faces, npoints)
-        return_label_pairs = True
-        indices_borders, label_pairs, f1 = extract_borders(list(range(npoints)),
-            labels, neighbor_lists, ignore_values, return_label_pairs)
-
         output_table = 'adjacent_surface_labels.' + output_format
-
-    # Use scipy to dilate volume files to find neighboring labels:
-    elif label_file.endswith('.nii.gz'):
-
-        L = load(label_file).get_data()
-        unique_volume_labels = np.unique(L)
-
-        label_pairs = []
-        for label in unique_volume_labels:
-
-            if label not in ignore_values:
-
-                B = L * np.logical_xor(ndimage.binary_dilation(L==int(label)),
-                                       (L==int(label)))
-                neighbor_labels = np.unique(np.ravel(B))
-
-                for neigh in neighbor_labels:
-                    if neigh > 0 and neigh in unique_volume_labels:
-                    #        and neigh%2==(int(label)%2):
-                        label_pairs.append([int(label), int(neigh)])
-
-        output_table = 'adjacent_volume_labels.' + output_format
-
     else:
-        raise IOError("Use appropriate input file type.")
-
+        output_table = 'adjacent_volume_labels.' + output_format
     output_table = os.path.join(out_dir, output_table)
 
-    # Find unique pairs (or first two of each list):
-    pairs = []
-    for pair in label_pairs:
-        new_pair = [int(pair[0]) + add_value,
-                    int(pair[1]) + add_value]
-        if new_pair not in pairs:
-            pairs.append(new_pair)
-
     # Write adjacency matrix:
-    unique_labels = np.unique(pairs)
-    nlabels = np.size(unique_labels)
-    matrix = np.zeros((nlabels, nlabels))
-    for pair in pairs:
-        index1 = [i for i, x in enumerate(unique_labels) if x == pair[0]]
-        index2 = [i for i, x in enumerate(unique_labels) if x == pair[1]]
-        matrix[index1, index2] = 1
-
-    df1 = pd.DataFrame({'ID': unique_labels}, index=None)
-    df2 = pd.DataFrame(matrix, index=None)
-    df2.columns = unique_labels
+    df1 = pd.DataFrame({'ID': labels}, index=None)
+    df2 = pd.DataFrame(matrix.toarray(), index=None)
+    df2.columns = labels
     matrix = pd.concat([df1, df2], axis=1)
 
     if save_table:
@@ -321,8 +562,6 @@ def label_adjacency_matrix(label_file, ignore_values=[-1, 999], add_value=0,
     else:
         output_table = None
 
-    labels = list(unique_labels)
-
     return labels, matrix, output_table
 
 
@@ -465,12 +704,10 @@ def group_colors(colormap, colormap_name, description='', adjacency_matrix=[],
     import numpy as np
     import matplotlib.pyplot as plt
     import networkx as nx
-    from colormath.color_diff import delta_e_cie2000
-    from colormath.color_objects import LabColor, AdobeRGBColor
-    from colormath.color_conversions import convert_color
     import itertools
 
     from mindboggle.mio.colors import write_json_colormap, write_xml_colormap
+    from mindboggle.mio.colors import rgb_to_lab, delta_e_cie2000
 
     # ------------------------------------------------------------------------
     # Set parameters for graph layout and output files:
@@ -523,10 +760,7 @@ def group_colors(colormap, colormap_name, description='', adjacency_matrix=[],
     # Convert to Lab color space which better represents human perception:
     # ------------------------------------------------------------------------
     # https://python-colormath.readthedocs.io/en/latest/illuminants.html
-    lab_colors = []
-    for rgb in colors:
-        lab_colors.append(convert_color(AdobeRGBColor(rgb[0], rgb[1], rgb[2]),
-                                        LabColor))
+    lab_colors = rgb_to_lab(np.asarray(colors, dtype=np.float64))
 
     # ------------------------------------------------------------------------
     # Load label adjacency matrix:
@@ -594,11 +828,9 @@ def group_colors(colormap, colormap_name, description='', adjacency_matrix=[],
     # ------------------------------------------------------------------------
     if verbose:
         print("Create a similarity matrix for pairs of colors.")
-    dx_matrix = np.zeros((nlabels, nlabels))
-    for icolor1 in range(nlabels):
-        for icolor2 in range(nlabels):
-            dx_matrix[icolor1,icolor2] = delta_e_cie2000(lab_colors[icolor1],
-                                                         lab_colors[icolor2])
+    dx_matrix = delta_e_cie2000(lab_colors[:, np.newaxis, :],
+                                lab_colors[np.newaxis, :, :])
+
     # ------------------------------------------------------------------------
     # Sort colors by decreasing perceptual difference from all other colors:
     # ------------------------------------------------------------------------
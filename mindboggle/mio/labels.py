@@ -3967,6 +3967,10 @@ class DKTprotocol(object):
     [left_, right_]sulcus_label_pair_lists : list of two lists of lists of integer pairs
         list containing left and/or right lists, each with multiple lists of
         integer pairs corresponding to label boundaries / sulcus / fundus
+    lookups() : dictionary of numpy arrays (cached per process)
+        label number and sulcus label pair lookup tables used by
+        label_indices(), map_label_[names, colors, hemispheres, categories](),
+        sulcus_ids(), and is_sulcus_label_pair()
 
     Examples
     --------
@@ -4477,6 +4481,313 @@ class DKTprotocol(object):
     else:
         sulcus_label_pair_lists = pair_lists
 
+    # ------------------------------------------------------------------------
+    # NumPy lookup tables (built on first use, then shared by all instances
+    # in the process):
+    # ------------------------------------------------------------------------
+    category_names = ['cerebrum_cortex', 'ventricle', 'cerebrum_noncortex',
+                      'cerebellum_cortex', 'cerebellum_noncortex',
+                      'brainstem', 'extra', 'misc']
+    hemisphere_names = ['', 'left', 'right', 'medial']
+    pair_base = 2**20  # label pairs are packed as min(pair)*pair_base+max
+    _lookups = None
+
+    @classmethod
+    def lookups(cls):
+        """
+        Return lookup arrays for label numbers and sulcus label pairs.
+
+        Returns
+        -------
+        lookups : dictionary
+            'index': index into numbers for each label number from 0 to
+            max(numbers) (-1 if not a FreeSurferColorLUT.txt label);
+            'names', 'colors', 'hemispheres', 'categories': names, colors,
+            and indices into hemisphere_names and category_names, each
+            aligned with numbers;
+            'pair_codes': sorted, packed sulcus label pairs;
+            'pair_sulcus_ids': index into sulcus_label_pair_lists for each
+            packed pair;
+            'pair_hemisphere_ids': index into the left (or right) sulcus
+            label pair lists for each packed pair
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> lookups = DKTprotocol.lookups()
+        >>> index = lookups['index'][1028]
+        >>> str(lookups['names'][index])
+        'ctx-lh-superiorfrontal'
+        >>> DKTprotocol.category_names[lookups['categories'][index]]
+        'cerebrum_cortex'
+
+        """
+        import numpy as np
+
+        if cls._lookups is not None:
+            return cls._lookups
+
+        numbers = np.asarray(cls.numbers, dtype=np.int64)
+        index = -1 * np.ones(numbers.max() + 1, dtype=np.int64)
+        index[numbers] = np.arange(len(numbers))
+
+        # Hemisphere and category of each label number (ventricles are
+        # assigned after noncortex labels, which include them):
+        hemispheres = np.zeros(len(numbers), dtype=np.int8)
+        categories = (len(cls.category_names) - 1) * \
+                     np.ones(len(numbers), dtype=np.int8)
+        for hemisphere, category, category_numbers in [
+                (1, 0, cls.left_cerebrum_cortex_numbers),
+                (2, 0, cls.right_cerebrum_cortex_numbers),
+                (1, 2, cls.left_cerebrum_noncortex_numbers),
+                (2, 2, cls.right_cerebrum_noncortex_numbers),
+                (3, 2, cls.medial_cerebrum_noncortex_numbers),
+                (1, 1, cls.left_ventricle_numbers),
+                (2, 1, cls.right_ventricle_numbers),
+                (3, 1, cls.medial_ventricle_numbers),
+                (1, 3, cls.left_cerebellum_cortex_numbers),
+                (2, 3, cls.right_cerebellum_cortex_numbers),
+                (1, 4, cls.left_cerebellum_noncortex_numbers),
+                (2, 4, cls.right_cerebellum_noncortex_numbers),
+                (3, 4, cls.medial_cerebellum_noncortex_numbers),
+                (0, 5, cls.brainstem_numbers),
+                (0, 6, cls.extra_numbers)]:
+            if category_numbers:
+                hemispheres[index[category_numbers]] = hemisphere
+                categories[index[category_numbers]] = category
+
+        # Packed sulcus label pairs:
+        pairs = []
+        sulcus_ids = []
+        hemisphere_ids = []
+        nsulci = len(cls.left_sulcus_label_pair_lists)
+        for sulcus_id, pair_list in enumerate(cls.sulcus_label_pair_lists):
+            for pair in pair_list:
+                pairs.append(pair)
+                sulcus_ids.append(sulcus_id)
+                hemisphere_ids.append(sulcus_id % nsulci)
+        pair_codes = cls.pack_label_pairs(pairs)
+        order = np.argsort(pair_codes, kind='mergesort')
+
+        cls._lookups = {'index': index,
+                        'names': np.asarray(cls.names, dtype=object),
+                        'colors': np.asarray(cls.colors),
+                        'hemispheres': hemispheres,
+                        'categories': categories,
+                        'pair_codes': pair_codes[order],
+                        'pair_sulcus_ids': np.asarray(sulcus_ids)[order],
+                        'pair_hemisphere_ids':
+                            np.asarray(hemisphere_ids)[order]}
+
+        return cls._lookups
+
+    @classmethod
+    def label_indices(cls, labels):
+        """
+        Return the index into numbers of each label (-1 if not found).
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> DKTprotocol.label_indices([1028, 2028, -1, 999999]).tolist()
+        [400, 436, -1, -1]
+
+        """
+        import numpy as np
+
+        index = cls.lookups()['index']
+        labels = np.asarray(labels)
+        integers = np.round(labels).astype(np.int64)
+        found = (integers == labels) & (integers >= 0) & \
+                (integers < len(index))
+        indices = -1 * np.ones(labels.shape, dtype=np.int64)
+        indices[found] = index[integers[found]]
+
+        return indices
+
+    @classmethod
+    def map_label_names(cls, labels, missing=''):
+        """
+        Map label numbers to names (missing value for unknown labels).
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> DKTprotocol.map_label_names([1028, -1]).tolist()
+        ['ctx-lh-superiorfrontal', '']
+
+        """
+        import numpy as np
+
+        indices = cls.label_indices(labels)
+        names = np.empty(indices.shape, dtype=object)
+        names[:] = missing
+        names[indices >= 0] = cls.lookups()['names'][indices[indices >= 0]]
+
+        return names
+
+    @classmethod
+    def map_label_colors(cls, labels, missing=(0, 0, 0)):
+        """
+        Map label numbers to RGB colors (missing color for unknown labels).
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> DKTprotocol.map_label_colors([1028, -1]).tolist()
+        [[20, 220, 160], [0, 0, 0]]
+
+        """
+        import numpy as np
+
+        indices = cls.label_indices(labels)
+        colors = cls.lookups()['colors']
+        mapped = np.empty(indices.shape + (3,), dtype=colors.dtype)
+        mapped[:] = missing
+        mapped[indices >= 0] = colors[indices[indices >= 0]]
+
+        return mapped
+
+    @classmethod
+    def map_label_hemispheres(cls, labels):
+        """
+        Map label numbers to 'left', 'right', 'medial' or '' (neither).
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> DKTprotocol.map_label_hemispheres([1028, 2028, 14, 16]).tolist()
+        ['left', 'right', 'medial', '']
+
+        """
+        import numpy as np
+
+        indices = cls.label_indices(labels)
+        hemispheres = np.zeros(indices.shape, dtype=np.int8)
+        hemispheres[indices >= 0] = \
+            cls.lookups()['hemispheres'][indices[indices >= 0]]
+
+        return np.asarray(cls.hemisphere_names, dtype=object)[hemispheres]
+
+    @classmethod
+    def map_label_categories(cls, labels):
+        """
+        Map label numbers to category_names ('misc' for unknown labels).
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> DKTprotocol.map_label_categories([1028, 4, 7, 16, -1]).tolist()
+        ['cerebrum_cortex', 'ventricle', 'cerebellum_noncortex', 'brainstem', 'misc']
+
+        """
+        import numpy as np
+
+        indices = cls.label_indices(labels)
+        categories = (len(cls.category_names) - 1) * \
+                     np.ones(indices.shape, dtype=np.int8)
+        categories[indices >= 0] = \
+            cls.lookups()['categories'][indices[indices >= 0]]
+
+        return np.asarray(cls.category_names, dtype=object)[categories]
+
+    @classmethod
+    def pack_label_pairs(cls, label_pairs):
+        """
+        Pack label pairs, in either order, into single integers.
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> codes = DKTprotocol.pack_label_pairs([[1003, 1028], [1028, 1003]])
+        >>> bool(codes[0] == codes[1])
+        True
+
+        """
+        import numpy as np
+
+        label_pairs = np.asarray(label_pairs, dtype=np.int64).reshape(-1, 2)
+
+        return label_pairs.min(axis=1) * cls.pair_base + \
+               label_pairs.max(axis=1)
+
+    @classmethod
+    def sulcus_ids(cls, label_pairs, hemi=''):
+        """
+        Return the sulcus ID of each label pair (-1 if not a sulcus pair).
+
+        Parameters
+        ----------
+        label_pairs : list or array of pairs of integers
+            label pairs (in either order); other label tuples, such as
+            the label triples returned by extract_borders(), are not
+            sulcus label pairs
+        hemi : string
+            '' for indices into sulcus_label_pair_lists (left then right);
+            'lh' or 'rh' for indices into left_ or
+            right_sulcus_label_pair_lists (-1 for the other hemisphere)
+
+        Returns
+        -------
+        ids : numpy array of integers
+            sulcus ID of each label pair
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> pairs = [[1003, 1028], [2028, 2003], [1003, 1005]]
+        >>> DKTprotocol.sulcus_ids(pairs).tolist()
+        [1, 25, -1]
+        >>> DKTprotocol.sulcus_ids(pairs, 'lh').tolist()
+        [1, -1, -1]
+        >>> DKTprotocol.sulcus_ids(pairs, 'rh').tolist()
+        [-1, 1, -1]
+        >>> DKTprotocol.sulcus_ids([[1003, 1028, 1029], [1003, 1028]]).tolist()
+        [-1, 1]
+
+        """
+        import numpy as np
+
+        lookups = cls.lookups()
+        pair_codes = lookups['pair_codes']
+        if not (isinstance(label_pairs, np.ndarray) and
+                label_pairs.ndim == 2 and label_pairs.shape[1] == 2):
+            label_pairs = [x if len(x) == 2 else [-1, -1]
+                           for x in label_pairs]
+        codes = cls.pack_label_pairs(label_pairs)
+        found = np.searchsorted(pair_codes, codes)
+        found[found == len(pair_codes)] = 0
+        match = pair_codes[found] == codes
+        ids = -1 * np.ones(len(codes), dtype=np.int64)
+        if hemi:
+            if hemi not in ['lh', 'rh']:
+                raise IOError("Warning: hemisphere not properly specified "
+                              "('lh' or 'rh').")
+            nsulci = len(cls.left_sulcus_label_pair_lists)
+            if hemi == 'lh':
+                match &= lookups['pair_sulcus_ids'][found] < nsulci
+            else:
+                match &= lookups['pair_sulcus_ids'][found] >= nsulci
+            ids[match] = lookups['pair_hemisphere_ids'][found[match]]
+        else:
+            ids[match] = lookups['pair_sulcus_ids'][found[match]]
+
+        return ids
+
+    @classmethod
+    def is_sulcus_label_pair(cls, label_pairs):
+        """
+        Return whether each label pair is a sulcus label pair.
+
+        Examples
+        --------
+        >>> from mindboggle.mio.labels import DKTprotocol
+        >>> DKTprotocol.is_sulcus_label_pair([[1003, 1028], [3, 28]]).tolist()
+        [True, False]
+
+        """
+        return cls.sulcus_ids(label_pairs) >= 0
+
 
 """
 # ------------------------------------------------------------------------
@@ -21,7 +21,7 @@ def write_shape_stats(labels_or_file=[], sulci=[], fundi=[],
         sulci_spectra=[], sulci_spectra_IDs=[],
         labels_zernike=[], labels_zernike_IDs=[],
         sulci_zernike=[], sulci_zernike_IDs=[],
-        exclude_labels=[-1], verbose=False):
+        exclude_labels=[-1], verbose=False, standard_points=[]):
     """
     Make tables of shape statistics per label, sulcus, and/or fundus.
 
@@ -86,6 +86,9 @@ def write_shape_stats(labels_or_file=[], sulci=[], fundi=[],
         indices to be excluded (in addition to -1)
     verbose : bool
         print statements?
+    standard_points : numpy array of floats [#vertices by 3]
+        vertex coordinates in standard space, if already transformed
+        (instead of transforming with affine_transform_files)
 
     Returns
     -------
@@ -147,7 +150,7 @@ def write_shape_stats(labels_or_file=[], sulci=[], fundi=[],
     from mindboggle.guts.compute import stats_per_label
     from mindboggle.guts.compute import means_per_label
     from mindboggle.guts.compute import sum_per_label
-    from mindboggle.mio.vtks import read_scalars, read_vtk
+    from mindboggle.mio.vtks import read_scalars, read_vtk, read_points
     from mindboggle.mio.vtks import apply_affine_transforms
     from mindboggle.mio.labels import DKTprotocol
 
@@ -194,30 +197,44 @@ def write_shape_stats(labels_or_file=[], sulci=[], fundi=[],
                    mean_curvature_file, freesurfer_curvature_file,
                    freesurfer_thickness_file, freesurfer_sulc_file]
     shape_arrays = []
+    shape_array_names = []
     first_pass = True
     area_array = []
+    points = []
+    affine_points = []
 
     for ishape, shape_file in enumerate(shape_files):
-        if os.path.exists(shape_file):
-            if first_pass:
+        if shape_file and os.path.exists(shape_file):
+            # Read geometry only from a VTK file (not from a .npy sidecar):
+            if first_pass and not shape_file.endswith('.npy'):
                 points, indices, lines, faces, scalars_array, scalar_names, \
                     npoints, input_vtk = read_vtk(shape_file, True, True)
                 points = np.array(points)
                 first_pass = False
-                if affine_transform_files and transform_format:
-                    affine_points, \
-                        foo1 = apply_affine_transforms(affine_transform_files,
-                                    inverse_booleans, transform_format,
-                                    points, vtk_file_stem='')
             else:
                 scalars_array, name = read_scalars(shape_file, True, True)
             if scalars_array.size:
                 shape_arrays.append(scalars_array)
+                shape_array_names.append(shape_names[ishape])
 
                 # Store area array:
                 if ishape == 0:
                     area_array = scalars_array.copy()
 
+    # Or read geometry from the labels VTK file if no shape file is VTK:
+    if first_pass and isinstance(labels_or_file, str) and \
+            labels_or_file.endswith('.vtk'):
+        points = np.array(read_points(labels_or_file))
+
+    # Vertex coordinates in standard space:
+    if np.size(standard_points):
+        affine_points = np.asarray(standard_points)
+    elif np.size(points) and affine_transform_files and transform_format:
+        affine_points, \
+            foo1 = apply_affine_transforms(affine_transform_files,
+                        inverse_booleans, transform_format,
+                        points, vtk_file_stem='')
+
     if normalize_by_area:
         use_area = area_array
     else:
@@ -260,14 +277,14 @@ def write_shape_stats(labels_or_file=[], sulci=[], fundi=[],
             # ----------------------------------------------------------------
             column_names.extend(column_names[:])
             for ishape, shape_array in enumerate(shape_arrays):
-                shape = shape_names[ishape]
+                shape = shape_array_names[ishape]
                 if verbose:
                     print('  Compute statistics on {0} {1}...'.
                         format(feature_name, shape))
                 # ------------------------------------------------------------
                 # Append feature areas to columns:
                 # ------------------------------------------------------------
-                if ishape == 0 and np.size(area_array):
+                if shape == 'area' and np.size(area_array):
                     sums, label_list = sum_per_label(shape_array,
                         feature_list, include_labels, exclude_labels)
                     column_names.append(shape)
@@ -302,20 +319,21 @@ def write_shape_stats(labels_or_file=[], sulci=[], fundi=[],
             # ----------------------------------------------------------------
             # Mean positions in the original space:
             # ----------------------------------------------------------------
-            # Compute mean position per feature:
-            positions, sdevs, label_list, foo = means_per_label(points,
-                feature_list, include_labels, exclude_labels, use_area)
+            if np.size(points):
+                # Compute mean position per feature:
+                positions, sdevs, label_list, foo = means_per_label(points,
+                    feature_list, include_labels, exclude_labels, use_area)
 
-            # Append mean x,y,z position per feature to columns:
-            xyz_positions = np.asarray(positions)
-            for ixyz, xyz in enumerate(['x','y','z']):
-                column_names.append('mean position: {0}'.format(xyz))
-                columns.append(xyz_positions[:, ixyz].tolist())
+                # Append mean x,y,z position per feature to columns:
+                xyz_positions = np.asarray(positions)
+                for ixyz, xyz in enumerate(['x','y','z']):
+                    column_names.append('mean position: {0}'.format(xyz))
+                    columns.append(xyz_positions[:, ixyz].tolist())
 
             # ----------------------------------------------------------------
             # Mean positions in standard space:
             # ----------------------------------------------------------------
-            if affine_transform_files and transform_format:
+            if np.size(affine_points):
                 # Compute standard space mean position per feature:
                 standard_positions, sdevs, label_list, \
                 foo = means_per_label(affine_points,
@@ -409,10 +427,15 @@ def write_vertex_measures(output_table, labels_or_file, sulci=[], fundi=[],
         transform_format='itk', area_file='', mean_curvature_file='',
         travel_depth_file='', geodesic_depth_file='',
         freesurfer_thickness_file='', freesurfer_curvature_file='',
-        freesurfer_sulc_file=''):
+        freesurfer_sulc_file='', standard_points=[], output_format='npz'):
     """
     Make a table of shape values per vertex.
 
+    Columns are typed numpy arrays (integer feature IDs, floating point
+    positions and shape values) written to a columnar file: numpy .npz
+    (one array per column), Parquet or Feather (with pandas and pyarrow),
+    or a CSV file.
+
     Note ::
         This function is tailored for Mindboggle outputs.
 
@@ -447,6 +470,11 @@ def write_vertex_measures(output_table, labels_or_file, sulci=[], fundi=[],
         name of VTK file with FreeSurfer curvature (curv) scalar values
     freesurfer_sulc_file :  string
         name of VTK file with FreeSurfer convexity (sulc) scalar values
+    standard_points : numpy array of floats [#vertices by 3]
+        vertex coordinates in standard space, if already transformed
+        (instead of transforming with affine_transform_files)
+    output_format : string
+        output file format: 'npz', 'parquet', 'feather' or 'csv'
 
     Returns
     -------
@@ -457,7 +485,7 @@ def write_vertex_measures(output_table, labels_or_file, sulci=[], fundi=[],
     >>> import os
     >>> from mindboggle.mio.vtks import read_scalars
     >>> from mindboggle.mio.tables import write_vertex_measures
-    >>> output_table = '' #vertex_shapes.csv'
+    >>> output_table = '' #vertices.npz'
     >>> from mindboggle.mio.fetch_data import prep_tests
     >>> urls, fetch_data = prep_tests()
     >>> labels_or_file = fetch_data(urls['left_freesurfer_labels'], '', '.vtk')
@@ -507,24 +535,29 @@ def write_vertex_measures(output_table, labels_or_file, sulci=[], fundi=[],
     """
     import os
     import numpy as np
-    import pandas as pd
 
     from mindboggle.mio.vtks import read_scalars, read_vtk, \
         apply_affine_transforms
 
-    # Make sure inputs are lists:
-    if isinstance(labels_or_file, np.ndarray):
-        labels = [int(x) for x in labels_or_file]
-    elif isinstance(labels_or_file, list):
+    if output_format == 'npz':
+        extension = '.npz'
+    elif output_format == 'parquet':
+        extension = '.parquet'
+    elif output_format == 'feather':
+        extension = '.feather'
+    elif output_format == 'csv':
+        extension = '.csv'
+    else:
+        raise IOError("Use 'npz', 'parquet', 'feather' or 'csv' "
+                      "output format.")
+
+    # Load labels if labels_or_file is a string:
+    if isinstance(labels_or_file, str):
+        labels, name = read_scalars(labels_or_file, True, True)
+    else:
         labels = labels_or_file
-    elif isinstance(labels_or_file, str):
-        labels, name = read_scalars(labels_or_file)
-    if isinstance(sulci, np.ndarray):
-        sulci = [int(x) for x in sulci]
-    if isinstance(fundi, np.ndarray):
-        fundi = [int(x) for x in fundi]
 
-    if not labels and not sulci and not fundi:
+    if not np.size(labels) and not np.size(sulci) and not np.size(fundi):
         raise IOError('No feature data to tabulate in write_vertex_measures().')
 
     # Feature names and corresponding feature lists:
@@ -541,51 +574,71 @@ def write_vertex_measures(output_table, labels_or_file, sulci=[], fundi=[],
                    mean_curvature_file, freesurfer_curvature_file,
                    freesurfer_thickness_file, freesurfer_sulc_file]
 
-    # Append columns of per-vertex scalar values:
-    columns = []
-    column_names = []
+    # ------------------------------------------------------------------------
+    # Typed columns of per-vertex feature IDs, positions and shape values:
+    # ------------------------------------------------------------------------
+    feature_columns = []
     for ifeature, values in enumerate(feature_lists):
-        if values:
-            columns.append(values)
-            column_names.append(feature_names[ifeature])
+        if np.size(values):
+            feature_columns.append((feature_names[ifeature],
+                                    np.asarray(values).astype(np.int32)))
 
-    first_pass = True
+    position_columns = []
+    shape_columns = []
     for ishape, shape_file in enumerate(shape_files):
-        if os.path.exists(shape_file):
-            if first_pass:
+        if shape_file and os.path.exists(shape_file):
+            if not position_columns and not shape_file.endswith('.npy'):
 
                 # Append x,y,z position per vertex to columns:
                 points, indices, lines, faces, scalars, scalar_names, \
-                    npoints, input_vtk = read_vtk(shape_file)
-                xyz_positions = np.asarray(points)
+                    npoints, input_vtk = read_vtk(shape_file, True, True)
+                points = np.asarray(points)
                 for ixyz, xyz in enumerate(['x','y','z']):
-                    column_names.append('position: {0}'.format(xyz))
-                    columns.append(xyz_positions[:, ixyz].tolist())
-                first_pass = False
+                    position_columns.append(('position: {0}'.format(xyz),
+                                             points[:, ixyz]))
 
                 # Append standard space x,y,z position to columns:
-                if affine_transform_files and transform_format:
+                if np.size(standard_points):
+                    affine_points = np.asarray(standard_points)
+                elif affine_transform_files and transform_format:
                     affine_points, \
                         foo1 = apply_affine_transforms(affine_transform_files,
                                     inverse_booleans, transform_format,
                                     points, vtk_file_stem='')
-                    xyz_std_positions = affine_points
+                else:
+                    affine_points = []
+                if np.size(affine_points):
                     for ixyz, xyz in enumerate(['x','y','z']):
-                        column_names.append('position in standard space:'
-                                            ' {0}'.format(xyz))
-                        columns.append(xyz_std_positions[:, ixyz].tolist())
+                        position_columns.append(
+                            ('position in standard space: {0}'.format(xyz),
+                             affine_points[:, ixyz]))
             else:
-                scalars, name = read_scalars(shape_file)
-            if len(scalars):
-                columns.append(scalars)
-                column_names.append(shape_names[ishape])
+                scalars, name = read_scalars(shape_file, True, True)
+            if np.size(scalars):
+                shape_columns.append((shape_names[ishape],
+                                      np.asarray(scalars)))
+
+    columns = feature_columns + position_columns + shape_columns
 
-    # Prepend with column of indices and write table
+    # ------------------------------------------------------------------------
+    # Write table:
+    # ------------------------------------------------------------------------
     if not output_table:
-        output_table = os.path.join(os.getcwd(), 'vertices.csv')
+        output_table = os.path.join(os.getcwd(), 'vertices' + extension)
 
-    df = pd.DataFrame(np.transpose(columns), columns = column_names)
-    df.to_csv(output_table, index=False)
+    if output_format == 'npz':
+        with open(output_table, 'wb') as fid:
+            np.savez(fid, **dict(columns))
+    else:
+        import pandas as pd
+
+        df = pd.DataFrame(dict(columns))
+        if output_format == 'parquet':
+            df.to_parquet(output_table, index=False)
+        elif output_format == 'feather':
+            df.to_feather(output_table)
+        else:
+            df.to_csv(output_table, index=False)
 
     if not os.path.exists(output_table):
         raise IOError(output_table + " not found")
@@ -593,6 +646,100 @@ def write_vertex_measures(output_table, labels_or_file, sulci=[], fundi=[],
     return output_table
 
 
+def read_vertex_table(table_file, index_col=None):
+    """
+    Read a table of shape values per vertex in any format
+    written by write_vertex_measures().
+
+    Parameters
+    ----------
+    table_file : string
+        vertex table file (.npz, .parquet, .feather or .csv)
+    index_col : string or None
+        header of the column to use as the index (such as 'label ID')
+
+    Returns
+    -------
+    df : pandas DataFrame
+        table with one row per vertex
+
+    Examples
+    --------
+    >>> import os
+    >>> import tempfile
+    >>> import numpy as np
+    >>> from mindboggle.mio.tables import read_vertex_table
+    >>> table_file = os.path.join(tempfile.mkdtemp(), 'vertices.npz')
+    >>> np.savez(table_file, **{'label ID': np.array([3, 3, 5]),
+    ...                         'area': np.array([0.5, 1.0, 2.0])})
+    >>> df = read_vertex_table(table_file, index_col='label ID')
+    >>> df.index.tolist(), df['area'].tolist()
+    ([3, 3, 5], [0.5, 1.0, 2.0])
+
+    """
+    import os
+    import numpy as np
+    import pandas as pd
+
+    if not os.path.exists(table_file):
+        raise IOError(table_file + " not found")
+
+    if table_file.endswith('.npz'):
+        with np.load(table_file) as columns:
+            df = pd.DataFrame(dict((x, columns[x]) for x in columns.files),
+                              columns=columns.files)
+    elif table_file.endswith('.parquet'):
+        df = pd.read_parquet(table_file)
+    elif table_file.endswith('.feather'):
+        df = pd.read_feather(table_file)
+    else:
+        df = pd.read_csv(table_file)
+
+    if index_col is not None:
+        df = df.set_index(index_col)
+
+    return df
+
+
+def find_vertex_table(table_dir, stem='vertices'):
+    """
+    Find a vertex table in a directory, whatever its format.
+
+    Parameters
+    ----------
+    table_dir : string
+        directory containing the vertex table
+    stem : string
+        file name without extension
+
+    Returns
+    -------
+    table_file : string
+        first existing table file, trying extensions
+        .npz, .parquet, .feather and .csv in that order
+
+    Examples
+    --------
+    >>> import os
+    >>> import tempfile
+    >>> from mindboggle.mio.tables import find_vertex_table
+    >>> table_dir = tempfile.mkdtemp()
+    >>> fid = open(os.path.join(table_dir, 'vertices.csv'), 'w')
+    >>> fid.close()
+    >>> os.path.basename(find_vertex_table(table_dir))
+    'vertices.csv'
+
+    """
+    import os
+
+    for extension in ['.npz', '.parquet', '.feather', '.csv']:
+        table_file = os.path.join(table_dir, stem + extension)
+        if os.path.exists(table_file):
+            return table_file
+
+    raise IOError("No {0} table found in {1}".format(stem, table_dir))
+
+
 def write_face_vertex_averages(input_file, output_table='', area_file=''):
     """
     Make table of average vertex values per face
@@ -632,21 +779,16 @@ def write_face_vertex_averages(input_file, output_table='', area_file=''):
 
     points, indices, lines, faces, scalars, scalar_names, \
         npoints, input_vtk = read_vtk(input_file, True, True)
+    values = np.asarray(scalars, dtype=float)
     if area_file:
         area_scalars, name = read_scalars(area_file, True, True)
+        values = values / np.asarray(area_scalars, dtype=float)
 
     # --------------------------------------------------------------------
-    # For each face, average vertex values:
+    # Average vertex values of all faces at once (one row per face):
     # --------------------------------------------------------------------
-    columns = []
-    for face in faces:
-        values = []
-        for index in face:
-            if area_file:
-                values.append(scalars[index] / area_scalars[index])
-            else:
-                values.append(scalars[index])
-        columns.append(np.mean(values))
+    faces = np.reshape(np.asarray(faces, dtype=int), (-1, 3))
+    columns = values[faces].mean(axis=1)
 
     # ----------------------------------------------------------------
     # Write to table:
@@ -665,11 +807,20 @@ def write_face_vertex_averages(input_file, output_table='', area_file=''):
 
 def write_average_face_values_per_label(input_indices_vtk,
         input_values_vtk='', area_file='', output_stem='',
-        exclude_values=[-1], background_value=-1, verbose=False):
+        exclude_values=[-1], background_value=-1, verbose=False,
+        split_tables=False):
     """
-    Write out a separate csv table file for each integer
-    in (the first) scalar list of an input VTK file.
-    Optionally write the values drawn from a second VTK file.
+    Write a table of average vertex values per face, grouped by label.
+
+    A face belongs to a label when all three of its vertices have that
+    label in (the first) scalar list of the indices VTK file (as in
+    mindboggle.guts.mesh.keep_faces).  Values are drawn from a second VTK
+    file if provided (else from the indices file), and divided by vertex
+    area if an area file is provided.
+
+    The output is a single long-format table with one row per labeled face
+    (columns "label", "face", and "value"), sorted by label.  Optionally,
+    also write a separate csv table for each label.
 
     Parameters
     ----------
@@ -677,16 +828,26 @@ def write_average_face_values_per_label(input_indices_vtk,
         path of the input VTK file that contains indices as scalars
     input_values_vtk : string
         path of the input VTK file that contains values as scalars
+    area_file :  string
+        name of VTK file with surface area scalar values
     output_stem : string
-        path and stem of the output VTK file
+        path and stem of the output table file(s)
     exclude_values : list or array
         values to exclude
     background_value : integer or float
-        background value in output VTK files
-    scalar_name : string
-        name of a lookup table of scalars values
+        background value (faces with this label are excluded)
     verbose : bool
         print statements?
+    split_tables : bool
+        also write a separate table for each label
+        (output_stem + label + '.csv')?
+
+    Returns
+    -------
+    output_table :  string
+        long-format output table filename
+    label_tables :  list of strings
+        per-label output table filenames (empty unless split_tables)
 
     Examples
     --------
@@ -701,77 +862,92 @@ def write_average_face_values_per_label(input_indices_vtk,
     >>> exclude_values = [-1]
     >>> background_value = -1
     >>> verbose = False
-    >>> write_average_face_values_per_label(input_indices_vtk,
-    ...     input_values_vtk, area_file, output_stem, exclude_values,
-    ...     background_value, verbose)
-
-    View vtk file (skip test):
-
-    >>> from mindboggle.mio.plots import plot_surfaces
-    >>> example_vtk = os.path.join(os.getcwd(), output_stem + '0.vtk')
-    >>> plot_surfaces(example_vtk) # doctest: +SKIP
+    >>> split_tables = True
+    >>> output_table, label_tables = write_average_face_values_per_label(
+    ...     input_indices_vtk, input_values_vtk, area_file, output_stem,
+    ...     exclude_values, background_value, verbose, split_tables)
+    >>> os.path.basename(output_table)
+    'labels_thickness.csv'
 
     """
     import os
     import numpy as np
     import pandas as pd
 
-    from mindboggle.mio.vtks import read_scalars, read_vtk, write_vtk
-    from mindboggle.guts.mesh import keep_faces
+    from mindboggle.mio.vtks import read_scalars, read_vtk
 
     # Load VTK file:
     points, indices, lines, faces, scalars, scalar_names, npoints, \
         input_vtk = read_vtk(input_indices_vtk, True, True)
+    labels = np.asarray(scalars)
+    if input_values_vtk and input_values_vtk != input_indices_vtk:
+        if verbose:
+            print("Average values in {0} per face for each label in {1}".
+                  format(os.path.basename(input_values_vtk),
+                         os.path.basename(input_indices_vtk)))
+        values, name = read_scalars(input_values_vtk, True, True)
+        values = np.asarray(values, dtype=float)
+    else:
+        if verbose:
+            print("Average values per face for each label in {0}".
+                  format(os.path.basename(input_indices_vtk)))
+        values = labels.astype(float)
     if area_file:
         area_scalars, name = read_scalars(area_file, True, True)
+        values = values / np.asarray(area_scalars, dtype=float)
+
+    # --------------------------------------------------------------------
+    # Average vertex values of all faces at once, and keep faces
+    # whose three vertices share a (non-excluded) label:
+    # --------------------------------------------------------------------
+    faces = np.reshape(np.asarray(faces, dtype=int), (-1, 3))
+    face_values = values[faces].mean(axis=1)
+    face_labels = labels[faces]
+    keep = np.all(face_labels == face_labels[:, [0]], axis=1)
+    face_labels = face_labels[:, 0]
+    keep &= ~np.isin(face_labels, list(exclude_values) + [background_value])
+    face_indices = np.flatnonzero(keep)
+
+    # --------------------------------------------------------------------
+    # Group faces by label with a single (stable) sort:
+    # --------------------------------------------------------------------
+    order = np.argsort(face_labels[face_indices], kind='stable')
+    face_indices = face_indices[order]
+    face_labels = face_labels[face_indices].astype(int)
+    face_values = face_values[face_indices]
+    unique_labels, starts, counts = np.unique(face_labels,
+                                              return_index=True,
+                                              return_counts=True)
     if verbose:
-        print("Explode the scalar list in {0}".
-            format(os.path.basename(input_indices_vtk)))
-    if input_values_vtk != input_indices_vtk:
-        if verbose:
-            print("Explode the scalar list of values in {0} "
-                  "with the scalar list of indices in {1}".
-                format(os.path.basename(input_values_vtk),
-                       os.path.basename(input_indices_vtk)))
-
-    # Loop through unique (non-excluded) scalar values:
-    unique_scalars = [int(x) for x in np.unique(scalars)
-                      if x not in exclude_values]
-    for scalar in unique_scalars:
-
-        keep_indices = [x for sublst in faces for x in sublst]
-        new_faces = keep_faces(faces, keep_indices)
-
-        # Create array and indices for scalar value:
-        select_scalars = np.copy(scalars)
-        select_scalars[scalars != scalar] = background_value
-        scalar_indices = [i for i,x in enumerate(select_scalars) if x==scalar]
-        if verbose:
-            print("  Scalar {0}: {1} vertices".format(scalar,
-                                                      len(scalar_indices)))
+        for label, count in zip(unique_labels, counts):
+            print("  Label {0}: {1} faces".format(label, count))
 
-        # --------------------------------------------------------------------
-        # For each face, average vertex values:
-        # --------------------------------------------------------------------
-        output_table = os.path.join(os.getcwd(),
-                                    output_stem+str(scalar)+'.csv')
-        columns = []
-        for face in new_faces:
-            values = []
-            for index in face:
-                if area_file:
-                    values.append(scalars[index] / area_scalars[index])
-                else:
-                    values.append(scalars[index])
-            columns.append(np.mean(values))
+    # ----------------------------------------------------------------
+    # Write to table(s):
+    # ----------------------------------------------------------------
+    if not output_stem:
+        output_stem = 'average_face_values_per_label'
+    output_table = os.path.join(os.getcwd(), output_stem + '.csv')
+    df = pd.DataFrame({'label': face_labels,
+                       'face': face_indices,
+                       'value': face_values},
+                      columns=['label', 'face', 'value'])
+    df.to_csv(output_table, index=False)
+    if not os.path.exists(output_table):
+        raise IOError(output_table + " not found")
 
-        # ----------------------------------------------------------------
-        # Write to table:
-        # ----------------------------------------------------------------
-        df = pd.DataFrame({'': columns})
-        df.to_csv(output_table, index=False)
-        if not os.path.exists(output_table):
-            raise IOError(output_table + " not found")
+    label_tables = []
+    if split_tables:
+        for label, start, count in zip(unique_labels, starts, counts):
+            label_table = os.path.join(os.getcwd(),
+                                       output_stem + str(label) + '.csv')
+            df = pd.DataFrame({'': face_values[start:start + count]})
+            df.to_csv(label_table, index=False)
+            if not os.path.exists(label_table):
+                raise IOError(label_table + " not found")
+            label_tables.append(label_table)
+
+    return output_table, label_tables
 
 
 def select_column_from_tables(tables, index=0, write_table=True,
@@ -964,6 +1140,7 @@ def explode_table(input_table='', column_headers=[], output_path=None,
     ----------
     input_table : string
         path to input table to be broken up into separate tables
+        (any vertex table format read by read_vertex_table())
     column_headers : list of strings
         headers for columns to break up by break_column indices
     output_path : string
@@ -999,7 +1176,8 @@ def explode_table(input_table='', column_headers=[], output_path=None,
     """
     import os
     import numpy as np
-    import pandas as pd
+
+    from mindboggle.mio.tables import read_vertex_table
 
     if output_path is None:
         output_path = os.getcwd()
@@ -1011,7 +1189,7 @@ def explode_table(input_table='', column_headers=[], output_path=None,
         print("Explode {0} by {1} values".format(input_table,
                                                  break_column))
 
-    df = pd.read_csv(input_table, header=0, index_col=break_column)
+    df = read_vertex_table(input_table, index_col=break_column)
 
     df1 = df[column_headers]
     unique_labels = [int(x) for x in np.unique(df1.index)]
@@ -1065,6 +1243,8 @@ def explode_mindboggle_tables(subject_path='', output_path='.',
     """
     import os
 
+    from mindboggle.mio.tables import explode_table, find_vertex_table
+
     if not os.path.exists(output_path):
         if verbose:
             print("{0} does not exist".format(output_path))
@@ -1080,9 +1260,9 @@ def explode_mindboggle_tables(subject_path='', output_path='.',
                 os.mkdir(output_dir)
             if os.path.exists(output_dir):
 
-                vertices_table = os.path.join(subject_path, 'tables',
-                                              side + '_cortical_surface',
-                                              'vertices.csv')
+                vertices_table = find_vertex_table(
+                    os.path.join(subject_path, 'tables',
+                                 side + '_cortical_surface'))
                 if verbose:
                     print("Explode {0} by {1} values".
                         format(vertices_table, break_column))
@@ -1136,16 +1316,92 @@ def fname2df(fname):
     return df_row
 
 
-def collate_participant_tables(subject_ids, base_dir):
+def participant_table_files(subject_id, base_dir):
+    """
+    List a participant's Mindboggle table files (except vertices tables).
+
+    Parameters
+    ----------
+    subject_id: str
+        a subject identifier
+    base_dir: str
+        path to a mindboggle output base directory (mindboggled)
+
+    Returns
+    -------
+    table_files : list of strings
+        sorted paths to the subject's table (csv) files
+    """
+    from glob import glob
+    import os
+
+    fl = glob(os.path.join(base_dir, subject_id, 'tables', '*.csv')) + \
+         glob(os.path.join(base_dir, subject_id, 'tables', '*', '*.csv'))
+    # skip vertices outputs
+    return [val for val in sorted(fl) if 'vertices' not in val]
+
+
+def participant_table_row(subject_id, base_dir):
+    """
+    Generate a single-row pandas dataframe for one subject
+
+    Parameters
+    ----------
+    subject_id: str
+        a subject identifier
+    base_dir: str
+        path to a mindboggle output base directory (mindboggled)
+
+    Returns
+    -------
+    table_row : pandas DataFrame
+        row (indexed by subject_id) of shape measures
+    """
+    import pandas as pd
+
+    dft = pd.concat([fname2df(val) for val in
+                     participant_table_files(subject_id, base_dir)], axis=1)
+    dft.index = [subject_id]
+    return dft
+
+
+def _mp_participant_table_row_worker(args):
+    from mindboggle.mio.tables import participant_table_row
+    return participant_table_row(*args)
+
+
+def collate_participant_tables(subject_ids, base_dir, output_dir='',
+                               output_format='parquet', nprocesses=1,
+                               verbose=False):
     """
     Generate a pandas dataframe across all subjects
 
+    Each subject's tables are parsed into one row (participant_table_row()),
+    optionally in a pool of processes, and the rows are concatenated once.
+
+    If output_dir is given, each subject's row is also stored there as a
+    partition file (<subject>.parquet or <subject>.h5), together with a
+    manifest (manifest.csv) of the path, modification time (mtime, in
+    nanoseconds) and size of every table file that went into each row.
+    Subjects whose table files are unchanged since the last run are then
+    read from their partitions instead of being parsed again.
+
+    NOTE: Storing partitions requires pyarrow (Parquet) or PyTables (HDF5).
+
     Parameters
     ----------
     subject_ids: list
         a list of subject identifiers in
     base_dir: str
         path to a mindboggle output base directory (mindboggled)
+    output_dir: str
+        (optional) directory for partition files and manifest
+    output_format: str
+        partition file format: 'parquet' or 'hdf5'
+    nprocesses: int
+        number of processes (1 to parse subjects serially)
+    verbose: bool
+        print statements?
 
     Returns
     -------
@@ -1164,19 +1420,105 @@ def collate_participant_tables(subject_ids, base_dir):
     Name: lcsfs-sylvian fissure-area, dtype: float64
 
     """
-    from glob import glob
     import os
     import pandas as pd
 
-    out = None
+    if output_format == 'parquet':
+        extension = '.parquet'
+    elif output_format == 'hdf5':
+        extension = '.h5'
+    else:
+        raise IOError("Use 'parquet' or 'hdf5' output format.")
+
+    # Parse each subject once, in order of first appearance:
+    unique_ids = []
     for id in subject_ids:
-        fl = glob(os.path.join(base_dir, id, 'tables', '*.csv')) + \
-             glob(os.path.join(base_dir, id, 'tables', '*', '*.csv'))
-        # skip vertices outputs
-        dft = pd.concat([fname2df(val) for val in sorted(fl)
-                         if 'vertices' not in val], axis=1)
-        dft.index = [id]
-        out = dft if out is None else pd.concat((out, dft), axis=0)
+        if id not in unique_ids:
+            unique_ids.append(id)
+
+    # ------------------------------------------------------------------------
+    # Compare table files with the manifest of a previous run:
+    # ------------------------------------------------------------------------
+    rows = {}
+    parse_ids = unique_ids
+    if output_dir:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        manifest_file = os.path.join(output_dir, 'manifest.csv')
+        columns = ['subject', 'path', 'mtime', 'size']
+        if os.path.exists(manifest_file):
+            manifest = pd.read_csv(manifest_file, dtype={'subject': str,
+                                                         'path': str})
+        else:
+            manifest = pd.DataFrame(columns=columns)
+
+        file_stats = []
+        for id in unique_ids:
+            for table_file in participant_table_files(id, base_dir):
+                stat = os.stat(table_file)
+                file_stats.append([id, table_file, stat.st_mtime_ns,
+                                   stat.st_size])
+        file_stats = pd.DataFrame(file_stats, columns=columns)
+
+        previous = manifest.groupby('subject')
+        current = file_stats.groupby('subject')
+        parse_ids = []
+        for id in unique_ids:
+            partition = os.path.join(output_dir, str(id) + extension)
+            unchanged = False
+            if id in previous.groups and id in current.groups and \
+                    os.path.exists(partition):
+                old = previous.get_group(id)[columns[1:]]
+                new = current.get_group(id)[columns[1:]]
+                unchanged = sorted(map(tuple, old.values.tolist())) == \
+                            sorted(map(tuple, new.values.tolist()))
+            if unchanged:
+                if output_format == 'parquet':
+                    rows[id] = pd.read_parquet(partition)
+                else:
+                    rows[id] = pd.read_hdf(partition, 'table')
+            else:
+                parse_ids.append(id)
+        if verbose:
+            print("Parse tables for {0} of {1} subjects".format(
+                len(parse_ids), len(unique_ids)))
+
+    # ------------------------------------------------------------------------
+    # Parse new or changed subjects' tables:
+    # ------------------------------------------------------------------------
+    args = [(id, base_dir) for id in parse_ids]
+    if nprocesses > 1 and len(args) > 1:
+        import multiprocessing as mp
+
+        process_pool = mp.Pool(min(nprocesses, len(args)))
+        try:
+            results = process_pool.imap(_mp_participant_table_row_worker,
+                                        args)
+            for id, dft in zip(parse_ids, results):
+                rows[id] = dft
+            process_pool.close()
+        finally:
+            process_pool.terminate()
+            process_pool.join()
+    else:
+        for id, arg in zip(parse_ids, args):
+            rows[id] = _mp_participant_table_row_worker(arg)
+
+    # ------------------------------------------------------------------------
+    # Store new partitions and update the manifest:
+    # ------------------------------------------------------------------------
+    if output_dir:
+        for id in parse_ids:
+            partition = os.path.join(output_dir, str(id) + extension)
+            if output_format == 'parquet':
+                rows[id].to_parquet(partition)
+            else:
+                rows[id].to_hdf(partition, key='table', mode='w')
+        manifest = pd.concat([manifest[~manifest.subject.isin(unique_ids)],
+                              file_stats], axis=0)
+        manifest.to_csv(manifest_file, index=False)
+
+    out = pd.concat([rows[id] for id in subject_ids], axis=0)
     return out
 
 
@@ -229,10 +229,14 @@ def read_scalars(filename, return_first=True, return_array=False):
     """
     Load all scalar lookup tables from a VTK file.
 
+    A numpy (.npy) file, such as a sidecar array written by
+    freesurfer_hemisphere_to_vtk(), is read as a single lookup table
+    named after the file.
+
     Parameters
     ----------
     filename : string
-        The path/filename of a VTK format file.
+        The path/filename of a VTK format (or .npy) file.
     return_first : bool
         Return only the first list of scalar values?
     return_array : bool (only if return_first)
@@ -259,10 +263,21 @@ def read_scalars(filename, return_first=True, return_array=False):
     [0.02026, 0.06009, 0.12859, 0.04564, 0.00774]
 
     """
-    #import os
+    import os
+    import numpy as np
+
+    # Load a sidecar array without parsing any surface geometry:
+    if filename.endswith('.npy'):
+        scalars = np.load(filename)
+        scalar_names = os.path.basename(filename)[:-len('.npy')]
+        if not (return_first and return_array):
+            scalars = scalars.tolist()
+        if not return_first:
+            scalars = [scalars]
+            scalar_names = [scalar_names]
+        return scalars, scalar_names
+
     import vtk
-    if return_first and return_array:
-        import numpy as np
 
     Reader = vtk.vtkDataSetReader()
     Reader.SetFileName(filename)
@@ -739,6 +754,108 @@ def write_vtk(output_vtk, points, indices=[], lines=[], faces=[],
         raise IOError(output_vtk + " not found")
 
 
+def write_binary_vtk(output_vtk, points, faces=[], scalars=[],
+                     scalar_names=[],
+                     title='Generated by Mindboggle (www.mindboggle.info)'):
+    """
+    Save a surface mesh and any number of lookup tables to a binary VTK file.
+
+    Unlike write_vtk(), points, faces and scalars are written as big-endian
+    binary arrays in one pass, so files are smaller and much faster to write
+    and to load.  The file is read like any other VTK file (read_vtk(),
+    read_scalars()).  Lookup tables of integers are saved as int,
+    all others as float.
+
+    Parameters
+    ----------
+    output_vtk : string
+        path of the output VTK file
+    points : list of 3-tuples of floats or Nx3 numpy array
+        coordinates of the points
+    faces : list of 3-tuples of integers or Mx3 numpy array
+        indices to the three vertices of a face on the mesh
+    scalars : list of lists or numpy arrays of N floats or integers
+        each list (lookup table) contains values assigned to the vertices
+    scalar_names : list of strings
+        each element is the name of a lookup table (use unbroken strings)
+    title : string
+        title in the VTK header
+
+    Returns
+    -------
+    output_vtk : string
+        path of the output VTK file
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.mio.vtks import write_binary_vtk
+    >>> points = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    >>> faces = [[0, 1, 2], [0, 1, 3]]
+    >>> scalars = [np.array([3, 3, 5, 5]), np.array([0.1, 0.2, 0.3, 0.4])]
+    >>> output_vtk = write_binary_vtk('write_binary_vtk.vtk', points, faces,
+    ...                               scalars, ['labels', 'depth'])
+    >>> with open(output_vtk, 'rb') as fid:
+    ...     fid.read(12)
+    b'# vtk DataFi'
+
+    """
+    import os
+    import numpy as np
+    from io import open
+
+    points = np.asarray(points, dtype='>f4')
+    faces = np.asarray(faces, dtype='>i4')
+    if isinstance(scalar_names, str):
+        scalar_names = [scalar_names]
+    if len(scalar_names) < len(scalars):
+        raise IOError("Provide a name for each list of scalars.")
+
+    output_vtk = os.path.join(os.getcwd(), output_vtk)
+
+    Fp = open(output_vtk, 'wb')
+
+    def write_text(text):
+        Fp.write(text.encode('ascii'))
+
+    header = '# vtk DataFile Version 2.0\n{0}\nBINARY\nDATASET POLYDATA\n'
+    write_text(header.format(title[:255]))
+    write_text('POINTS {0} float\n'.format(len(points)))
+    Fp.write(points.tobytes())
+    write_text('\n')
+    if faces.size:
+        nvertices = faces.shape[1]
+        face_name = {3: 'POLYGONS', 2: 'LINES'}.get(nvertices)
+        if not face_name:
+            raise IOError('Unrecognized number of vertices per face')
+        cells = np.hstack((np.full((len(faces), 1), nvertices),
+                           faces)).astype('>i4')
+        write_text('{0} {1} {2}\n'.format(face_name, len(faces), cells.size))
+        Fp.write(cells.tobytes())
+        write_text('\n')
+    for iscalar, scalar_list in enumerate(scalars):
+        scalar_list = np.asarray(scalar_list)
+        if len(scalar_list) != len(points):
+            raise IOError("Scalars {0} do not match the number of points.".
+                          format(scalar_names[iscalar]))
+        if iscalar == 0:
+            write_text('POINT_DATA {0}\n'.format(len(points)))
+        if np.issubdtype(scalar_list.dtype, np.integer):
+            scalar_type, dtype = 'int', '>i4'
+        else:
+            scalar_type, dtype = 'float', '>f4'
+        write_text('SCALARS {0} {1} 1\nLOOKUP_TABLE default\n'.
+                   format(scalar_names[iscalar], scalar_type))
+        Fp.write(scalar_list.astype(dtype).tobytes())
+        write_text('\n')
+    Fp.close()
+
+    if not os.path.exists(output_vtk):
+        raise IOError(output_vtk + " not found")
+
+    return output_vtk
+
+
 def rewrite_scalars(input_vtk, output_vtk, new_scalars,
                     new_scalar_names=['scalars'], filter_scalars=[],
                     background_value=-1):
@@ -1224,148 +1341,185 @@ def scalars_checker(scalars, scalar_names):
     return scalars, scalar_names
 
 
-# def read_itk_transform_old(transform_file):
-#     """
-#     Read ITK transform file and output transform array.
-#
-#     ..ITK affine transform file format ::
-#
-#     #Insight Transform File V1.0
-#     #Transform 0
-#     Transform: MatrixOffsetTransformBase_double_3_3
-#     Parameters: 0.90768 0.043529 0.0128917 -0.0454455 0.868937 0.406098 \
-#     0.0179439 -0.430013 0.783074 -0.794889 -18.3346 -3.14767
-#     FixedParameters: -0.60936 21.1593 10.6148
-#
-#     Parameters
-#     ----------
-#     transform_file : string
-#         name of ITK affine transform file
-#
-#     Returns
-#     -------
-#     transform : numpy array
-#         4x4 affine transform matrix
-#     fixed_parameters : numpy array
-#         FixedParameters vector
-#
-#     Examples
-#     --------
-#     >>> import os
-#     >>> from mindboggle.mio.vtks import read_itk_transform_old
-#     >>> transform_file = os.path.join('mri',
-#     ...                               't1weighted_brain.MNI152Affine.txt') # doctest: +SKIP
-#     >>> read_itk_transform_old(transform_file) # doctest: +SKIP
-#     (array([[ 9.07680e-01, 4.35290e-02, 1.28917e-02, -7.94889e-01],
-#     [ -4.54455e-02, 8.68937e-01, 4.06098e-01, -1.83346e+01],
-#     [ 1.79439e-02, -4.30013e-01, 7.83074e-01, -3.14767e+00],
-#     [ 0.00000e+00, 0.00000e+00, 0.00000e+00, 1.00000e+00]]),
-#     [-0.60936, 21.1593, 10.6148])
-#
-#     """
-#     import numpy as np
-#     from io import open
-#
-#     transform = np.eye(4)
-#
-#     # Read ITK transform file
-#     fid = open(transform_file, 'r')
-#     affine_lines = fid.readlines()
-#
-#     affine = affine_lines[3]
-#     affine = affine.split()
-#     affine = [np.float(x) for x in affine[1::]]
-#     affine = np.reshape(affine, (4,3))
-#     linear_transform = affine[0:3,:]
-#     translation = affine[3,:]
-#     transform[0:3,0:3] = linear_transform
-#     transform[0:3,3] = translation
-#
-#     fixed_parameters = affine_lines[4]
-#     fixed_parameters = fixed_parameters.split()
-#     fixed_parameters = [np.float(x) for x in fixed_parameters[1::]]
-#
-#     return transform, fixed_parameters
-#
-#
-# def read_itk_transform(transform_file):
-#     """
-#     Read ITK transform file and output transform array.
-#
-#     Daniel Haehn's implementation: https://gist.github.com/haehn/5614966
-#
-#     ..ITK affine transform file format ::
-#
-#         #Insight Transform File V1.0
-#         #Transform 0
-#         Transform: MatrixOffsetTransformBase_double_3_3
-#         Parameters: 0.90768 0.043529 0.0128917 -0.0454455 0.868937 0.406098 \
-#                     0.0179439 -0.430013 0.783074 -0.794889 -18.3346 -3.14767
-#         FixedParameters: -0.60936 21.1593 10.6148
-#
-#     Parameters
-#     ----------
-#     transform_file : string
-#         name of ITK affine transform file
-#
-#     Returns
-#     -------
-#     transform : numpy array
-#         4x4 affine transform matrix
-#
-#     Examples
-#     --------
-#     >>> import os
-#     >>> from mindboggle.mio.vtks import read_itk_transform
-#     >>> transform_file = os.path.join('mri',
-#     ...                               't1weighted_brain.MNI152Affine.txt') # doctest: +SKIP
-#     >>> read_itk_transform(transform_file) # doctest: +SKIP
-#     array([[  9.07680e-01,   4.35290e-02,   1.28917e-02,   -8.16765e-01],
-#            [ -4.54455e-02,   8.68937e-01,   4.06098e-01,   -2.31926e+01],
-#            [  1.79439e-02,  -4.30013e-01,   7.83074e-01,   3.52899e+00],
-#            [  0 0 0 1]])
-#     """
-#     import numpy as np
-#     from io import open
-#
-#     # Read the transform:
-#     transform = None
-#     with open( transform_file, 'r' ) as f:
-#       for line in f:
-#
-#         # Check for Parameters:
-#         if line.startswith( 'Parameters:' ):
-#           values = line.split( ': ' )[1].split( ' ' )
-#
-#           # Filter empty spaces and line breaks:
-#           values = [float( e ) for e in values if ( e != '' and e != '\n' )]
-#           # Create the upper left of the matrix:
-#           transform_upper_left = np.reshape( values[0:9], ( 3, 3 ) )
-#           # Grab the translation as well:
-#           translation = values[9:]
-#
-#         # Check for FixedParameters:
-#         if line.startswith( 'FixedParameters:' ):
-#           values = line.split( ': ' )[1].split( ' ' )
-#
-#           # Filter empty spaces and line breaks:
-#           values = [float( e ) for e in values if ( e != '' and e != '\n' )]
-#           # Set up the center:
-#           center = values
-#
-#     # Compute the offset:
-#     offset = np.ones( 4 )
-#     for i in range( 0, 3 ):
-#       offset[i] = translation[i] + center[i];
-#       for j in range( 0, 3 ):
-#         offset[i] -= transform_upper_left[i][j] * center[i]
-#
-#     # add the [0, 0, 0] line:
-#     transform = np.vstack( ( transform_upper_left, [0, 0, 0] ) )
-#     # and the [offset, 1] column:
-#     transform = np.hstack( ( transform, np.reshape( offset, ( 4, 1 ) ) ) )
-#
-#     return transform
+def read_itk_transform(transform_file):
+    """
+    Read a linear ITK transform file and output a 4x4 affine matrix.
+
+    Reads text (.txt) and Matlab (.mat) ITK transform files, as written by
+    ANTs, containing a matrix-based transform (AffineTransform,
+    MatrixOffsetTransformBase or Rigid3DTransform), or a CompositeTransform
+    of such transforms. ITK transforms map a point x (in ITK's LPS
+    coordinates) to A(x - c) + t + c, where the Parameters are the 3x3
+    matrix A (row by row) and translation t, and the FixedParameters are
+    the center c.
+
+    ..ITK affine transform file format ::
+
+        #Insight Transform File V1.0
+        #Transform 0
+        Transform: MatrixOffsetTransformBase_double_3_3
+        Parameters: 0.90768 0.043529 0.0128917 -0.0454455 0.868937 0.406098 \
+                    0.0179439 -0.430013 0.783074 -0.794889 -18.3346 -3.14767
+        FixedParameters: -0.60936 21.1593 10.6148
+
+    Parameters
+    ----------
+    transform_file : string
+        name of ITK transform file
+
+    Returns
+    -------
+    transform : numpy array
+        4x4 affine transform matrix
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.mio.vtks import read_itk_transform
+    >>> transform_file = 'itk_affine.txt'
+    >>> with open(transform_file, 'w') as f:
+    ...     x = f.write('#Insight Transform File V1.0\\n'
+    ...                 '#Transform 0\\n'
+    ...                 'Transform: AffineTransform_double_3_3\\n'
+    ...                 'Parameters: 2 0 0 0 1 0 0 0 1 10 20 30\\n'
+    ...                 'FixedParameters: 1 1 1\\n')
+    >>> transform = read_itk_transform(transform_file)
+    >>> print(np.array_str(transform, precision=5, suppress_small=True))
+    [[ 2.  0.  0.  9.]
+     [ 0.  1.  0. 20.]
+     [ 0.  0.  1. 30.]
+     [ 0.  0.  0.  1.]]
+
+    """
+    import os
+    import numpy as np
+
+    linear_types = ('AffineTransform', 'MatrixOffsetTransformBase',
+                    'Rigid3DTransform')
+
+    def affine_matrix(parameters, center):
+        parameters = np.asarray(parameters, dtype=np.float64).ravel()
+        center = np.asarray(center, dtype=np.float64).ravel()
+        if len(parameters) != 12:
+            raise IOError("Expected 12 linear transform parameters in {0}.".
+                          format(transform_file))
+        if len(center) < 3:
+            center = np.zeros(3)
+        matrix = parameters[0:9].reshape(3, 3)
+        transform = np.eye(4)
+        transform[0:3, 0:3] = matrix
+        transform[0:3, 3] = parameters[9:12] + center[0:3] - \
+                            np.dot(matrix, center[0:3])
+        return transform
+
+    if not os.path.exists(transform_file):
+        raise IOError("{0} does not exist.".format(transform_file))
+
+    # Matlab-format transform file (one transform):
+    if transform_file.endswith('.mat'):
+        from scipy.io import loadmat
+
+        try:
+            contents = loadmat(transform_file)
+        except Exception:
+            raise IOError("Cannot read {0} as a Matlab transform file.".
+                          format(transform_file))
+        names = [x for x in contents if x.startswith(linear_types)]
+        if len(names) != 1:
+            raise IOError("{0} does not contain a linear transform.".
+                          format(transform_file))
+        return affine_matrix(contents[names[0]],
+                             contents.get('fixed', np.zeros(3)))
+
+    # Text transform file (one transform, or a composite of transforms
+    # applied in reverse order):
+    elif transform_file.endswith('.txt') or transform_file.endswith('.tfm'):
+        with open(transform_file, 'r') as f:
+            lines = f.readlines()
+        if not lines or not lines[0].startswith('#Insight Transform File'):
+            raise IOError("{0} is not an ITK transform file.".
+                          format(transform_file))
+        transforms = []
+        composite = False
+        for line in lines:
+            if line.startswith('Transform:'):
+                transform_type = line.split(':', 1)[1].strip()
+                if transform_type.startswith('CompositeTransform'):
+                    composite = True
+                elif transform_type.startswith(linear_types):
+                    transforms.append([None, []])
+                else:
+                    raise IOError("{0} is not a linear transform ({1}).".
+                                  format(transform_file, transform_type))
+            elif line.startswith('Parameters:') and transforms:
+                transforms[-1][0] = line.split(':', 1)[1].split()
+            elif line.startswith('FixedParameters:') and transforms:
+                transforms[-1][1] = line.split(':', 1)[1].split()
+        if not transforms or (len(transforms) > 1 and not composite) or \
+                any([x[0] is None for x in transforms]):
+            raise IOError("Cannot read a linear transform from {0}.".
+                          format(transform_file))
+        transform = np.eye(4)
+        for parameters, center in transforms:
+            transform = np.dot(transform, affine_matrix(parameters, center))
+        return transform
+
+    else:
+        raise IOError("{0} is not a linear ITK transform file "
+                      "(.txt or .mat).".format(transform_file))
+
+
+def compose_itk_transforms(transform_files, inverse_booleans=[]):
+    """
+    Compose linear ITK transforms (and their inverses) into one matrix.
+
+    As for ANTs (antsApplyTransforms, antsApplyTransformsToPoints),
+    transforms are applied in reverse order: the last one is applied first.
+
+    Parameters
+    ----------
+    transform_files : list of strings
+        names of linear ITK transform files
+    inverse_booleans : list of zeros and ones
+        for each transform, 1 to take the inverse, else 0
+
+    Returns
+    -------
+    transform : numpy array
+        4x4 affine transform matrix
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.mio.vtks import compose_itk_transforms
+    >>> transform_file = 'itk_affine.txt'
+    >>> with open(transform_file, 'w') as f:
+    ...     x = f.write('#Insight Transform File V1.0\\n'
+    ...                 '#Transform 0\\n'
+    ...                 'Transform: AffineTransform_double_3_3\\n'
+    ...                 'Parameters: 2 0 0 0 1 0 0 0 1 10 20 30\\n'
+    ...                 'FixedParameters: 1 1 1\\n')
+    >>> transform = compose_itk_transforms([transform_file, transform_file],
+    ...                                    [0, 1])
+    >>> print(np.array_str(transform, precision=5, suppress_small=True))
+    [[1. 0. 0. 0.]
+     [0. 1. 0. 0.]
+     [0. 0. 1. 0.]
+     [0. 0. 0. 1.]]
+
+    """
+    import numpy as np
+
+    from mindboggle.mio.vtks import read_itk_transform
+
+    transform = np.eye(4)
+    for ixfm, transform_file in enumerate(transform_files):
+        matrix = read_itk_transform(transform_file)
+        if ixfm < len(inverse_booleans) and inverse_booleans[ixfm]:
+            matrix = np.linalg.inv(matrix)
+        transform = np.dot(transform, matrix)
+
+    return transform
 
 
 def apply_affine_transforms(transform_files, inverse_booleans,
@@ -1378,10 +1532,15 @@ def apply_affine_transforms(transform_files, inverse_booleans,
     applying the inverse affine transform because ITK uses a different
     coordinate system than the NIfTI coordinate system.
 
+    Linear ITK transforms are read, inverted and composed in memory
+    (compose_itk_transforms()), and applied to all points at once;
+    ANTs' antsApplyTransformsToPoints is called only if a transform is
+    not linear (such as a warp field).
+
     Parameters
     ----------
     transform files : list of strings
-        names of affine transform files
+        names of affine (or, with ANTs, nonlinear) transform files
     inverse_booleans : list of of zeros and ones
         for each transform, 1 to take the inverse, else 0
     transform_format : string
@@ -1433,24 +1592,12 @@ def apply_affine_transforms(transform_files, inverse_booleans,
     """
     import os
     import numpy as np
-    #from scipy.io import loadmat
 
     from mindboggle.thirdparty.ants import antsApplyTransformsToPoints
-    from mindboggle.mio.vtks import read_vtk, write_vtk
-                                        #read_itk_transform
+    from mindboggle.mio.vtks import read_vtk, write_vtk, \
+        compose_itk_transforms
     transform_format = 'itk'
 
-    ## Read affine transform file:
-    # if transform_format == 'itk':
-    #     transform = read_itk_transform(transform_file)
-    # elif transform_format == 'txt':
-    #     transform = np.loadtxt(transform_file)
-    # elif transform_format == 'mat':
-    #     transform = loadmat(transform_file)
-    # else:
-    #     import sys
-    #     sys.exit('Transform file format not understood.')
-
     # Read VTK file:
     if isinstance(vtk_or_points, str):
         points, indices, lines, faces, scalars, scalar_names, npoints, \
@@ -1468,15 +1615,25 @@ def apply_affine_transforms(transform_files, inverse_booleans,
     # applying the inverse affine transform because ITK uses a different
     # coordinate system than the NIfTI coordinate system.
     if transform_format == 'itk' and len(points):
+        points = np.asarray(points, dtype=np.float64)
         points[:, :2] = points[:, :2] * np.array((-1, -1))
-        affine_points = antsApplyTransformsToPoints(points,
-                            transform_files, inverse_booleans)
-        affine_points = np.array(affine_points)
+
+        # Compose linear transforms (and inverses) into one matrix:
+        try:
+            transform = compose_itk_transforms(transform_files,
+                                               inverse_booleans)
+        except (IOError, np.linalg.LinAlgError):
+            transform = None
+
+        if transform is not None:
+            affine_points = np.dot(points[:, 0:3], transform[0:3, 0:3].T) + \
+                            transform[0:3, 3]
+        # Call ANTs for nonlinear transforms:
+        else:
+            affine_points = antsApplyTransformsToPoints(points,
+                                transform_files, inverse_booleans)
+            affine_points = np.array(affine_points)
         affine_points[:, :2] = affine_points[:, :2] * np.array((-1, -1))
-        ## fix alternative to ANTs: compose transforms and take inverse(s)
-        # points = np.concatenate((points,
-        #                          np.ones((1, np.shape(points)[1]))), axis=0)
-        # affine_points = np.transpose(np.dot(transform, points))[:, 0:3]
     else:
         affine_points = []
 
@@ -1503,6 +1660,72 @@ def apply_affine_transforms(transform_files, inverse_booleans,
     return affine_points, output_file
 
 
+def read_freesurfer_surface(surface_file, orig_file=''):
+    """
+    Read a FreeSurfer surface file and transform it into scanner RAS space.
+
+    The surface coordinates are transformed according to the vox2ras
+    transform in FreeSurfer's mri/orig.mgz file.
+
+    Parameters
+    ----------
+    surface_file : string
+        name of FreeSurfer surface file
+    orig_file : string
+        name of FreeSurfer mri/orig.mgz file; if blank, looks for orig.mgz
+        in '../mri' relative to the surface file
+
+    Returns
+    -------
+    points : Nx3 numpy array of floats
+        coordinates of the surface vertices in scanner RAS space
+    faces : Mx3 numpy array of integers
+        indices to the three vertices of each face
+
+    Examples
+    --------
+    >>> import os
+    >>> from mindboggle.mio.vtks import read_freesurfer_surface
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> surface_file = fetch_data(urls['left_freesurfer_pial'], '', '.pial')
+    >>> orig_file = fetch_data(urls['freesurfer_orig_mgz'], '', '.mgz')
+    >>> os.rename(orig_file, orig_file + '.mgz')
+    >>> orig_file = orig_file + '.mgz'
+    >>> points, faces = read_freesurfer_surface(surface_file, orig_file)
+    >>> points.shape[1], faces.shape[1]
+    (3, 3)
+
+    """
+    import os
+    import numpy as np
+    import nibabel as nb
+
+    points, faces = nb.freesurfer.read_geometry(surface_file)
+
+    # Transform surface coordinates into normal scanner RAS.
+    # See example 3 in "Transforms within a subject's anatomical space":
+    # https://surfer.nmr.mgh.harvard.edu/fswiki/CoordinateSystems
+
+    if not orig_file:
+        orig_file = os.path.join(os.path.dirname(surface_file),
+                                 "..", "mri", "orig.mgz")
+
+    if os.path.exists(orig_file):
+        Norig = nb.load(orig_file).affine
+        Torig = np.array([[-1, 0, 0, 128],
+                          [0, 0, 1, -128],
+                          [0, -1, 0, 128],
+                          [0, 0, 0, 1]], dtype=float)
+        xfm = np.dot(Norig, np.linalg.inv(Torig))
+        points = np.dot(points, xfm[0:3, 0:3].T) + xfm[0:3, 3]
+    else:
+        raise IOError(orig_file + " does not exist in the FreeSurfer "
+                      "subjects directory.")
+
+    return points, faces
+
+
 def freesurfer_surface_to_vtk(surface_file, orig_file='', output_vtk=''):
     """
     Convert FreeSurfer surface file to VTK format.
@@ -1551,37 +1774,12 @@ def freesurfer_surface_to_vtk(surface_file, orig_file='', output_vtk=''):
 
     """
     import os
-    import nibabel as nb
     from io import open
 
-    from mindboggle.mio.vtks import write_header, write_points, write_faces
-
-    surf = nb.freesurfer.read_geometry(surface_file)
-    points = surf[0]
-    faces = surf[1]
-
-    # Transform surface coordinates into normal scanner RAS.
-    # See example 3 in "Transforms within a subject's anatomical space":
-    # https://surfer.nmr.mgh.harvard.edu/fswiki/CoordinateSystems
-
-    if not orig_file:
-        orig_file = os.path.join(os.path.dirname(surface_file),
-                                 "..", "mri", "orig.mgz")
+    from mindboggle.mio.vtks import write_header, write_points, \
+        write_faces, read_freesurfer_surface
 
-    if os.path.exists(orig_file):
-        import numpy as np
-        Norig = nb.load(orig_file).get_affine()
-        Torig = np.array([[-1, 0, 0, 128],
-                          [0, 0, 1, -128],
-                          [0, -1, 0, 128],
-                          [0, 0, 0, 1]], dtype=float)
-        xfm = np.dot(Norig, np.linalg.inv(Torig))
-        points = np.transpose(np.dot(xfm, np.transpose(
-            np.concatenate((points, np.ones((np.shape(points)[0],1))),
-                           axis=1))))[:,0:3]
-    else:
-        raise IOError(orig_file + " does not exist in the FreeSurfer "
-                      "subjects directory.")
+    points, faces = read_freesurfer_surface(surface_file, orig_file)
 
     if not output_vtk:
         output_vtk = os.path.join(os.getcwd(),
@@ -1742,6 +1940,135 @@ def freesurfer_annot_to_vtk(annot_file, vtk_file, output_vtk='',
     return labels, output_vtk
 
 
+def freesurfer_hemisphere_to_vtk(surface_file, orig_file='',
+                                 curvature_file='', sulc_file='',
+                                 thickness_file='', annot_file='',
+                                 output_vtk=''):
+    """
+    Convert a FreeSurfer hemisphere's surface and measures in one pass.
+
+    The surface, curvature (curv), convexity (sulc), thickness and .annot
+    files are each read once, and saved together as a single binary VTK
+    surface file, with labels (if any) as the first lookup table.
+    Each measure is also saved as a lightweight sidecar array (.npy) that
+    read_scalars() reads without loading the surface, for nodes that
+    expect one file per measure.  This replaces calling
+    freesurfer_surface_to_vtk(), freesurfer_curvature_to_vtk() and
+    freesurfer_annot_to_vtk() separately, each of which rewrites the
+    full surface.
+
+    Parameters
+    ----------
+    surface_file : string
+        name of FreeSurfer surface file (such as lh.pial)
+    orig_file : string
+        name of FreeSurfer mri/orig.mgz file
+        (see read_freesurfer_surface())
+    curvature_file : string
+        name of FreeSurfer curvature (curv) file (optional)
+    sulc_file : string
+        name of FreeSurfer convexity (sulc) file (optional)
+    thickness_file : string
+        name of FreeSurfer thickness file (optional)
+    annot_file : string
+        name of FreeSurfer .annot file (optional)
+    output_vtk : string
+        name of output VTK file; if blank, appends ".vtk" to surface_file
+        and saves to the current working directory
+
+    Returns
+    -------
+    output_vtk : string
+        name of output VTK file with all measures
+    curvature_array_file : string
+        name of curvature sidecar array file ('' if no curvature_file)
+    sulc_array_file : string
+        name of convexity sidecar array file ('' if no sulc_file)
+    thickness_array_file : string
+        name of thickness sidecar array file ('' if no thickness_file)
+    labels : numpy array of integers
+        one label per vertex ([] if no annot_file)
+
+    Examples
+    --------
+    >>> import os
+    >>> from mindboggle.mio.vtks import freesurfer_hemisphere_to_vtk
+    >>> from mindboggle.mio.vtks import read_scalars
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> surface_file = fetch_data(urls['left_freesurfer_pial'], '', '.pial')
+    >>> orig_file = fetch_data(urls['freesurfer_orig_mgz'], '', '.mgz')
+    >>> thickness_file = fetch_data(urls['left_freesurfer_thickness'], '', '')
+    >>> annot_file = fetch_data(urls['left_freesurfer_aparc_annot'], '', '.annot')
+    >>> os.rename(orig_file, orig_file + '.mgz')
+    >>> orig_file = orig_file + '.mgz'
+    >>> output_vtk, curv, sulc, thickness, labels = freesurfer_hemisphere_to_vtk(
+    ...     surface_file, orig_file, '', '', thickness_file, annot_file,
+    ...     'freesurfer_hemisphere_to_vtk.vtk')
+    >>> scalars, names = read_scalars(output_vtk, False)
+    >>> names
+    ['Labels', 'thickness']
+    >>> thicknesses, name = read_scalars(thickness, True, True)
+    >>> len(thicknesses) == len(labels)
+    True
+
+    View output vtk file (skip test):
+
+    >>> from mindboggle.mio.plots import plot_surfaces
+    >>> plot_surfaces(output_vtk) # doctest: +SKIP
+
+    """
+    import os
+    import numpy as np
+    import nibabel as nb
+
+    from mindboggle.mio.vtks import read_freesurfer_surface, \
+        write_binary_vtk
+
+    points, faces = read_freesurfer_surface(surface_file, orig_file)
+
+    # Labels (see notes in freesurfer_annot_to_vtk()):
+    scalars = []
+    scalar_names = []
+    labels = []
+    if annot_file:
+        labels, ctab, names = nb.freesurfer.read_annot(annot_file)
+        scalars.append(labels)
+        scalar_names.append('Labels')
+
+    # Read each measure once, and save it as a sidecar array:
+    array_files = []
+    for measure_file, measure_name in [(curvature_file, 'curv'),
+                                       (sulc_file, 'sulc'),
+                                       (thickness_file, 'thickness')]:
+        array_file = ''
+        if measure_file:
+            values = nb.freesurfer.read_morph_data(measure_file)
+            if len(values) != len(points):
+                raise IOError("{0} does not match the vertices of {1}.".
+                              format(measure_file, surface_file))
+            scalars.append(values)
+            scalar_names.append(measure_name)
+            array_file = os.path.join(os.getcwd(),
+                os.path.basename(measure_file) + '.npy')
+            np.save(array_file, values)
+            if not os.path.exists(array_file):
+                raise IOError(array_file + " not found")
+        array_files.append(array_file)
+    curvature_array_file, sulc_array_file, thickness_array_file = array_files
+
+    # Write the surface with all measures once:
+    if not output_vtk:
+        output_vtk = os.path.join(os.getcwd(),
+                                  os.path.basename(surface_file + '.vtk'))
+    output_vtk = write_binary_vtk(output_vtk, points, faces, scalars,
+                                  scalar_names,
+                                  title='vtk output from ' + surface_file)
+
+    return output_vtk, curvature_array_file, sulc_array_file, \
+           thickness_array_file, labels
+
+
 # def transform_to_volume(vtk_file, points, volume_file, output_volume=''):
 #     """
 #     Transform vtk coordinates to voxel index coordinates in a target
@@ -22,7 +22,8 @@ estimate_depth_curvature_distributions() calls the following functions:
 concatenate_sulcus_scalars():
     Prepare data for estimating scalar distributions along and outside fundi.
     Extract (e.g., depth, curvature) scalar values in folds, along sulcus
-    label boundaries as well as outside the sulcus label boundaries.
+    label boundaries as well as outside the sulcus label boundaries
+    (sulcus_border_scalars(), run in parallel by generate_sulcus_scalars()).
     Concatenate these scalar values across multiple files.
 
 fit_normals_to_histogram():
@@ -177,7 +178,8 @@ def compute_likelihood(trained_file, depth_file, curvature_file, folds,
 
 
 def estimate_distribution(scalar_files, scalar_range, fold_files, label_files,
-                          background_value=-1, verbose=False):
+                          background_value=-1, verbose=False, k=3,
+                          chunk_size=1000000, nprocesses=1, output_path=''):
     """
     Estimate sulcus label border scalar distributions from VTK files.
 
@@ -186,8 +188,6 @@ def estimate_distribution(scalar_files, scalar_range, fold_files, label_files,
     for VTK surface mesh scalars (e.g., depth, curvature) along and outside
     sulcus label borders within folds.
 
-    Note : The number of classes, k, is currently hard-coded.
-
     Parameters
     ----------
     scalar_files : list of strings
@@ -202,6 +202,15 @@ def estimate_distribution(scalar_files, scalar_range, fold_files, label_files,
         background value
     verbose : bool
         print statements?
+    k : integer
+        number of classes
+    chunk_size : integer or None
+        number of values to fit at a time (see fit_normals_to_histogram())
+    nprocesses : integer
+        number of processes to read training files
+    output_path : string
+        directory in which to spill concatenated training values
+        ('' to keep them in memory; see concatenate_sulcus_scalars())
 
     Returns
     -------
@@ -284,15 +293,17 @@ def estimate_distribution(scalar_files, scalar_range, fold_files, label_files,
 
     # Concatenate scalars across multiple training files:
     border_scalars, nonborder_scalars = concatenate_sulcus_scalars(scalar_files,
-        fold_files, label_files, background_value)
+        fold_files, label_files, background_value, nprocesses, output_path)
 
     # Estimate distribution parameters:
     border_means, border_sigmas, \
         border_weights = fit_normals_to_histogram(border_scalars,
-                                                  scalar_range, verbose)
+                                                  scalar_range, verbose, k,
+                                                  chunk_size=chunk_size)
     nonborder_means, nonborder_sigmas, \
         nonborder_weights = fit_normals_to_histogram(nonborder_scalars,
-                                                     scalar_range, verbose)
+                                                     scalar_range, verbose, k,
+                                                     chunk_size=chunk_size)
 
     # Store outputs in dictionaries:
     border_parameters = {
@@ -309,8 +320,176 @@ def estimate_distribution(scalar_files, scalar_range, fold_files, label_files,
     return border_parameters, nonborder_parameters
 
 
+def sulcus_border_scalars(scalar_file, fold_file, label_file,
+                          protocol_label_pairs, background_value=-1,
+                          dtype='float64'):
+    """
+    Extract scalar values in folds along and outside sulcus label boundaries.
+
+    Parameters
+    ----------
+    scalar_file : string
+        surface mesh VTK file with scalar values
+    fold_file : string
+        VTK file with fold numbers as scalars (-1 for non-fold vertices)
+    label_file : string
+        VTK file with label numbers (-1 for unlabeled vertices)
+    protocol_label_pairs : set of tuples of integers
+        sorted sulcus label pairs in the labeling protocol
+    background_value : integer or float
+        background value
+    dtype : string or numpy dtype
+        data type of the output arrays
+
+    Returns
+    -------
+    border_scalars : numpy array of floats
+        scalar values within folds along sulcus label boundaries
+    nonborder_scalars : numpy array of floats
+        scalar values within folds outside sulcus label boundaries
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mindboggle.shapes.likelihood import sulcus_border_scalars
+    >>> from mindboggle.mio.labels import DKTprotocol
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> depth_file = fetch_data(urls['left_travel_depth'], '', '.vtk')
+    >>> labels_file = fetch_data(urls['left_freesurfer_labels'], '', '.vtk')
+    >>> folds_file = fetch_data(urls['left_folds'], '', '.vtk')
+    >>> dkt = DKTprotocol()
+    >>> protocol_label_pairs = set(tuple(x) for lst in
+    ...                            dkt.sulcus_label_pair_lists for x in lst)
+    >>> border, nonborder = sulcus_border_scalars(depth_file, folds_file,
+    ...     labels_file, protocol_label_pairs)
+    >>> [np.float("{0:.{1}f}".format(x, 5)) for x in border[0:5]]
+    [3.48284, 2.57157, 4.27596, 4.56549, 3.84881]
+
+    """
+    import numpy as np
+
+    from mindboggle.mio.vtks import read_scalars, read_vtk
+    from mindboggle.guts.mesh import find_neighbors
+    from mindboggle.guts.segment import extract_borders
+
+    empty = np.zeros(0, dtype=dtype)
+
+    # Load scalars, folds, and labels (with faces) once each:
+    scalars, name = read_scalars(scalar_file, True, True)
+    if not np.size(scalars):
+        return empty, empty
+    folds, name = read_scalars(fold_file, True, True)
+    f1, f2, f3, faces, labels, f4, npoints, f5 = read_vtk(label_file,
+                                                          True, True)
+    neighbor_lists = find_neighbors(faces, npoints)
+    indices_folds = np.where(folds != background_value)[0].tolist()
+
+    # Find all label border pairs within the folds:
+    indices_label_pairs, label_pairs, unique_pairs = extract_borders(
+        indices_folds, labels, neighbor_lists, ignore_values=[-1],
+        return_label_pairs=True)
+
+    # Find vertices with label pairs in the sulcus labeling protocol:
+    indices_label_pairs = np.array([x for i,x in
+                                    enumerate(indices_label_pairs)
+                                    if tuple(label_pairs[i]) in
+                                    protocol_label_pairs], dtype=int)
+    outside_pairs = np.zeros(len(scalars), dtype=bool)
+    outside_pairs[indices_folds] = True
+    outside_pairs[indices_label_pairs] = False
+
+    border_scalars = scalars[indices_label_pairs].astype(dtype)
+    nonborder_scalars = scalars[outside_pairs].astype(dtype)
+
+    return border_scalars, nonborder_scalars
+
+
+def _mp_sulcus_border_scalars_worker(args):
+    from mindboggle.shapes.likelihood import sulcus_border_scalars
+    return sulcus_border_scalars(*args)
+
+
+def generate_sulcus_scalars(scalar_files, fold_files, label_files,
+                            background_value=-1, nprocesses=1,
+                            dtype='float64'):
+    """
+    Generate scalar values along and outside sulcus label boundaries per file.
+
+    Each (scalar, fold, label) file triple is processed by
+    sulcus_border_scalars(), optionally in a pool of processes,
+    and the results are yielded in the order of the input files.
+
+    Parameters
+    ----------
+    scalar_files : list of strings
+        names of surface mesh VTK files with scalar values
+    fold_files : list of strings (corr. to each list in scalar_files)
+        VTK files with fold numbers as scalars (-1 for non-fold vertices)
+    label_files : list of strings (corr. to fold_files)
+        VTK files with label numbers (-1 for unlabeled vertices)
+    background_value : integer or float
+        background value
+    nprocesses : integer
+        number of processes (1 to process files serially)
+    dtype : string or numpy dtype
+        data type of the yielded arrays
+
+    Yields
+    ------
+    border_scalars : numpy array of floats
+        scalar values within folds along sulcus label boundaries
+    nonborder_scalars : numpy array of floats
+        scalar values within folds outside sulcus label boundaries
+
+    Examples
+    --------
+    >>> from mindboggle.shapes.likelihood import generate_sulcus_scalars
+    >>> from mindboggle.mio.fetch_data import prep_tests
+    >>> urls, fetch_data = prep_tests()
+    >>> depth_file = fetch_data(urls['left_travel_depth'], '', '.vtk')
+    >>> labels_file = fetch_data(urls['left_freesurfer_labels'], '', '.vtk')
+    >>> folds_file = fetch_data(urls['left_folds'], '', '.vtk')
+    >>> chunks = generate_sulcus_scalars([depth_file, depth_file],
+    ...     [folds_file, folds_file], [labels_file, labels_file],
+    ...     nprocesses=2)
+    >>> sizes = [(len(border), len(nonborder)) for border, nonborder in chunks]
+    >>> sizes[0] == sizes[1]
+    True
+
+    """
+    from mindboggle.mio.labels import DKTprotocol
+
+    dkt = DKTprotocol()
+
+    # Prepare set of sulcus label pairs:
+    protocol_label_pairs = set(tuple(x) for lst in dkt.sulcus_label_pair_lists
+                               for x in lst)
+
+    args = [(scalar_file, fold_files[ifile], label_files[ifile],
+             protocol_label_pairs, background_value, dtype)
+            for ifile, scalar_file in enumerate(scalar_files)]
+
+    if nprocesses > 1 and len(args) > 1:
+        import multiprocessing as mp
+
+        process_pool = mp.Pool(min(nprocesses, len(args)))
+        try:
+            for result in process_pool.imap(_mp_sulcus_border_scalars_worker,
+                                            args):
+                yield result
+            process_pool.close()
+        finally:
+            process_pool.terminate()
+            process_pool.join()
+    else:
+        for arg in args:
+            yield _mp_sulcus_border_scalars_worker(arg)
+
+
 def concatenate_sulcus_scalars(scalar_files, fold_files, label_files,
-                               background_value=-1):
+                               background_value=-1, nprocesses=1,
+                               output_path=''):
     """
     Prepare data for estimating scalar distributions along and outside fundi.
 
@@ -318,6 +497,12 @@ def concatenate_sulcus_scalars(scalar_files, fold_files, label_files,
     label boundaries as well as outside the sulcus label boundaries.
     Concatenate these scalar values across multiple files.
 
+    Files are read with generate_sulcus_scalars(), optionally in parallel.
+    If output_path is given, the values are spilled to disk as they arrive
+    and returned as memory-mapped arrays (border_scalars.npy and
+    nonborder_scalars.npy), so that training sets larger than memory
+    can be fitted (see fit_normals_to_histogram() chunk_size).
+
     Parameters
     ----------
     scalar_files : list of strings
@@ -328,12 +513,17 @@ def concatenate_sulcus_scalars(scalar_files, fold_files, label_files,
         VTK files with label numbers (-1 for unlabeled vertices)
     background_value : integer or float
         background value
+    nprocesses : integer
+        number of processes to read files (1 to read files serially)
+    output_path : string
+        directory in which to save memory-mapped .npy arrays
+        ('' to keep arrays in memory)
 
     Returns
     -------
-    border_scalars : list of floats
+    border_scalars : numpy array of floats
         concatenated scalar values within folds along sulcus label boundaries
-    nonborder_scalars : list of floats
+    nonborder_scalars : numpy array of floats
         concatenated scalar values within folds outside sulcus label boundaries
 
     Examples
@@ -358,81 +548,108 @@ def concatenate_sulcus_scalars(scalar_files, fold_files, label_files,
     [2.87204, 2.89388, 3.55364, 2.81681, 3.70736]
 
     """
+    import os
     import numpy as np
 
-    from mindboggle.mio.vtks import read_scalars
-    from mindboggle.guts.mesh import find_neighbors_from_file
-    from mindboggle.guts.segment import extract_borders
-    from mindboggle.mio.labels import DKTprotocol
-
-    dkt = DKTprotocol()
-
-    # Prepare (non-unique) list of sulcus label pairs:
-    protocol_label_pairs = [x for lst in dkt.sulcus_label_pair_lists
-                            for x in lst]
-
-    border_scalars = []
-    nonborder_scalars = []
-
-    # Loop through files with the scalar values:
-    for ifile, scalar_file in enumerate(scalar_files):
-        #print(scalar_file)
-
-        # Load scalars, folds, and labels:
-        folds_file = fold_files[ifile]
-        labels_file = label_files[ifile]
-        scalars, name = read_scalars(scalar_file, True, True)
-        if scalars.shape:
-            folds, name = read_scalars(folds_file)
-            labels, name = read_scalars(labels_file)
-            indices_folds = [i for i,x in enumerate(folds)
-                             if x != background_value]
-            neighbor_lists = find_neighbors_from_file(labels_file)
-
-            # Find all label border pairs within the folds:
-            indices_label_pairs, label_pairs, unique_pairs = extract_borders(
-                indices_folds, labels, neighbor_lists, ignore_values=[-1],
-                return_label_pairs=True)
-            indices_label_pairs = np.array(indices_label_pairs)
-
-            # Find vertices with label pairs in the sulcus labeling protocol:
-            Ipairs_in_protocol = [i for i,x in enumerate(label_pairs)
-                                  if x in protocol_label_pairs]
-            indices_label_pairs = indices_label_pairs[Ipairs_in_protocol]
-            indices_outside_pairs = list(frozenset(indices_folds).difference(
-                indices_label_pairs))
-
-            # Store scalar values in folds along label border pairs:
-            border_scalars.extend(scalars[indices_label_pairs].tolist())
-
-            # Store scalar values in folds outside label border pairs:
-            nonborder_scalars.extend(scalars[indices_outside_pairs].tolist())
-
-    return border_scalars, nonborder_scalars
-
-
-def fit_normals_to_histogram(data, x, verbose=False):
+    from mindboggle.shapes.likelihood import generate_sulcus_scalars
+
+    dtype = np.dtype('float64')
+    chunks = generate_sulcus_scalars(scalar_files, fold_files, label_files,
+                                     background_value, nprocesses, dtype)
+
+    # Keep the scalar arrays in memory and concatenate them once:
+    if not output_path:
+        border_scalars = [np.zeros(0, dtype=dtype)]
+        nonborder_scalars = [np.zeros(0, dtype=dtype)]
+        for border, nonborder in chunks:
+            border_scalars.append(border)
+            nonborder_scalars.append(nonborder)
+
+        return np.concatenate(border_scalars), \
+               np.concatenate(nonborder_scalars)
+
+    # Or spill the scalar arrays as they arrive directly into .npy files,
+    # behind a fixed-size header that is rewritten with the final length:
+    import struct
+
+    header_size = 128
+
+    def write_npy_header(handle, count):
+        header = "{{'descr': {0!r}, 'fortran_order': False, " \
+                 "'shape': ({1},), }}".format(
+            np.lib.format.dtype_to_descr(dtype), count)
+        magic = np.lib.format.magic(1, 0)
+        npad = header_size - len(magic) - 2 - len(header) - 1
+        handle.seek(0)
+        handle.write(magic + struct.pack('<H', len(header) + npad + 1) +
+                     (header + ' ' * npad + '\n').encode('latin1'))
+
+    names = ['border_scalars', 'nonborder_scalars']
+    npy_files = [os.path.join(output_path, x + '.npy') for x in names]
+    counts = [0, 0]
+    handles = [open(x, 'wb') for x in npy_files]
+    try:
+        for handle in handles:
+            write_npy_header(handle, 0)
+        for chunk_pair in chunks:
+            for i, chunk in enumerate(chunk_pair):
+                np.asarray(chunk, dtype=dtype).tofile(handles[i])
+                counts[i] += len(chunk)
+        for i, handle in enumerate(handles):
+            write_npy_header(handle, counts[i])
+    finally:
+        for handle in handles:
+            handle.close()
+
+    outputs = [np.load(x, mmap_mode='r') for x in npy_files]
+
+    return outputs[0], outputs[1]
+
+
+def fit_normals_to_histogram(data, x, verbose=False, k=3, max_iterations=25,
+                             tolerance=0, chunk_size=None):
     """
     This Estimation-Maximization method returns estimated means, sigmas
     (standard deviations) and weights, each of length k (number of classes).
 
+    Each iteration computes the class probabilities of all of the data
+    as a single (number of values) x k array. Values whose probabilities
+    underflow for every class get (almost) zero weight, as before.
+    If a tolerance is given, iterations stop early once no mean or sigma
+    changes by more than the tolerance.
+
+    To fit very large data (such as a memory-mapped array of values
+    from many training surfaces), set chunk_size: each iteration then
+    accumulates the class statistics over consecutive chunks of the data,
+    which gives the same estimates without holding a full
+    (number of values) x k array in memory.
+
     Parameters
     ----------
-    data : list of floats
+    data : list or numpy array (or memory-mapped array) of floats
         data to estimate distribution means, sigmas, and weights
     x : list of floats
         range of values used to initialize distribution means and sigmas
+    verbose : bool
+        print statements?
+    k : integer
+        number of classes
+    max_iterations : integer
+        maximum number of iterations
+    tolerance : float
+        stop iterating when no mean or sigma changes by more than this
+        (0 to always run max_iterations)
+    chunk_size : integer or None
+        number of values to process at a time (None for all at once)
 
     Returns
     -------
-    means : list of floats
+    means : numpy array of floats
         estimated mean for each class
-    sigmas : list of floats
+    sigmas : numpy array of floats
         estimated standard deviation for each class
-    weights : list of floats
+    weights : numpy array of floats
         weight for each class
-    verbose : bool
-        print statements?
 
     Examples
     --------
@@ -453,18 +670,27 @@ def fit_normals_to_histogram(data, x, verbose=False):
     >>> [np.float("{0:.{1}f}".format(x, 5)) for x in weights]
     [0.43959, 0.39286, 0.16755]
 
+    Fit the same data in chunks:
+
+    >>> means2, sigmas2, weights2 = fit_normals_to_histogram(scalars, x,
+    ...     verbose, chunk_size=10000)
+    >>> np.allclose(means, means2) and np.allclose(sigmas, sigmas2)
+    True
+
     """
     import numpy as np
     from math import pi
 
     # Initialize variables:
-    k = 3
     tiny = 0.000000001
-    probs = np.zeros((len(data), k))
-    W = np.zeros((len(data), k))
+    if not isinstance(data, np.ndarray):
+        data = np.asarray(data, dtype=float)
+    data = data.ravel()
+    ndata = data.shape[0]
+    if not chunk_size:
+        chunk_size = max(ndata, 1)
     means = np.zeros(k)
     sigmas = np.zeros(k)
-    weights = np.zeros(k)
 
     # Initialize distribution means and sigmas:
     rangex = max(x) - min(x)
@@ -477,31 +703,40 @@ def fit_normals_to_histogram(data, x, verbose=False):
 
     # Iteratively compute probabilities, weights, means and sigmas:
     iter = 0
-    while iter < 25:
+    converged = False
+    while iter < max_iterations and not converged:
         iter += 1
 
-        for i in range(k):
-            m1 = 1 / (sigmas[i] * np.sqrt(2*pi) + tiny)
-            m2 = -((data-means[i])**2) / (2 *(sigmas[i]**2) + tiny)
-            probs[:,i] = m1 * np.exp(m2)
-
-        for i in range(k):
-            W[:,i] = probs[:,i] / (np.sum(probs, axis=1) + tiny)
-
-        for i in range(k):
-            n1 = sum(W[:,i] * (data - means[i])**2)
-            d1 = sum(W[:,i]) + tiny
-            sigmas[i] =  np.sqrt(n1 / d1)
-            means[i] = sum(W[:,i] * data) / d1
+        # Accumulate class statistics over (chunks of) the data:
+        sum_W = np.zeros(k)
+        sum_Wx = np.zeros(k)
+        sum_Wdx2 = np.zeros(k)
+        m1 = 1 / (sigmas * np.sqrt(2*pi) + tiny)
+        for start in range(0, ndata, chunk_size):
+            chunk = np.asarray(data[start:start + chunk_size],
+                               dtype=float)[:, np.newaxis]
+            dx2 = (chunk - means)**2
+            probs = m1 * np.exp(-dx2 / (2 * sigmas**2 + tiny))
+            W = probs / (probs.sum(axis=1, keepdims=True) + tiny)
+            sum_W += W.sum(axis=0)
+            sum_Wx += (W * chunk).sum(axis=0)
+            sum_Wdx2 += (W * dx2).sum(axis=0)
+
+        d1 = sum_W + tiny
+        new_sigmas = np.sqrt(sum_Wdx2 / d1)
+        new_means = sum_Wx / d1
+        change = max(np.max(np.abs(new_means - means)),
+                     np.max(np.abs(new_sigmas - sigmas)))
+        converged = tolerance > 0 and change <= tolerance
+        means, sigmas = new_means, new_sigmas
 
         if verbose:
             print('    means: {0}; sigmas: {1}'.format(means, sigmas))
 
-    for i in range(k):
-        weights[i] = sum(W[:,i]) / (np.sum(W) + tiny)
+    weights = sum_W / (np.sum(sum_W) + tiny)
 
     if verbose:
-        print('    weights: {0}'.format(weights))
+        print('    weights: {0} ({1} iterations)'.format(weights, iter))
 
     return means, sigmas, weights
 
@@ -87,8 +87,8 @@ def volume_per_brain_region(input_file, include_labels=[], exclude_labels=[],
 
     # Load labeled image volumes:
     img = nb.load(input_file)
-    volume_per_voxel = np.product(img.header.get_zooms())
-    labels = img.get_data().ravel()
+    volume_per_voxel = np.prod(img.header.get_zooms())
+    labels = img.get_data()
 
     unique_labels, counts = count_per_label(labels, include_labels,
                                             exclude_labels)
@@ -154,7 +154,7 @@ def thickinthehead(segmented_file, labeled_file,
 
     Steps ::
 
-        1. Extract noncortex and cortex into separate files.
+        1. Extract noncortex and cortex.
         2. Either mask labels with cortex or fill cortex with labels.
         3. Extract outer and inner boundary voxels of the cortex,
            by morphologically eroding the cortex (=2) by one voxel bordering
@@ -172,7 +172,8 @@ def thickinthehead(segmented_file, labeled_file,
     Note::
 
       - Cortex, noncortex, & label files are from the same coregistered brain.
-      - Calls ANTs functions: ImageMath and Threshold
+      - Image morphology is computed in memory with scipy.ndimage;
+        ANTs ImageMath is only called to propagate labels (propagate=True).
       - There may be slight discrepancies between volumes computed by
         thickinthehead() and volumes computed by volume_per_label();
         in 31 of 600+ ADNI 1.5T images, some volume_per_label() volumes
@@ -239,7 +240,7 @@ def thickinthehead(segmented_file, labeled_file,
     >>> output_table = ''
     >>> verbose = False
 
-    Skip online test because it requires installation of ANTs:
+    Skip online test:
 
     >>> label_volume_thickness, output_table = thickinthehead(segmented_file,
     ...     labeled_file, cortex_value, noncortex_value, labels, names,
@@ -253,8 +254,7 @@ def thickinthehead(segmented_file, labeled_file,
     import numpy as np
     import nibabel as nb
     from io import open
-
-    from mindboggle.guts.utilities import execute
+    from scipy import ndimage
 
     # ------------------------------------------------------------------------
     # Output files:
@@ -264,13 +264,7 @@ def thickinthehead(segmented_file, labeled_file,
             os.mkdir(output_dir)
     else:
         output_dir = os.getcwd()
-    cortex = os.path.join(output_dir, 'cortex.nii.gz')
-    noncortex = os.path.join(output_dir, 'noncortex.nii.gz')
-    temp = os.path.join(output_dir, 'temp.nii.gz')
-    inner_edge = os.path.join(output_dir, 'cortex_inner_edge.nii.gz')
     use_outer_edge = True
-    if use_outer_edge:
-        outer_edge = os.path.join(output_dir, 'cortex_outer_edge.nii.gz')
 
     if save_table:
         if output_table:
@@ -286,77 +280,84 @@ def thickinthehead(segmented_file, labeled_file,
     else:
         output_table = ''
 
+    # ------------------------------------------------------------------------
+    # Load data and dimensions:
+    # ------------------------------------------------------------------------
+    img = nb.load(segmented_file)
+    segmented_data = img.get_data()
+    labeled_data = nb.load(labeled_file).get_data()
+    voxsize = img.header.get_zooms()
+    voxvol = np.prod(voxsize)
+    voxarea = (voxsize[0] * voxsize[1] + \
+               voxsize[0] * voxsize[2] + \
+               voxsize[1] * voxsize[2]) / 3
+
     # ------------------------------------------------------------------------
     # Extract noncortex and cortex:
     # ------------------------------------------------------------------------
-    cmd = ['ThresholdImage', '3', segmented_file, noncortex,
-           str(noncortex_value), str(noncortex_value), '1 0']
-    execute(cmd, 'os')
-    cmd = ['ThresholdImage', '3', segmented_file, cortex,
-           str(cortex_value), str(cortex_value), '1 0']
-    execute(cmd, 'os')
+    noncortex = segmented_data == noncortex_value
+    cortex = segmented_data == cortex_value
 
     # ------------------------------------------------------------------------
-    # Either mask labels with cortex or fill cortex with labels:
+    # Either mask labels with cortex or fill cortex with labels
+    # (label propagation calls ANTs ImageMath):
     # ------------------------------------------------------------------------
     if propagate:
-        cmd = ['ImageMath', '3', cortex, 'PropagateLabelsThroughMask',
-               cortex, labeled_file]
+        from mindboggle.guts.utilities import execute
+
+        cortex_file = os.path.join(output_dir, 'cortex.nii.gz')
+        nb.save(nb.Nifti1Image(cortex.astype(np.uint8), img.affine,
+                               img.header), cortex_file)
+        cmd = ['ImageMath', '3', cortex_file, 'PropagateLabelsThroughMask',
+               cortex_file, labeled_file]
         execute(cmd, 'os')
+        cortex_data = nb.load(cortex_file).get_data()
     else:
-        cmd = ['ImageMath', '3', cortex, 'm', cortex, labeled_file]
-        execute(cmd, 'os')
-
-    # ------------------------------------------------------------------------
-    # Load data and dimensions:
-    # ------------------------------------------------------------------------
-    img = nb.load(cortex)
-    cortex_data = img.get_data().ravel()
-    voxsize = img.header.get_zooms()
-    voxvol = np.prod(voxsize)
-    voxarea = (voxsize[0] * voxsize[1] + \
-               voxsize[0] * voxsize[2] + \
-               voxsize[1] * voxsize[2]) / 3
+        cortex_data = np.where(cortex, labeled_data, 0)
 
     # ------------------------------------------------------------------------
     # Extract outer and inner boundary voxels of the cortex,
     # by eroding 1 voxel for cortex voxels (=2) bordering
-    # the outside of the brain (=0) and bordering noncortex (=3):
+    # the outside of the brain (=0) and bordering noncortex (=3).
+    # The 3x3x3 structuring element without corners matches the
+    # radius-1 ball of ANTs ImageMath MD/ME:
     # ------------------------------------------------------------------------
-    cmd = ['ImageMath', '3', inner_edge, 'MD', noncortex, '1']
-    execute(cmd, 'os')
-    cmd = ['ImageMath', '3', inner_edge, 'm', cortex, inner_edge]
-    execute(cmd, 'os')
+    ball = ndimage.generate_binary_structure(3, 2)
+    inner_edge_data = np.where(ndimage.binary_dilation(noncortex, ball),
+                               cortex_data, 0)
     if use_outer_edge:
-        cmd = ['ThresholdImage', '3', cortex, outer_edge, '1 10000 1 0']
-        execute(cmd, 'os')
-        cmd = ['ImageMath', '3', outer_edge, 'ME', outer_edge, '1']
-        execute(cmd, 'os')
-        cmd = ['ThresholdImage', '3', outer_edge, outer_edge, '1 1 0 1']
-        execute(cmd, 'os')
-        cmd = ['ImageMath', '3', outer_edge, 'm', cortex, outer_edge]
-        execute(cmd, 'os')
-        cmd = ['ThresholdImage', '3', inner_edge, temp, '1 10000 1 0']
-        execute(cmd, 'os')
-        cmd = ['ThresholdImage', '3', temp, temp, '1 1 0 1']
-        execute(cmd, 'os')
-        cmd = ['ImageMath', '3', outer_edge, 'm', temp, outer_edge]
-        execute(cmd, 'os')
+        eroded = ndimage.binary_erosion((cortex_data >= 1) &
+                                        (cortex_data <= 10000), ball,
+                                        border_value=1)
+        outer_edge_data = np.where(~eroded & ~((inner_edge_data >= 1) &
+                                               (inner_edge_data <= 10000)),
+                                   cortex_data, 0)
 
     # ------------------------------------------------------------------------
-    # Load data:
+    # Count voxels per label for the cortex, inner and outer edges
+    # in one pass per image:
     # ------------------------------------------------------------------------
-    inner_edge_data = nb.load(inner_edge).get_data().ravel()
+    if not labels:
+        labels = np.unique(labeled_data)
+    labels = [int(x) for x in labels]
+    sorted_labels = np.unique(labels)
+
+    def count_labels(data):
+        values = data.ravel()
+        indices = np.searchsorted(sorted_labels, values)
+        indices[indices == len(sorted_labels)] = 0
+        found = sorted_labels[indices] == values
+        counts = np.bincount(indices[found], minlength=len(sorted_labels))
+        return counts[np.searchsorted(sorted_labels, labels)]
+
+    cortex_counts = count_labels(cortex_data)
+    inner_edge_counts = count_labels(inner_edge_data)
     if use_outer_edge:
-        outer_edge_data = nb.load(outer_edge).get_data().ravel()
+        outer_edge_counts = count_labels(outer_edge_data)
 
     # ------------------------------------------------------------------------
     # Loop through labels:
     # ------------------------------------------------------------------------
-    if not labels:
-        labeled_data = nb.load(labeled_file).get_data().ravel()
-        labels = np.unique(labeled_data)
-    labels = [int(x) for x in labels]
     label_volume_thickness = -1 * np.ones((len(labels), 3))
     label_volume_thickness[:, 0] = labels
     for ilabel, label in enumerate(labels):
@@ -373,13 +374,11 @@ def thickinthehead(segmented_file, labeled_file,
         #   - Estimate the thickness of the labeled cortical region as the
         #     volume of the labeled region divided by the middle surface area.
         # --------------------------------------------------------------------
-        label_cortex_volume = voxvol * len(np.where(cortex_data==label)[0])
-        label_inner_edge_area = voxarea * \
-                                  len(np.where(inner_edge_data==label)[0])
+        label_cortex_volume = voxvol * cortex_counts[ilabel]
+        label_inner_edge_area = voxarea * inner_edge_counts[ilabel]
         if label_inner_edge_area:
             if use_outer_edge:
-                label_outer_edge_area = \
-                    voxarea * len(np.where(outer_edge_data==label)[0])
+                label_outer_edge_area = voxarea * outer_edge_counts[ilabel]
                 label_area = (label_inner_edge_area +
                               label_outer_edge_area) / 2.0
             else:
@@ -14,7 +14,8 @@ Copyright 2013,  Mindboggle team (http://mindboggle.info), Apache v2.0 License
 
 
 def zernike_moments(points, faces, order=10, scale_input=True,
-                    decimate_fraction=0, decimate_smooth=0, verbose=False):
+                    decimate_fraction=0, decimate_smooth=0, verbose=False,
+                    decimate_cache='', decimate_levels=[]):
     """
     Compute the Zernike moments of a surface patch of points and faces.
 
@@ -41,6 +42,13 @@ def zernike_moments(points, faces, order=10, scale_input=True,
         number of smoothing steps for decimation
     verbose : bool
         print statements?
+    decimate_cache : string
+        directory to cache decimated meshes across runs, at several
+        resolutions (see mindboggle.guts.mesh.decimate_pyramid())
+    decimate_levels : list of floats
+        other decimation fractions to compute and add to the cache
+        along with decimate_fraction (such as [0.5, 0.75, 0.9]);
+        by default, only decimate_fraction is computed on a cache miss
 
     Returns
     -------
@@ -119,7 +127,7 @@ def zernike_moments(points, faces, order=10, scale_input=True,
     import numpy as np
 
     from mindboggle.guts.mesh import reindex_faces_0to1
-    from mindboggle.guts.mesh import decimate
+    from mindboggle.guts.mesh import decimate, decimate_pyramid
     from mindboggle.shapes.zernike.pipelines import DefaultPipeline as Pipeline
 
     # Convert 0-indices (Python) to 1-indices (Matlab) for all face indices:
@@ -147,12 +155,15 @@ def zernike_moments(points, faces, order=10, scale_input=True,
     # Decimate surface:
     # ------------------------------------------------------------------------
     if 0 < decimate_fraction < 1:
-        points, faces, u1,u2 = decimate(points, faces,
-            decimate_fraction, decimate_smooth, [], save_vtk=False)
-
-        # Convert lists to numpy arrays:
-        points = np.array(points)
-        faces = np.array(faces)
+        if decimate_cache:
+            reductions = sorted(set(list(decimate_levels) +
+                                    [decimate_fraction]))
+            pyramid, cache_file = decimate_pyramid(points, faces,
+                reductions, decimate_smooth, decimate_cache)
+            points, faces = pyramid[decimate_fraction]
+        else:
+            points, faces, u1,u2 = decimate(points, faces,
+                decimate_fraction, decimate_smooth, [], save_vtk=False)
 
     # ------------------------------------------------------------------------
     # Multiprocessor pipeline:
@@ -181,7 +192,8 @@ def zernike_moments(points, faces, order=10, scale_input=True,
 
 def zernike_moments_per_label(vtk_file, order=10, exclude_labels=[-1],
                               scale_input=True, decimate_fraction=0,
-                              decimate_smooth=25, verbose=False):
+                              decimate_smooth=25, verbose=False,
+                              decimate_cache='', decimate_levels=[]):
     """
     Compute the Zernike moments per labeled region in a file.
 
@@ -204,6 +216,12 @@ def zernike_moments_per_label(vtk_file, order=10, exclude_labels=[-1],
         number of smoothing steps for decimation
     verbose : bool
         print statements?
+    decimate_cache : string
+        directory to cache decimated label meshes across runs
+        (see zernike_moments())
+    decimate_levels : list of floats
+        other decimation fractions to add to the cache
+        (see zernike_moments())
 
     Returns
     -------
@@ -286,7 +304,9 @@ def zernike_moments_per_label(vtk_file, order=10, exclude_labels=[-1],
                 descriptors = zernike_moments(points, pick_faces,
                                               order, scale_input,
                                               decimate_fraction,
-                                              decimate_smooth, verbose)
+                                              decimate_smooth, verbose,
+                                              decimate_cache,
+                                              decimate_levels)
 
                 # ------------------------------------------------------------
                 # Append to a list of lists of spectra:
@@ -42,6 +42,7 @@ def main(**extra_args):
           requires=REQUIRES,
           provides=PROVIDES,
           packages=['mindboggle',
+                    'mindboggle.benchmarks',
                     'mindboggle.data',
                     'mindboggle.evaluate',
                     'mindboggle.features',